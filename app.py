@@ -1,27 +1,34 @@
+from flask.cli import load_dotenv
+
+# Services read their configuration at import time
+load_dotenv()
+
 from bson import ObjectId
 from flask import Flask, render_template, request, jsonify, g, session, redirect, url_for, abort
-from flask.cli import load_dotenv
-from flask_session import Session
 from datetime import datetime, timedelta
 from routes.nda_routes import nda_bp
-from routes.nda_routes import cleanup_expired_documents
-from pymongo import MongoClient
+from routes.nda_routes import cleanup_expired_documents, document_cleaner
+from services.document_cleanup import CleanupScheduler
+from services.db import db_client, db, ensure_indexes, check_index_usage
+from services.user_cache import get_user, invalidate_user
+from services import metrics
+from services.session import init_session, rotate_session
+from services.sso import SSO_TOKEN_LOGIN, SSO_TOKEN_MAX_AGE, build_replay_guard
+from services.page_cache import cached_page
 from functools import wraps
+import click
 import os
 import hmac, hashlib, time, base64, json
 
 
-load_dotenv()
-
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY")
 
-app.register_blueprint(nda_bp, url_prefix="/nda")
+# ⏱️ Request / stage timings, Server-Timing headers and /metrics
+metrics.init_app(app)
 
-uri = os.getenv("MONGO_URI")
+app.register_blueprint(nda_bp, url_prefix="/nda")
 
-db_client = MongoClient(uri)
-db = db_client["user_database"]  # Your database name
 users_collection = db["users"]   # Collection for storing user data
 
 app.secret_key = os.getenv("SECRET_KEY")
@@ -31,7 +38,7 @@ IS_PROD = os.getenv("FLASK_ENV") == "production"
 app.config.update(
     SESSION_TYPE="mongodb",
     SESSION_MONGODB=db_client,
-    SESSION_MONGODB_DB="user_database",
+    SESSION_MONGODB_DB=db.name,
     SESSION_MONGODB_COLLECTION="sessions",
     SESSION_USE_SIGNER=True,
     SESSION_PERMANENT=True,
@@ -43,13 +50,173 @@ app.config.update(
     SESSION_COOKIE_DOMAIN=".lawchatai.in" if IS_PROD else None,
 )
 
-Session(app)
+# Index bootstrap lives in ensure_indexes(), nothing touches Mongo at import
+init_session(app, db_client)
+
+CLEANUP_REQUEST_BUDGET = float(os.getenv("CLEANUP_REQUEST_BUDGET", "20"))
+
+# 🧹 Expired-document cleanup on a timer (one run at a time across processes)
+if os.getenv("CLEANUP_SCHEDULER") == "1":
+    CleanupScheduler(
+        document_cleaner,
+        interval=int(os.getenv("CLEANUP_INTERVAL", "3600")),
+        time_budget=float(os.getenv("CLEANUP_TIME_BUDGET", "600")),
+    ).start()
+
+# 🗂️ Index bootstrap (idempotent). Also available as `flask ensure-indexes`
+if os.getenv("MONGO_ENSURE_INDEXES") == "1":
+    ensure_indexes()
+
+
+@app.cli.command("ensure-indexes")
+def ensure_indexes_command():
+    """Create the MongoDB indexes the app relies on."""
+    for name, indexes in ensure_indexes().items():
+        print(f"{name}: {', '.join(indexes) or 'failed'}")
+
+
+@app.cli.command("check-indexes")
+def check_indexes_command():
+    """Fail if a hot query falls back to a collection scan."""
+    ok = True
+    for label, stages, uses_index in check_index_usage():
+        print(f"{'OK  ' if uses_index else 'SCAN'} {label}: {' > '.join(stages)}")
+        ok = ok and uses_index
+
+    if not ok:
+        raise SystemExit(1)
+
+
+@app.cli.command("check-credit-concurrency")
+@click.option("--documents", default=20, help="Credits to seed, in documents.")
+@click.option("--attempts", default=80, help="Parallel reservations to fire.")
+@click.option("--confirm-database", default=None, help="Run even though MONGO_DB_NAME does not look disposable; must repeat its value.")
+def check_credit_concurrency_command(documents, attempts, confirm_database):
+    """
+    Race parallel reservations against a throwaway user and fail if credits
+    go negative or the ledger disagrees. Run against a scratch database.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from services import credit_ledger
+    from services.db import MONGO_DB_NAME
+
+    # It writes to users and credit_transactions: never by accident in production
+    disposable = any(word in MONGO_DB_NAME.lower() for word in ("test", "scratch", "tmp"))
+    if not disposable and confirm_database != MONGO_DB_NAME:
+        print(f"Refusing to write to {MONGO_DB_NAME!r}: point MONGO_DB_NAME at a scratch "
+              f"database or pass --confirm-database {MONGO_DB_NAME}")
+        raise SystemExit(2)
+
+    user_id = users_collection.insert_one({
+        "name": "credit-concurrency-check",
+        "account_type": "Premium",
+        "credit_contract": credit_ledger.CONTRACT_CREDIT_COST * documents,
+    }).inserted_id
+
+    try:
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            results = list(pool.map(
+                lambda _: credit_ledger.reserve(user_id)[0], range(attempts)
+            ))
+        credit_ledger.ledger_settler.flush()
+
+        granted = sum(results)
+        balance = users_collection.find_one({"_id": user_id})["credit_contract"]
+        ledger = credit_ledger.ledger_balance_delta(user_id)
+        pending = len(users_collection.find_one({"_id": user_id}).get("pending_txns", []))
+
+        print(f"granted={granted} balance={balance} ledger_delta={ledger} pending={pending}")
+
+        expected = min(documents, attempts)
+        if (balance < 0 or granted != expected or pending
+                or ledger != -credit_ledger.CONTRACT_CREDIT_COST * granted):
+            raise SystemExit(1)
+    finally:
+        users_collection.delete_one({"_id": user_id})
+        credit_ledger.credit_transactions.delete_many({"user_id": user_id})
+
+
+@app.cli.command("settle-credit-ledger")
+@click.option("--older-than", default=300, help="Only entries older than this, in seconds.")
+def settle_credit_ledger_command(older_than):
+    """Finish credit ledger writes left pending by a crashed process."""
+    from services import credit_ledger
+
+    settled = credit_ledger.settle_pending(timedelta(seconds=older_than))
+    print(f"settled={settled}")
+
+
+@app.cli.command("check-pdf-offline")
+@click.option("--render", is_flag=True, help="Also print through a local browser with the network blocked (PDF_ENGINE=local only).")
+def check_pdf_offline_command(render):
+    """
+    Fail if the PDF render HTML references anything on the network.
+
+    The HTML check holds for both engines. --render only proves the local
+    browser pool fetches nothing: with PDF_ENGINE=remote the HTML goes to
+    the PDF service, whose network access this command cannot observe.
+    """
+    from benchmarks.agreement_render import SAMPLE_FORM
+    from services.browser_pool import BrowserPool
+    from services.nda_formatter import external_references, format_nda_text, render_document_html
+    from services.nda_service import build_agreement, generate_agreement
+
+    _, document = build_agreement("emp-nda", SAMPLE_FORM)
+    contents = {
+        "document": render_document_html(document),
+        "legacy": format_nda_text(generate_agreement("emp-nda", SAMPLE_FORM)),
+    }
+
+    ok = True
+    pool = BrowserPool(size=1) if render else None
+    try:
+        for label, content in contents.items():
+            with app.test_request_context("/nda/generate-pdf"):
+                html = render_template("nda_pdf.html", content=content, title=document["title"])
+
+            refs = external_references(html)
+            print(f"{'OK  ' if not refs else 'FAIL'} {label}: {len(html)} bytes, external refs: {refs or 'none'}")
+            ok = ok and not refs
+
+            if pool:
+                pdf_bytes = pool.render(html)
+                print(f"     rendered {len(pdf_bytes)} bytes, blocked requests: {pool.blocked_requests}")
+                ok = ok and pool.blocked_requests == 0
+    finally:
+        if pool:
+            pool.shutdown()
+
+    if not ok:
+        raise SystemExit(1)
+
+@app.cli.command("import-profile")
+@click.option("--top", default=25, help="Rows per table.")
+def import_profile_command(top):
+    """Per-module import cost of the app (cold start), in a fresh interpreter."""
+    from benchmarks.import_profile import report
+    print(report("app", top))
+
+
+@app.cli.command("check-import-budget")
+@click.option("--budget-ms", type=float, default=None, help="Defaults to IMPORT_BUDGET_MS.")
+@click.option("--runs", default=3, help="Fresh interpreters to try, best one counts.")
+def check_import_budget_command(budget_ms, runs):
+    """Fail if importing the app is over budget or loads a lazy dependency."""
+    from benchmarks.import_profile import IMPORT_BUDGET_MS, check_budget
+
+    ok, message = check_budget("app", budget_ms or IMPORT_BUDGET_MS, runs)
+    print(f"{'OK  ' if ok else 'FAIL'} {message}")
+    if not ok:
+        raise SystemExit(1)
 
 def base64url_decode(data):
     data += "=" * (-len(data) % 4)
     return base64.urlsafe_b64decode(data)
 
-def verify_sso_token(token):
+def decode_sso_token(token):
+    """
+    Payload of a correctly signed, unexpired SSO token, else None.
+    """
     secret = os.getenv("SSO_SHARED_SECRET")
     if not secret:
         raise RuntimeError("SSO_SHARED_SECRET not set")
@@ -73,18 +240,54 @@ def verify_sso_token(token):
         if payload["exp"] < int(time.time()):
             return None
 
-        return payload["user_id"]
+        return payload
 
     except Exception:
         return None
 
-@app.route("/sso")
-def sso_login():
-    code = request.args.get("code")
-    if not code:
-        abort(401)
+def verify_sso_token(token):
+    payload = decode_sso_token(token)
+    return payload["user_id"] if payload else None
+
+sso_replay_guard = build_replay_guard(db)
+
+def sso_token_identity(token):
+    """
+    (user_id, token id, expiry) of a valid, short-lived token, else None.
+    """
+    payload = decode_sso_token(token)
+    if not payload:
+        return None
+
+    user_id = payload.get("user_id")
+    if not isinstance(user_id, str) or not ObjectId.is_valid(user_id):
+        return None
+
+    # Long-lived tokens would have to be remembered for as long
+    if payload["exp"] - time.time() > SSO_TOKEN_MAX_AGE:
+        return None
 
-    record = db["sso_codes"].find_one_and_update(
+    # The signature is unique per payload, so it identifies the token
+    return user_id, token.rsplit(".", 1)[1], payload["exp"]
+
+def claim_sso_token(token):
+    """
+    User id for a valid token seen for the first time, else None.
+    One insert with SSO_REPLAY_STORE=mongo (the default), none with memory.
+    """
+    identity = sso_token_identity(token)
+    if not identity:
+        return None
+
+    user_id, token_id, expires_at = identity
+    if not sso_replay_guard.claim(token_id, expires_at):
+        return None
+
+    return user_id
+
+def sso_code_query(code):
+    # Claims an unused, unexpired one-time code (stored hashed)
+    return (
         {
             "code": hashlib.sha256(code.encode()).hexdigest(),
             "used": False,
@@ -93,20 +296,49 @@ def sso_login():
         {"$set": {"used": True}}
     )
 
+def login_user_id():
+    """
+    User id from /sso's `token` (stateless mode) or one-time `code`.
+    """
+    token = request.args.get("token")
+    if token and SSO_TOKEN_LOGIN:
+        # The user is loaded (and cached) by the next request anyway,
+        # and a stale id just fails login_required there
+        return claim_sso_token(token)
+
+    code = request.args.get("code")
+    if not code:
+        return None
+
+    record = db["sso_codes"].find_one_and_update(*sso_code_query(code))
+
     if not record:
-        abort(401)
+        return None
 
     user = users_collection.find_one(
-        {"_id": ObjectId(record["user_id"])}
+        {"_id": ObjectId(record["user_id"])}, {"_id": 1}
     )
 
     if not user:
         abort(404)
 
+    return str(user["_id"])
+
+@app.route("/sso")
+def sso_login():
+    user_id = login_user_id()
+    if not user_id:
+        abort(401)
+
+    # Fresh login: don't serve a stale cached copy of this user
+    invalidate_user(user_id)
+
     session.clear()
-    session["user_id"] = str(user["_id"])
+    session["user_id"] = user_id
     session.permanent = True
 
+    # New id on login: no instance keeps a cached copy under the old one
+    rotate_session(app.session_interface, session)
     session.modified = True
 
     return redirect("/")
@@ -114,9 +346,13 @@ def sso_login():
 
 @app.before_request
 def load_logged_in_user():
+    if request.endpoint == "static":
+        g.user = None
+        return
+
     user_id = session.get("user_id")
     if user_id:
-        g.user = users_collection.find_one({"_id": ObjectId(user_id)})
+        g.user = get_user(user_id)
     else:
         g.user = None
 
@@ -133,7 +369,8 @@ def login_required(f):
 @app.route("/")
 @login_required
 def select_agreement():
-    return render_template("agreement.html")
+    # Same page for everyone: one shared fragment, 304 on repeat visits
+    return cached_page(None, "agreement", (), lambda: render_template("agreement.html"))
 
 @app.route("/nda")
 @login_required
@@ -144,18 +381,32 @@ def nda():
     account_type = g.user.get("account_type", "basic")
     credit_contract = g.user.get("credit_contract", 0)
 
-    return render_template(
-        "emp_nda.html",
-        agreement_type=agreement_type,
-        account_type=account_type,
-        credit_contract=credit_contract
+    return cached_page(
+        g.user["_id"],
+        "emp_nda",
+        (agreement_type, account_type, credit_contract),
+        lambda: render_template(
+            "emp_nda.html",
+            agreement_type=agreement_type,
+            account_type=account_type,
+            credit_contract=credit_contract
+        )
     )
 
 @app.route("/lawchat/contract/cleanup-docs")
 @login_required
 def cleanup_docs():
-    cleanup_expired_documents()
-    return jsonify({"status": "cleanup completed"})
+    # Bounded so the request can't time out on a large backlog,
+    # the scheduler / CLI picks up whatever remains
+    report = cleanup_expired_documents(time_budget=CLEANUP_REQUEST_BUDGET)
+    return jsonify({"status": "cleanup completed", **report})
+
+
+@app.cli.command("cleanup-docs")
+@click.option("--max-batches", type=int, default=None)
+def cleanup_docs_command(max_batches):
+    """Delete expired documents and their R2 objects."""
+    print(json.dumps(cleanup_expired_documents(max_batches=max_batches)))
 
 
 @app.route("/employment-agreement")
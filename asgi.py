@@ -0,0 +1,174 @@
+"""
+asyncio (ASGI) serving mode.
+
+    pip install -r requirements-asgi.txt
+    hypercorn asgi:application --workers 4 --bind 0.0.0.0:5001
+
+The routes that mostly wait on the network run as coroutines on the
+async Mongo, PDF service and R2 clients (services/aio.py), so a render in
+flight costs a socket rather than a worker thread and one process can hold
+hundreds of them:
+
+    /sso, /nda/generate, /nda/generate-pdf, /nda/my-documents.json,
+    /nda/document/<id>
+
+Every other route is the Flask app from app.py, unchanged, run on a thread
+pool (ASGI_SYNC_THREADS) behind the same event loop. Both halves share
+sessions, caches, metrics and the services, so a browser moves between
+them freely. `flask run` / the WSGI deployment keep serving app.py alone.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from bson import ObjectId
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from quart import Quart, abort, g, redirect, request, session
+
+from app import (
+    SSO_TOKEN_LOGIN, app as flask_app, db, sso_code_query, sso_replay_guard,
+    sso_token_identity, users_collection
+)
+from routes.nda_async_routes import nda_async_bp
+from services import aio
+from services.aio_session import init_async_session, rotate_session_async
+from services.metrics import METRICS_ENABLED, finish_request, start_request
+from services.user_cache import get_user_async, invalidate_user
+
+# Threads for the Flask half: its requests still hold one while they wait
+ASGI_SYNC_THREADS = int(os.getenv("ASGI_SYNC_THREADS", "32"))
+
+app = Quart(__name__, static_folder=None)
+app.secret_key = flask_app.secret_key
+app.config.update({
+    key: value for key, value in flask_app.config.items()
+    if key.startswith("SESSION_") or key == "PERMANENT_SESSION_LIFETIME"
+})
+# Like Flask: no server-side cap, the PDF client has its own timeouts
+app.config["RESPONSE_TIMEOUT"] = None
+
+init_async_session(app, flask_app)
+
+app.register_blueprint(nda_async_bp, url_prefix="/nda")
+
+# Flask's routes, without views: url_for() in templates rendered here can
+# link anywhere, and the dispatcher knows what to hand over
+for rule in flask_app.url_map.iter_rules():
+    if rule.endpoint not in app.view_functions:
+        app.url_map.add(rule.empty())
+
+
+@app.before_serving
+async def start():
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=ASGI_SYNC_THREADS, thread_name_prefix="wsgi-worker")
+    )
+
+
+@app.after_serving
+async def stop():
+    await aio.close()
+
+
+@app.before_request
+async def load_logged_in_user():
+    if METRICS_ENABLED:
+        g._request_started = start_request()
+
+    user_id = session.get("user_id")
+    if user_id:
+        g.user = await get_user_async(user_id)
+    else:
+        g.user = None
+
+
+@app.after_request
+async def record_request(response):
+    # Same timing and Server-Timing header as the Flask half
+    started = g.pop("_request_started", None)
+    if started is None:
+        return response
+    return finish_request(response, request.endpoint, request.method, started)
+
+
+async def login_user_id():
+    """
+    app.login_user_id() on the async clients.
+    """
+    token = request.args.get("token")
+    if token and SSO_TOKEN_LOGIN:
+        identity = sso_token_identity(token)
+        if not identity:
+            return None
+
+        user_id, token_id, expires_at = identity
+        if not await sso_replay_guard.claim_async(token_id, expires_at):
+            return None
+        return user_id
+
+    code = request.args.get("code")
+    if not code:
+        return None
+
+    record = await aio.async_collection(db["sso_codes"]).find_one_and_update(
+        *sso_code_query(code)
+    )
+
+    if not record:
+        return None
+
+    user = await aio.async_collection(users_collection).find_one(
+        {"_id": ObjectId(record["user_id"])}, {"_id": 1}
+    )
+
+    if not user:
+        abort(404)
+
+    return str(user["_id"])
+
+
+@app.route("/sso")
+async def sso_login():
+    user_id = await login_user_id()
+    if not user_id:
+        abort(401)
+
+    invalidate_user(user_id)
+
+    session.clear()
+    session["user_id"] = user_id
+    session.permanent = True
+
+    await rotate_session_async(app.session_interface, session)
+    session.modified = True
+
+    return redirect("/")
+
+
+class HybridApp:
+    """
+    Sends each HTTP request to the Quart app when it has a view for the
+    matched endpoint, and everything else (including 404s) to the Flask
+    app. Lifespan events go to Quart.
+    """
+
+    def __init__(self, asgi_app, wsgi_app):
+        self.asgi_app = asgi_app
+        self.wsgi_app = AsyncioWSGIMiddleware(wsgi_app)
+        self.urls = asgi_app.url_map.bind("localhost")
+
+    def is_async(self, scope):
+        try:
+            endpoint, _ = self.urls.match(scope["path"], method=scope["method"])
+        except Exception:
+            # NotFound, MethodNotAllowed, RequestRedirect: Flask answers those
+            return False
+        return endpoint in self.asgi_app.view_functions
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not self.is_async(scope):
+            return await self.wsgi_app(scope, receive, send)
+        return await self.asgi_app(scope, receive, send)
+
+
+application = HybridApp(app, flask_app)
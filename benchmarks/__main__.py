@@ -0,0 +1,85 @@
+"""
+Benchmark suite for the agreement generation hot paths.
+
+    python -m benchmarks                          # run everything
+    python -m benchmarks --only micro. --only fields.
+    python -m benchmarks --out results.json
+    python -m benchmarks --compare baseline.json  # exit 1 on regression
+
+Micro cases are pure CPU. Request cases go through the Flask test client
+against offline stand-ins (see benchmarks/standins.py). Regressions are
+judged on the calling thread's CPU time per operation.
+"""
+import argparse
+import sys
+
+from benchmarks import runner
+
+
+def all_cases(include_requests=True):
+    # Stand-ins must be patched in before any services.* import
+    if include_requests:
+        from benchmarks.standins import install
+        install()
+
+    from benchmarks import micro
+
+    cases = dict(micro.cases())
+    if include_requests:
+        from benchmarks import request_cycle
+        cases.update(request_cycle.cases())
+    return cases
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--only", action="append", metavar="PREFIX",
+                        help="Run only cases whose name starts with PREFIX (repeatable).")
+    parser.add_argument("--no-requests", action="store_true",
+                        help="Skip the request-cycle cases (no mongomock needed).")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="Minimum seconds per timing round.")
+    parser.add_argument("--out", help="Write results as JSON to this file.")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="Compare against a previous --out file.")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Allowed slowdown before --compare fails (0.15 = 15%%).")
+    parser.add_argument("--metric", default="cpu_us_per_op",
+                        choices=["cpu_us_per_op", "us_per_op", "median_us_per_op"])
+    args = parser.parse_args(argv)
+
+    include_requests = not args.no_requests and (
+        not args.only or any(p.startswith("request") for p in args.only)
+    )
+    results = runner.run_cases(
+        all_cases(include_requests),
+        only=args.only,
+        repeat=args.repeat,
+        min_time=args.min_time,
+    )
+
+    if args.out:
+        runner.write_results(args.out, results)
+        print(f"\nwrote {len(results)} results to {args.out}")
+
+    if args.compare:
+        rows, regressed = runner.compare(
+            runner.load_results(args.compare), results, args.threshold, args.metric
+        )
+        print(f"\n{'case':40} {'baseline':>12} {'current':>12} {'change':>8}")
+        for name, before, after, ratio in rows:
+            flag = "  REGRESSION" if name in regressed else ""
+            print(f"{name:40} {before:12.2f} {after:12.2f} {ratio - 1:+8.1%}{flag}")
+
+        if regressed:
+            print(f"\n{len(regressed)} case(s) slower than {args.threshold:.0%} on {args.metric}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
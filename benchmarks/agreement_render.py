@@ -0,0 +1,57 @@
+"""
+Render cost per registered agreement type.
+
+    python -m benchmarks.agreement_render [--number 2000]
+
+The same renders run as `agreement.*` cases in `python -m benchmarks`.
+"""
+import argparse
+import timeit
+
+from services.agreements import agreement_types
+
+SAMPLE_FORM = {
+    "employer_name": ["Acme Technologies Pvt Ltd"],
+    "employee_name": ["Priya Sharma"],
+    "designation": ["Senior Software Engineer"],
+    "effective_date": ["2026-01-03"],
+    "governing_law": ["laws of India"],
+    "jurisdiction": ["courts at Bengaluru"],
+    "confidential[]": ["business", "clients", "financial", "technical"],
+    "annual_ctc": ["INR 24,00,000"],
+    "work_location": ["Bengaluru"],
+}
+
+
+def bench_agreement_types(number=2000, repeat=5):
+    results = {}
+
+    for key, agreement in agreement_types().items():
+        timings = timeit.repeat(
+            lambda: agreement.render_text(SAMPLE_FORM),
+            number=number,
+            repeat=repeat,
+        )
+        results[key] = {
+            "us_per_render": round(min(timings) / number * 1e6, 2),
+            "clauses": len(agreement.clauses),
+            "chars": len(agreement.render_text(SAMPLE_FORM)),
+        }
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    for key, result in bench_agreement_types(args.number).items():
+        print(
+            f"{key:24} {result['us_per_render']:8.2f} us/render  "
+            f"{result['clauses']:3d} clauses  {result['chars']:6d} chars"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Cold-start import cost of the app, measured in fresh interpreters.
+
+    python -m benchmarks.import_profile [--top 25]        # per-module report
+    python -m benchmarks.import_profile --budget-ms 800   # exit 1 over budget
+
+Also available as `flask import-profile` / `flask check-import-budget`.
+The budget check is the app's import-time gate: it exits non-zero when
+`import app` is over budget or loads one of LAZY_MODULES, so a deploy
+pipeline can run it as it would a test.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1000"))
+
+# Heavy dependencies that must only load on first use
+LAZY_MODULES = ("boto3", "botocore", "requests", "playwright", "httpx", "quart")
+
+
+def _python(code, *flags):
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+
+
+def import_times(module="app"):
+    """
+    Parse `python -X importtime` for one import of `module`.
+    Returns [(name, self_us, cumulative_us)] in import order.
+    """
+    result = _python(f"import {module}", "-X", "importtime")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def import_wall_ms(module="app", runs=3):
+    """
+    Best wall time of `import module` over `runs` fresh interpreters,
+    plus the LAZY_MODULES it dragged in.
+    """
+    code = (
+        "import sys, time; started = time.perf_counter(); "
+        f"import {module}; "
+        "elapsed = (time.perf_counter() - started) * 1000; "
+        f"print(elapsed, *[m for m in {LAZY_MODULES!r} if m in sys.modules])"
+    )
+    best, loaded = None, []
+    for _ in range(runs):
+        elapsed, *loaded = _python(code).stdout.split()
+        best = min(best or float(elapsed), float(elapsed))
+    return best, loaded
+
+
+def report(module="app", top=25):
+    rows = import_times(module)
+
+    by_package = defaultdict(int)
+    for name, self_us, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+
+    total_us = sum(self_us for _, self_us, _ in rows)
+    lines = [f"import {module}: {total_us / 1000:.1f} ms across {len(rows)} modules", ""]
+
+    lines.append(f"{'top-level package':40} {'self ms':>10}")
+    for package, self_us in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]:
+        lines.append(f"{package:40} {self_us / 1000:10.1f}")
+
+    lines += ["", f"{'module':50} {'self ms':>10} {'cumulative ms':>14}"]
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: -r[1])[:top]:
+        lines.append(f"{name:50} {self_us / 1000:10.1f} {cumulative_us / 1000:14.1f}")
+
+    return "\n".join(lines)
+
+
+def check_budget(module="app", budget_ms=IMPORT_BUDGET_MS, runs=3):
+    """
+    Returns (ok, message). Fails over budget or if a LAZY_MODULES
+    dependency is imported eagerly.
+    """
+    elapsed, loaded = import_wall_ms(module, runs)
+    ok = elapsed <= budget_ms and not loaded
+    message = f"import {module}: {elapsed:.0f} ms (budget {budget_ms:.0f} ms)"
+    if loaded:
+        message += f", eagerly imported: {', '.join(loaded)}"
+    return ok, message
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--budget-ms", type=float,
+                        help="Check the import against this budget instead of profiling.")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.budget_ms is None:
+        print(report(args.module, args.top))
+        return 0
+
+    ok, message = check_budget(args.module, args.budget_ms, args.runs)
+    print(f"{'OK  ' if ok else 'FAIL'} {message}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
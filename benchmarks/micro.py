@@ -0,0 +1,56 @@
+"""
+Pure-CPU hot paths of agreement generation and formatting.
+No app import, no stand-ins needed.
+"""
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from benchmarks.agreement_render import SAMPLE_FORM
+from services.agreements import agreement_types
+from services.agreements.fields import normalize_date
+from services.nda_formatter import (
+    PDF_CSS, format_nda_text, render_document_html, sanitize_line
+)
+from services.nda_service import build_agreement, generate_employment_nda
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+
+SAMPLE_LINE = (
+    "The Employee shall not, directly or indirectly, during or after employment, "
+    "disclose, publish, communicate, or make available any Confidential Information "
+    "to any third party <including affiliates> & successors."
+)
+
+
+def cases():
+    nda_text = generate_employment_nda(SAMPLE_FORM)
+    _, document = build_agreement("emp-nda", SAMPLE_FORM)
+    content = render_document_html(document)
+
+    # Same loader and autoescape rules Flask uses for templates/
+    templates = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=select_autoescape(["html"]),
+    )
+    nda_pdf = templates.get_template("nda_pdf.html")
+
+    bench = {
+        "nda_service.generate_employment_nda": lambda: generate_employment_nda(SAMPLE_FORM),
+        "nda_service.build_agreement": lambda: build_agreement("emp-nda", SAMPLE_FORM),
+        "fields.normalize_date": lambda: normalize_date("2026-01-03"),
+        "fields.normalize_date.uncached": lambda: normalize_date.__wrapped__("2026-01-03"),
+        "nda_formatter.sanitize_line": lambda: sanitize_line(SAMPLE_LINE),
+        "nda_formatter.format_nda_text": lambda: format_nda_text(nda_text),
+        "nda_formatter.render_document_html": lambda: render_document_html(document),
+        "template.nda_pdf": lambda: nda_pdf.render(
+            content=content, title=document["title"], pdf_css=PDF_CSS
+        ),
+    }
+
+    for key, agreement in agreement_types().items():
+        bench[f"agreement.{key}.render_text"] = (
+            lambda agreement=agreement: agreement.render_text(SAMPLE_FORM)
+        )
+
+    return bench
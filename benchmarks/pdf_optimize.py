@@ -0,0 +1,147 @@
+"""
+Size / time trade-off of the PDF post-processing step (services.pdf_optimize).
+
+    python -m benchmarks.pdf_optimize                  # render the sample agreements
+    python -m benchmarks.pdf_optimize --pdf a.pdf --pdf b.pdf
+    python -m benchmarks.pdf_optimize --out pdf_optimize.json
+
+Rendering the samples needs a PDF engine (PDF_SERVICE_URL or
+PDF_ENGINE=local); --pdf runs fully offline. Needs pikepdf; the
+ghostscript variant only runs when `gs` is installed.
+"""
+import argparse
+import shutil
+import sys
+import time
+from pathlib import Path
+
+from benchmarks import runner
+from benchmarks.agreement_render import SAMPLE_FORM
+from services.pdf_optimize import GHOSTSCRIPT_BIN, PDFOptimizer, optimize_pdf
+
+# name -> optimize_pdf() arguments
+VARIANTS = {
+    "pikepdf": {"engine": "pikepdf", "linearize": True},
+    "pikepdf.no_linearize": {"engine": "pikepdf", "linearize": False},
+    "ghostscript": {"engine": "ghostscript", "linearize": True},
+}
+
+
+def render_samples():
+    """
+    One PDF per registered agreement type, rendered like /generate-pdf does.
+    """
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+    from benchmarks.micro import TEMPLATES_DIR
+    from services.agreements import agreement_types
+    from services.nda_formatter import PDF_CSS, render_document_html
+    from services.nda_service import build_agreement
+    from services.pdf_service import render_pdf
+
+    templates = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=select_autoescape(["html"]),
+    )
+    nda_pdf = templates.get_template("nda_pdf.html")
+
+    samples = {}
+    for key in agreement_types():
+        _, document = build_agreement(key, SAMPLE_FORM)
+        html = nda_pdf.render(
+            content=render_document_html(document), title=document["title"], pdf_css=PDF_CSS
+        )
+        samples[key] = render_pdf(html)
+    return samples
+
+
+def load_samples(paths):
+    return {Path(path).stem: Path(path).read_bytes() for path in paths}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def bench_variant(pdf_bytes, options, repeat):
+    """
+    In-process CPU cost of one variant: the time a pool worker spends.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        optimized = optimize_pdf(pdf_bytes, **options)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "bytes_in": len(pdf_bytes),
+        "bytes_out": len(optimized),
+        "saved_pct": round((1 - len(optimized) / len(pdf_bytes)) * 100, 2),
+        "median_ms": round(percentile(timings, 0.5), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+    }
+
+
+def bench_pool(pdf_bytes, repeat):
+    """
+    End-to-end cost on the request path: IPC to a warm worker and back.
+    """
+    optimizer = PDFOptimizer(workers=1, timeout=60, min_saving=0)
+    try:
+        optimizer.optimize(pdf_bytes)  # spawn + pikepdf import, not counted
+
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            optimizer.optimize(pdf_bytes)
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        optimizer.shutdown()
+
+    return {
+        "median_ms": round(percentile(timings, 0.5), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--pdf", action="append", metavar="FILE",
+                        help="Benchmark this PDF instead of rendering samples (repeatable).")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--out", help="Write results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    samples = load_samples(args.pdf) if args.pdf else render_samples()
+
+    variants = dict(VARIANTS)
+    if shutil.which(GHOSTSCRIPT_BIN) is None:
+        print(f"{GHOSTSCRIPT_BIN} not found, skipping the ghostscript variant\n")
+        del variants["ghostscript"]
+
+    results = {}
+    print(f"{'case':50} {'bytes in':>10} {'bytes out':>10} {'saved':>7} "
+          f"{'median ms':>10} {'p95 ms':>8}")
+    for sample, pdf_bytes in samples.items():
+        for variant, options in variants.items():
+            name = f"pdf_optimize.{variant}.{sample}"
+            result = results[name] = bench_variant(pdf_bytes, options, args.repeat)
+            print(f"{name:50} {result['bytes_in']:10} {result['bytes_out']:10} "
+                  f"{result['saved_pct']:6.1f}% {result['median_ms']:10.1f} {result['p95_ms']:8.1f}")
+
+        name = f"pdf_optimize.pool.{sample}"
+        result = results[name] = bench_pool(pdf_bytes, args.repeat)
+        print(f"{name:50} {'':10} {'':10} {'':7} {result['median_ms']:10.1f} {result['p95_ms']:8.1f}")
+
+    if args.out:
+        runner.write_results(args.out, results)
+        print(f"\nwrote {len(results)} results to {args.out}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Full request cycles through the Flask test client, against the offline
+stand-ins (mongomock, in-memory S3, stub PDF service).
+
+Absolute numbers include the stand-ins' own cost and are not production
+latencies; compare them against a baseline taken the same way.
+"""
+import itertools
+import json
+from datetime import datetime, timedelta
+
+from benchmarks.agreement_render import SAMPLE_FORM
+from benchmarks.standins import install
+from services.nda_service import generate_employment_nda
+
+GENERATE_FORM = {
+    "employer_name": SAMPLE_FORM["employer_name"][0],
+    "employee_name": SAMPLE_FORM["employee_name"][0],
+    "designation": SAMPLE_FORM["designation"][0],
+    "effective_date": SAMPLE_FORM["effective_date"][0],
+    "jurisdiction_key": "india_bangalore",
+    "confidential[]": SAMPLE_FORM["confidential[]"],
+}
+
+HISTORY_SIZE = 200
+
+
+def logged_in_client(app, db):
+    user_id = db["users"].insert_one({
+        "name": "Benchmark User",
+        "email": "bench@example.com",
+        "account_type": "Premium_contract",
+        "credit_contract": 0,
+    }).inserted_id
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = str(user_id)
+    return client, user_id
+
+
+def seed_history(db, user_id, count=HISTORY_SIZE):
+    now = datetime.now()
+    db["document_history"].insert_many([
+        {
+            "user_id": user_id,
+            "email": "bench@example.com",
+            "user_name": "Benchmark User",
+            "document_type": "EMP_NDA",
+            "file_name": f"NDA_{i}.pdf",
+            "file_path": f"documents/{user_id}/NDA_{i}.pdf",
+            "created_at": now - timedelta(minutes=i),
+            "expires_at": now + timedelta(days=30),
+            "status": "active",
+        }
+        for i in range(count)
+    ])
+
+
+def expect(response, status=200):
+    if response.status_code != status:
+        raise RuntimeError(f"{response.request.path}: HTTP {response.status_code}")
+    return response
+
+
+def cases():
+    standins = install()
+
+    import app as app_module
+    import routes.nda_routes as nda_routes
+
+    app = app_module.app
+    client, user_id = logged_in_client(app, standins.db)
+    seed_history(standins.db, user_id)
+
+    # One draft to print from, as the preview page would post it
+    values, document = nda_routes.build_agreement("emp-nda", SAMPLE_FORM)
+    draft_id = nda_routes.drafts.create(user_id, "emp-nda", values, document)
+    edits = json.dumps({"survival": "The obligations survive termination."})
+    legacy_text = generate_employment_nda(SAMPLE_FORM)
+
+    def generate():
+        expect(client.post("/nda/generate", data=GENERATE_FORM))
+
+    def generate_pdf(cached):
+        def run():
+            nda_routes.PDF_CACHE_ENABLED = cached
+            expect(client.post("/nda/generate-pdf", data={"draft_id": draft_id, "edits": edits}))
+        return run
+
+    def generate_pdf_legacy():
+        nda_routes.PDF_CACHE_ENABLED = False
+        expect(client.post("/nda/generate-pdf", data={"nda_text": legacy_text}))
+
+    # Live preview: one draft, the employee name alternating
+    preview_draft = expect(client.post(
+        "/nda/preview.json", json={"fields": GENERATE_FORM}
+    )).get_json()["draft_id"]
+    preview_names = itertools.cycle(["Priya Sharma", "Rahul Verma"])
+
+    def preview_full():
+        expect(client.post("/nda/preview.json", json={"fields": GENERATE_FORM}))
+
+    def preview_delta():
+        expect(client.post("/nda/preview.json", json={
+            "draft_id": preview_draft,
+            "fields": {"employee_name": next(preview_names)},
+        }))
+
+    def my_documents():
+        expect(client.get("/nda/my-documents"))
+
+    # my_documents first: every PDF request adds to the history and
+    # mongomock, unlike an index, scans all of it
+    return {
+        "request.my_documents": my_documents,
+        "request.generate": generate,
+        "request.generate_pdf": generate_pdf(cached=False),
+        "request.generate_pdf.cache_hit": generate_pdf(cached=True),
+        "request.generate_pdf.legacy_text": generate_pdf_legacy,
+        "request.preview.full": preview_full,
+        "request.preview.delta": preview_delta,
+    }
@@ -0,0 +1,100 @@
+"""
+Timing, result files and baseline comparison for the benchmark suite.
+"""
+import json
+import platform
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime, timezone
+
+
+def measure(fn, repeat=5, min_time=0.2):
+    """
+    Time `fn` like timeit: calibrate the loop count to at least `min_time`
+    seconds, then keep the best of `repeat` rounds. CPU time is the calling
+    thread's only, so stub servers and background writers don't count.
+    """
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+
+    wall, cpu = [], []
+    for _ in range(repeat):
+        cpu_start = time.thread_time()
+        wall_start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        wall.append(time.perf_counter() - wall_start)
+        cpu.append(time.thread_time() - cpu_start)
+
+    return {
+        "us_per_op": round(min(wall) / number * 1e6, 2),
+        "cpu_us_per_op": round(min(cpu) / number * 1e6, 2),
+        "median_us_per_op": round(sorted(wall)[len(wall) // 2] / number * 1e6, 2),
+        "ops": number,
+        "repeat": repeat,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_cases(cases, only=None, repeat=5, min_time=0.2, log=print):
+    results = {}
+    for name, fn in cases.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = measure(fn, repeat=repeat, min_time=min_time)
+        log(f"{name:40} {results[name]['us_per_op']:12.2f} us  "
+            f"{results[name]['cpu_us_per_op']:12.2f} us cpu")
+    return results
+
+
+def result_document(results):
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def write_results(path, results):
+    with open(path, "w") as f:
+        json.dump(result_document(results), f, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(baseline, current, threshold=0.15, metric="cpu_us_per_op"):
+    """
+    Compare two result sets on `metric`.
+    Returns (rows, regressed) with rows of (name, baseline, current, ratio).
+    """
+    rows = []
+    regressed = []
+
+    for name in sorted(set(baseline) & set(current)):
+        before = baseline[name][metric]
+        after = current[name][metric]
+        ratio = after / before if before else float("inf")
+        rows.append((name, before, after, ratio))
+        if ratio > 1 + threshold:
+            regressed.append(name)
+
+    return rows, regressed
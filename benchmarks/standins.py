@@ -0,0 +1,254 @@
+"""
+Offline stand-ins for the app's external services, so benchmarks run
+without network access or credentials:
+
+  - MongoDB  → mongomock (pip install -r benchmarks/requirements.txt),
+                or a local mongod
+  - R2 / S3  → in-memory object store behind boto3.client(), or a local
+                S3-compatible server
+  - PDF service → stub HTTP server on 127.0.0.1 returning a fixed PDF,
+                  with optional latency and failures
+
+install() must run before `app` or any `services.*` module is imported.
+"""
+import gzip
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from botocore.hooks import HierarchicalEmitter
+
+# ~30 KB, about the size of a rendered NDA
+STUB_PDF = b"%PDF-1.4\n" + b"0" * 30 * 1024 + b"\n%%EOF\n"
+
+
+class _Body:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+    def iter_chunks(self, chunk_size=64 * 1024):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i:i + chunk_size]
+
+
+class MemoryS3:
+    """
+    The subset of the boto3 S3 client the app uses, backed by a dict.
+    """
+
+    def __init__(self):
+        # Hooks can be registered (services.metrics does) but never fire
+        self.meta = SimpleNamespace(events=HierarchicalEmitter())
+        self.objects = {}
+        self._uploads = {}
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        data = Body if isinstance(Body, bytes) else Body.read()
+        with self._lock:
+            self.objects[Key] = data
+        return {"ETag": str(len(data))}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        data = self.objects[Key]
+        return {"Body": _Body(data), "ContentLength": len(data)}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        return {"ContentLength": len(self.objects[Key])}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        with self._lock:
+            self.objects.pop(Key, None)
+        return {}
+
+    def delete_objects(self, Bucket, Delete, **kwargs):
+        deleted = []
+        with self._lock:
+            for obj in Delete["Objects"]:
+                self.objects.pop(obj["Key"], None)
+                deleted.append({"Key": obj["Key"]})
+        return {"Deleted": deleted}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = os.urandom(8).hex()
+        self._uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        self._uploads[UploadId][PartNumber] = Body
+        return {"ETag": str(PartNumber)}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        parts = self._uploads.pop(UploadId)
+        with self._lock:
+            self.objects[Key] = b"".join(
+                parts[part["PartNumber"]] for part in MultipartUpload["Parts"]
+            )
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self._uploads.pop(UploadId, None)
+        return {}
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn=3600, **kwargs):
+        return f"https://standin.invalid/{Params['Key']}?expires={ExpiresIn}"
+
+
+class StubPDFService:
+    """
+    Threaded HTTP server answering every POST with STUB_PDF, after reading
+    (and un-gzipping) the HTML like the real service would.
+
+    `latency` (callable returning seconds) delays each answer, and a
+    `failure_rate` share of requests get `failure_status` instead, to
+    model a real renderer under load.
+    """
+
+    def __init__(self, pdf_bytes=STUB_PDF, latency=None, failure_rate=0.0,
+                 failure_status=503):
+        self.pdf_bytes = pdf_bytes
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.requests = 0
+        self.failures = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # One write per response and no Nagle, or keep-alive requests
+            # stall on delayed ACKs
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                stub.requests += 1
+
+                if stub.latency is not None:
+                    time.sleep(stub.latency())
+
+                if stub.failure_rate and random.random() < stub.failure_rate:
+                    stub.failures += 1
+                    self.send_response(stub.failure_status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/pdf")
+                self.send_header("Content-Length", str(len(stub.pdf_bytes)))
+                self.end_headers()
+                self.wfile.write(stub.pdf_bytes)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            # An async client opens hundreds of connections at once
+            request_queue_size = 1024
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/pdf"
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name="stub-pdf-service", daemon=True
+        )
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Standins:
+    def __init__(self, mongo, s3, pdf_service):
+        self.mongo = mongo
+        self.s3 = s3
+        self.pdf_service = pdf_service
+
+    @property
+    def db(self):
+        return self.mongo[os.environ["MONGO_DB_NAME"]]
+
+    def close(self):
+        self.pdf_service.close()
+
+
+_installed = None
+
+
+def install(pdf_service=None, mongo_uri=None, s3_endpoint=None, **env):
+    """
+    Patch pymongo / flask-session / boto3 to the stand-ins and set the
+    environment the app reads at import. Extra `env` entries are set too.
+    Idempotent: returns the same Standins on every call.
+
+    `pdf_service` replaces the default StubPDFService. `mongo_uri` uses a
+    real (local) MongoDB instead of mongomock, `s3_endpoint` a real
+    S3-compatible store (credentials from R2_ACCESS_KEY_ID /
+    R2_SECRET_ACCESS_KEY) instead of the in-memory one.
+    """
+    global _installed
+    if _installed is not None:
+        return _installed
+
+    import boto3
+    import pymongo
+
+    pdf_service = pdf_service or StubPDFService()
+
+    defaults = {
+        "SECRET_KEY": "benchmark",
+        "SSO_SHARED_SECRET": "benchmark",
+        "MONGO_URI": "mongodb://standin",
+        "MONGO_DB_NAME": "user_database",
+        "R2_BUCKET_NAME": "benchmark",
+        "PDF_ENGINE": "remote",
+        "PDF_SERVICE_URL": pdf_service.url,
+        "PDF_SERVICE_TOKEN": "benchmark",
+    }
+    if mongo_uri:
+        defaults["MONGO_URI"] = mongo_uri
+    if s3_endpoint:
+        defaults["R2_ENDPOINT_URL"] = s3_endpoint
+    defaults.update(env)
+    # Overwrite, never inherit: a real MONGO_URI / PDF_SERVICE_URL from the
+    # shell must not leak into an offline run (load_dotenv won't override)
+    os.environ.update(defaults)
+
+    if mongo_uri:
+        mongo = pymongo.MongoClient(mongo_uri)
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("benchmarks need mongomock: pip install -r benchmarks/requirements.txt")
+        import flask_session.mongodb.mongodb as flask_session_mongodb
+
+        mongo = mongomock.MongoClient()
+
+        # The app builds its own clients at import, hand them all the same one
+        class StandinMongoClient(mongomock.MongoClient):
+            def __new__(cls, *args, **kwargs):
+                return mongo
+
+        pymongo.MongoClient = StandinMongoClient
+        flask_session_mongodb.MongoClient = mongomock.MongoClient
+
+    if s3_endpoint:
+        s3 = None
+    else:
+        s3 = MemoryS3()
+        boto3.client = lambda *args, **kwargs: s3
+
+    _installed = Standins(mongo, s3, pdf_service)
+    return _installed
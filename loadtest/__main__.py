@@ -0,0 +1,206 @@
+"""
+End-to-end load test of the app against offline stand-ins.
+
+    python -m loadtest                                   # 8 workers, 32 users, 30 s
+    python -m loadtest --workers 4,8,16 --concurrency 64 --duration 60
+    python -m loadtest --pdf-latency-ms 800 --pdf-failure-rate 0.02
+    python -m loadtest --out loadtest.json --compare baseline.json
+
+For every worker count a fresh server process (loadtest/server.py) serves
+the real app with that many sync worker threads, against mongomock (or
+--mongo-uri), an in-memory S3 (or --s3-endpoint) and a stub PDF service
+with the given latency / failure distribution. `--concurrency` virtual
+users replay the SSO → /nda → generate → generate-pdf → my-documents
+flow back to back. Reported per endpoint: requests, errors, throughput
+and p50 / p95 / p99 latency; the warm-up is excluded.
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from benchmarks import runner
+from loadtest.flows import VirtualUser
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Expected answers; anything else counts as an error
+OK_STATUS = {"GET /sso": 302}
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}   # name -> [(seconds, status)]
+        self.recording = False
+        self._lock = threading.Lock()
+
+    def __call__(self, name, seconds, status):
+        if not self.recording:
+            return
+        with self._lock:
+            self.samples.setdefault(name, []).append((seconds, status))
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(samples, elapsed):
+    results = {}
+    for name, rows in sorted(samples.items()):
+        ok = OK_STATUS.get(name, 200)
+        latencies = [seconds * 1000 for seconds, _ in rows]
+        results[name] = {
+            "requests": len(rows),
+            "errors": sum(1 for _, status in rows if status != ok),
+            "rps": round(len(rows) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "mean_ms": round(sum(latencies) / len(latencies), 2),
+        }
+    return results
+
+
+def start_server(args, workers):
+    command = [
+        sys.executable, "-m", "loadtest.server",
+        "--workers", str(workers),
+        "--users", str(args.concurrency),
+        "--account-type", args.account_type,
+        "--pdf-latency-ms", str(args.pdf_latency_ms),
+        "--pdf-latency-dist", args.pdf_latency_dist,
+        "--pdf-latency-sigma", str(args.pdf_latency_sigma),
+        "--pdf-failure-rate", str(args.pdf_failure_rate),
+    ]
+    if args.mongo_uri:
+        command += ["--mongo-uri", args.mongo_uri]
+    if args.s3_endpoint:
+        command += ["--s3-endpoint", args.s3_endpoint]
+
+    process = subprocess.Popen(
+        command, cwd=ROOT, stdout=subprocess.PIPE, text=True,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    ready = process.stdout.readline()
+    if not ready:
+        process.wait()
+        raise SystemExit(f"load-test server exited ({process.returncode}), rerun with --verbose")
+    return process, json.loads(ready)
+
+
+def run(args, workers):
+    process, server = start_server(args, workers)
+    recorder = Recorder()
+    stop = threading.Event()
+
+    def user_loop(index, user_id):
+        user = VirtualUser(server["url"], user_id, server["sso_secret"], recorder,
+                           random.Random(index))
+        try:
+            while not stop.is_set():
+                user.run_flow()
+                if args.think_ms:
+                    stop.wait(args.think_ms / 1000)
+        finally:
+            user.close()
+
+    threads = [
+        threading.Thread(target=user_loop, args=(i, user_id), daemon=True)
+        for i, user_id in enumerate(server["users"])
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+
+        time.sleep(args.warmup)
+        recorder.recording = True
+        started = time.perf_counter()
+        time.sleep(args.duration)
+        recorder.recording = False
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=130)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    return summarize(recorder.samples, elapsed)
+
+
+def print_table(workers, results):
+    print(f"\nworkers={workers}")
+    print(f"{'endpoint':28} {'requests':>9} {'errors':>7} {'req/s':>8} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in results.items():
+        print(f"{name:28} {row['requests']:9} {row['errors']:7} {row['rps']:8.1f} "
+              f"{row['p50_ms']:9.1f} {row['p95_ms']:9.1f} {row['p99_ms']:9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--workers", default="8",
+                        help="Comma-separated worker thread counts, one run each.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Virtual users.")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds per run.")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds first.")
+    parser.add_argument("--think-ms", type=float, default=0, help="Pause between flows.")
+    parser.add_argument("--account-type", default="Premium",
+                        choices=["Premium", "Premium_contract"],
+                        help="Premium goes through the credit ledger.")
+    parser.add_argument("--pdf-latency-ms", type=float, default=300,
+                        help="Median stub render time.")
+    parser.add_argument("--pdf-latency-dist", default="lognormal",
+                        choices=["fixed", "uniform", "lognormal"])
+    parser.add_argument("--pdf-latency-sigma", type=float, default=0.5,
+                        help="Spread: lognormal sigma, or +/- fraction for uniform.")
+    parser.add_argument("--pdf-failure-rate", type=float, default=0.0,
+                        help="Share of renders answered with a 503.")
+    parser.add_argument("--mongo-uri", help="Local MongoDB instead of mongomock.")
+    parser.add_argument("--s3-endpoint", help="Local S3-compatible store instead of memory.")
+    parser.add_argument("--out", help="Write results as JSON to this file.")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="Compare against a previous --out file.")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Allowed slowdown before --compare fails (0.15 = 15%%).")
+    parser.add_argument("--metric", default="p95_ms", choices=["p50_ms", "p95_ms", "p99_ms"])
+    parser.add_argument("--verbose", action="store_true", help="Show the server's log.")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for workers in [int(count) for count in args.workers.split(",")]:
+        run_results = run(args, workers)
+        print_table(workers, run_results)
+        results.update((f"workers={workers} {name}", row) for name, row in run_results.items())
+
+    if args.out:
+        runner.write_results(args.out, results)
+        print(f"\nwrote {len(results)} results to {args.out}")
+
+    if args.compare:
+        rows, regressed = runner.compare(
+            runner.load_results(args.compare), results, args.threshold, args.metric
+        )
+        print(f"\n{'case':44} {'baseline':>10} {'current':>10} {'change':>8}")
+        for name, before, after, ratio in rows:
+            flag = "  REGRESSION" if name in regressed else ""
+            print(f"{name:44} {before:10.1f} {after:10.1f} {ratio - 1:+8.1%}{flag}")
+
+        if regressed:
+            print(f"\n{len(regressed)} endpoint(s) slower than {args.threshold:.0%} on {args.metric}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+The user journey replayed by every virtual user:
+
+    SSO → /nda → /nda/generate → /nda/generate-pdf → /nda/my-documents
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import re
+import time
+
+DRAFT_ID = re.compile(r'name="draft_id" value="([0-9a-f]+)"')
+
+FIRST_NAMES = ("Priya", "Rahul", "Ananya", "Vikram", "Meera", "Arjun", "Kavya", "Rohan")
+JURISDICTIONS = ("india_delhi", "india_mumbai", "india_bangalore", "india_pune", "india_chennai")
+
+
+def sso_token(secret, user_id, ttl=60):
+    """
+    A one-time token in the format verify_sso_token() checks.
+    """
+    payload = base64.urlsafe_b64encode(json.dumps({
+        "user_id": user_id,
+        "exp": int(time.time()) + ttl,
+        "nonce": os.urandom(8).hex(),
+    }).encode()).decode().rstrip("=")
+    signature = hmac.new(secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
+    return f"{payload}.{signature}"
+
+
+def nda_form(rng):
+    """
+    A different agreement every time, so the PDF render cache only hits
+    as often as it would in production (never, for distinct employees).
+    """
+    return {
+        "employer_name": "Acme Technologies Pvt Ltd",
+        "employee_name": f"{rng.choice(FIRST_NAMES)} {rng.randrange(10 ** 6)}",
+        "designation": "Senior Software Engineer",
+        "effective_date": "2026-01-03",
+        "jurisdiction_key": rng.choice(JURISDICTIONS),
+        "confidential[]": ["business", "clients", "technical"],
+    }
+
+
+class VirtualUser:
+    """
+    One browser: its own cookies and connection, one request at a time.
+    """
+
+    def __init__(self, base_url, user_id, sso_secret, record, rng):
+        import requests
+
+        self.base_url = base_url
+        self.user_id = user_id
+        self.sso_secret = sso_secret
+        self.record = record
+        self.rng = rng
+        self.http = requests.Session()
+
+    def request(self, name, method, path, **kwargs):
+        import requests
+
+        started = time.perf_counter()
+        try:
+            response = self.http.request(
+                method, self.base_url + path, allow_redirects=False, timeout=120, **kwargs
+            )
+            response.content  # the whole body counts
+            status = response.status_code
+        except requests.RequestException:
+            response, status = None, 0
+
+        self.record(name, time.perf_counter() - started, status)
+        return response
+
+    def run_flow(self):
+        token = sso_token(self.sso_secret, self.user_id)
+        self.request("GET /sso", "GET", "/sso", params={"token": token})
+
+        self.request("GET /nda", "GET", "/nda")
+
+        response = self.request("POST /nda/generate", "POST", "/nda/generate",
+                                data=nda_form(self.rng))
+        match = DRAFT_ID.search(response.text) if response is not None else None
+
+        if match:
+            self.request("POST /nda/generate-pdf", "POST", "/nda/generate-pdf",
+                         data={"draft_id": match.group(1), "edits": "{}"})
+
+        self.request("GET /nda/my-documents", "GET", "/nda/my-documents")
+
+    def close(self):
+        self.http.close()
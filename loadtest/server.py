@@ -0,0 +1,141 @@
+"""
+The real app served over HTTP against the offline stand-ins, for one
+load-test run. Started by `python -m loadtest` in its own process so the
+load generator doesn't share its GIL:
+
+    python -m loadtest.server --workers 8 --users 32
+
+Prints one JSON line ({"url", "users", "sso_secret"}) once it accepts
+connections, then serves until terminated.
+"""
+import argparse
+import json
+import random
+import signal
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+SSO_SECRET = "loadtest"
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    Werkzeug's server with a fixed pool of worker threads, like a sync
+    (gthread) deployment: a request holds its worker for every I/O wait,
+    and requests beyond the pool queue on the listen socket.
+    """
+
+    request_queue_size = 1024
+
+    def __init__(self, host, port, app, workers):
+        super().__init__(host, port, app, handler=QuietHandler)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wsgi-worker")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def pdf_latency(median_ms, distribution, sigma):
+    """
+    Callable returning one render delay in seconds.
+    """
+    median = median_ms / 1000
+    if distribution == "fixed" or median <= 0:
+        return lambda: median
+    if distribution == "uniform":
+        return lambda: random.uniform(median * (1 - sigma), median * (1 + sigma))
+    if distribution == "lognormal":
+        # Long right tail, like real renders: the median stays at median_ms
+        return lambda: random.lognormvariate(0, sigma) * median
+    raise ValueError(f"Unknown latency distribution: {distribution!r}")
+
+
+def seed_users(db, count, account_type):
+    return [
+        str(user_id)
+        for user_id in db["users"].insert_many([
+            {
+                "name": f"Load Test {i}",
+                "email": f"loadtest{i}@example.com",
+                "account_type": account_type,
+                "credit_contract": 10 ** 9,
+            }
+            for i in range(count)
+        ]).inserted_ids
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--users", type=int, default=32)
+    parser.add_argument("--account-type", default="Premium",
+                        choices=["Premium", "Premium_contract"])
+    parser.add_argument("--pdf-latency-ms", type=float, default=300)
+    parser.add_argument("--pdf-latency-dist", default="lognormal",
+                        choices=["fixed", "uniform", "lognormal"])
+    parser.add_argument("--pdf-latency-sigma", type=float, default=0.5)
+    parser.add_argument("--pdf-failure-rate", type=float, default=0.0)
+    parser.add_argument("--mongo-uri", help="Local MongoDB instead of mongomock.")
+    parser.add_argument("--s3-endpoint", help="Local S3-compatible store instead of memory.")
+    args = parser.parse_args(argv)
+
+    from benchmarks.standins import StubPDFService, install
+
+    standins = install(
+        pdf_service=StubPDFService(
+            latency=pdf_latency(args.pdf_latency_ms, args.pdf_latency_dist,
+                                args.pdf_latency_sigma),
+            failure_rate=args.pdf_failure_rate,
+        ),
+        mongo_uri=args.mongo_uri,
+        s3_endpoint=args.s3_endpoint,
+        SSO_SHARED_SECRET=SSO_SECRET,
+        SSO_TOKEN_LOGIN="1",
+        CLEANUP_SCHEDULER="0",
+    )
+
+    from app import app
+
+    users = seed_users(standins.db, args.users, args.account_type)
+    server = PooledWSGIServer("127.0.0.1", 0, app, args.workers)
+
+    def stop(*_):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+
+    print(json.dumps({
+        "url": f"http://127.0.0.1:{server.server_port}",
+        "users": users,
+        "sso_secret": SSO_SECRET,
+    }), flush=True)
+
+    try:
+        server.serve_forever()
+    finally:
+        server.pool.shutdown(wait=False, cancel_futures=True)
+        standins.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+"""
+asyncio twins of the NDA routes that spend their time waiting on I/O
+(PDF render, R2, Mongo), for the ASGI serving mode (asgi.py). Everything
+else in nda_bp keeps being served by the Flask app. Both sides share the
+helpers in routes/nda_routes.py and the services they call.
+"""
+import asyncio
+import unicodedata
+from functools import wraps
+from urllib.parse import quote
+
+from bson import ObjectId
+from quart import (
+    Blueprint, Response, abort, current_app, g, jsonify, redirect, render_template, request,
+    url_for
+)
+
+from routes.nda_routes import (
+    PDF_CACHE_ENABLED, apply_jurisdiction, document_history, document_record, document_summary,
+    draft_pdf_content, drafts, generate_r2_signed_url, page_limit, pdf_cache, pdf_jobs
+)
+from services import credit_ledger
+from services.agreements import agreement_types
+from services.aio import async_collection, run_blocking
+from services.audit import record_audit_event
+from services.document_listing import (
+    InvalidCursor, count_documents_async, invalidate_document_count, list_documents_async
+)
+from services.metrics import stage
+from services.nda_formatter import PDF_CSS, clause_text, format_nda_text
+from services.nda_service import build_agreement
+from services.pdf_optimize import pdf_optimizer
+from services.pdf_service import (
+    PDFServiceError, pdf_filename, render_pdf_async, save_pdf_to_r2_async
+)
+from services.user_cache import invalidate_user
+
+nda_async_bp = Blueprint("nda", __name__)
+
+
+@nda_async_bp.context_processor
+def inject_pdf_css():
+    return {"pdf_css": PDF_CSS}
+
+
+def audit_log(action):
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+
+            response = await fn(*args, **kwargs)
+
+            record_audit_event(
+                action,
+                g.user,
+                kwargs.get("doc_id"),
+                request.remote_addr,
+                request.headers.get("User-Agent"),
+            )
+
+            return response
+        return wrapper
+    return decorator
+
+
+@nda_async_bp.route("/generate", methods=["POST"])
+async def generate_nda():
+    if not g.user:
+        abort(401)
+
+    form_data = (await request.form).to_dict(flat=False)
+    apply_jurisdiction(form_data)
+
+    agreement_type = form_data.get("agreement_type", ["emp-nda"])[0]
+    if agreement_type not in agreement_types():
+        abort(400, "Unknown agreement type")
+
+    values, document = build_agreement(agreement_type, form_data)
+    draft_id = await drafts.create_async(
+        ObjectId(g.user["_id"]), agreement_type, values, document, form=form_data
+    )
+
+    return await render_template(
+        "nda_preview.html",
+        draft_id=draft_id,
+        clauses=[(clause, clause_text(clause)) for clause in document["clauses"]],
+        agreement_title=document["title"],
+        form_data=form_data,
+        account_type=g.user.get("account_type", "basic"),
+        credit_contract=g.user.get("credit_contract", 0)
+    )
+
+
+async def reserve_contract_credit(user_id, count=1):
+    allowed, mode, txn_id = await credit_ledger.reserve_async(user_id, count)
+
+    if mode == "limited":
+        invalidate_user(user_id)
+
+    return allowed, mode, txn_id
+
+
+async def rollback_contract_credit(user_id, count=1, txn_id=None):
+    await credit_ledger.rollback_async(user_id, count, txn_id)
+    invalidate_user(user_id)
+
+
+async def render_and_store_pdf(user_id, user_name, html, filename=None):
+    """
+    routes.nda_routes.render_and_store_pdf(), awaiting instead of blocking.
+    """
+    content_hash = None
+    cached = None
+    if PDF_CACHE_ENABLED:
+        with stage("pdf_cache"):
+            content_hash = pdf_cache.key_for(html)
+            cached = await pdf_cache.acquire_async(content_hash)
+
+    if cached is not None:
+        pdf_bytes, object_key = cached
+        return pdf_bytes, filename or pdf_filename(user_name), object_key, content_hash
+
+    with stage("pdf_render"):
+        pdf_bytes = await render_pdf_async(html)
+
+    # Waits on the optimizer's process pool, so from a thread
+    if pdf_optimizer is not None:
+        with stage("pdf_optimize"):
+            pdf_bytes = await asyncio.to_thread(pdf_optimizer.optimize, pdf_bytes)
+
+    with stage("r2_upload"):
+        if PDF_CACHE_ENABLED:
+            filename = filename or pdf_filename(user_name)
+            object_key = await pdf_cache.store_async(content_hash, pdf_bytes)
+        else:
+            filename, object_key = await save_pdf_to_r2_async(
+                user_id,
+                pdf_bytes,
+                user_name,
+                filename
+            )
+
+    return pdf_bytes, filename, object_key, content_hash
+
+
+async def record_document(user_id, email, user_name, filename, object_key, content_hash,
+                          document_type="EMP_NDA"):
+    with stage("record_document"):
+        result = await async_collection(document_history).insert_one(
+            document_record(
+                user_id, email, user_name, filename, object_key, content_hash, document_type
+            )
+        )
+    invalidate_document_count(user_id)
+    return result.inserted_id
+
+
+# Renders that outlive their request (see produce_document), kept
+# referenced until done: the event loop only holds tasks weakly
+_detached = set()
+
+
+async def produce_document(user_id, email, user_name, html, document_type, mode, txn_id):
+    """
+    Render, store and record one PDF. A reserved credit ends either in a
+    document or in a rollback, whatever goes wrong; run it shielded, so a
+    client hanging up mid-render does not cut it short.
+    """
+    content_hash = None
+    try:
+        pdf_bytes, filename, object_key, content_hash = await render_and_store_pdf(
+            user_id,
+            user_name,
+            html
+        )
+        await record_document(
+            user_id, email, user_name, filename, object_key, content_hash, document_type
+        )
+    except BaseException:
+        if content_hash:
+            # Stored but never recorded: nothing will release this ref
+            await run_blocking(pdf_cache.release, content_hash)
+        if mode == "limited":
+            await rollback_contract_credit(user_id, txn_id=txn_id)
+        raise
+
+    return pdf_bytes, filename
+
+
+async def pdf_content(user_id, form):
+    draft_id = form.get("draft_id")
+    if not draft_id:
+        nda_text = form.get("nda_text") or ""
+        return format_nda_text(nda_text, include_watermark=False), None, "EMP_NDA"
+
+    return draft_pdf_content(await drafts.get_async(draft_id, user_id), form.get("edits"))
+
+
+@nda_async_bp.route("/generate-pdf", methods=["POST"])
+@audit_log("document_generated")
+async def generate_pdf():
+    """
+    Same contract as the Flask view. PDF_STREAMING does not apply: a
+    render in flight here holds no worker, so the PDF is sent once stored.
+    """
+    if not g.user:
+        abort(401)
+
+    user = g.user
+    user_id = ObjectId(user["_id"])
+    user_name = user["name"]
+    email = user["email"]
+    form = await request.form
+
+    with stage("format"):
+        content, title, document_type = await pdf_content(user_id, form)
+
+    with stage("render_template"):
+        html = await render_template(
+            "nda_pdf.html",
+            content=content,
+            title=title
+        )
+
+    with stage("reserve_credit"):
+        allowed, mode, txn_id = await reserve_contract_credit(user_id)
+    if not allowed:
+        abort(403, description="Contract credits exhausted. Upgrade your plan.")
+
+    # ⏳ Async jobs go to the same queue the Flask app polls
+    if form.get("async") == "1" or "respond-async" in request.headers.get("Prefer", ""):
+        try:
+            job_id = await asyncio.to_thread(pdf_jobs.submit, user_id, {
+                "user_id": user_id,
+                "email": email,
+                "user_name": user_name,
+                "mode": mode,
+                "txn_id": txn_id,
+                "html": html,
+                "document_type": document_type,
+            })
+        except Exception as e:
+            if mode == "limited":
+                await rollback_contract_credit(user_id, txn_id=txn_id)
+
+            current_app.logger.error(f"PDF job submit failed: {e}")
+            abort(503, description="Unable to generate PDF. Please try again.")
+
+        status_url = url_for("nda.pdf_job_status", job_id=job_id)
+        response = jsonify({
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": status_url,
+            "download_url": url_for("nda.pdf_job_download", job_id=job_id),
+        })
+        response.status_code = 202
+        response.headers["Location"] = status_url
+        return response
+
+    task = asyncio.ensure_future(produce_document(
+        user_id, email, user_name, html, document_type, mode, txn_id
+    ))
+    _detached.add(task)
+    task.add_done_callback(_detached.discard)
+
+    try:
+        pdf_bytes, filename = await asyncio.shield(task)
+    except PDFServiceError as e:
+        current_app.logger.error(f"PDF service failed: {e}")
+        abort(503, description="Unable to generate PDF. Please try again.")
+
+    return pdf_attachment(pdf_bytes, filename)
+
+
+def pdf_attachment(pdf_bytes, filename):
+    """
+    The download response, with the Content-Disposition Flask's send_file
+    writes: non-ASCII names (users' names) get an ASCII fallback plus an
+    RFC 5987 filename*, where Quart's send_file would send them raw.
+    """
+    try:
+        filename.encode("ascii")
+        names = {"filename": filename}
+    except UnicodeEncodeError:
+        names = {
+            "filename": unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode(),
+            "filename*": f"UTF-8''{quote(filename, safe='!#$&+-.^_`|~')}",
+        }
+
+    response = Response(pdf_bytes, mimetype="application/pdf")
+    response.headers.set("Content-Disposition", "attachment", **names)
+    return response
+
+
+@nda_async_bp.route("/my-documents.json")
+async def my_documents_json():
+    if not g.user:
+        abort(401)
+
+    user_id = ObjectId(g.user["_id"])
+    limit = page_limit(request.args)
+
+    try:
+        documents, next_cursor = await list_documents_async(
+            user_id, request.args.get("cursor"), limit
+        )
+    except InvalidCursor:
+        abort(400, description="Invalid cursor")
+
+    return jsonify({
+        "documents": [document_summary(doc) for doc in documents],
+        "html": await render_template("partials/document_cards.html", documents=documents),
+        "next_cursor": next_cursor,
+        "total": await count_documents_async(user_id),
+    })
+
+
+@nda_async_bp.route("/document/<document_id>")
+@audit_log("document view/download")
+async def open_document(document_id):
+    if not g.user:
+        abort(401)
+
+    doc = await async_collection(document_history).find_one({
+        "_id": ObjectId(document_id),
+        "user_id": ObjectId(g.user["_id"]),
+        "status": "active"
+    })
+
+    if not doc:
+        abort(404)
+
+    file_path = doc.get("file_path")
+    if not file_path:
+        abort(404)
+
+    is_download = request.args.get("action", "view") == "download"
+
+    # Presigning is local (no R2 round trip)
+    if not file_path.startswith("http"):
+        return redirect(generate_r2_signed_url(
+            object_key=file_path,
+            expires_in=300,
+            download=is_download,
+            filename=doc.get("file_name")
+        ))
+
+    if is_download:
+        abort(400, description="Download not supported for legacy documents")
+
+    return redirect(file_path)
@@ -1,26 +1,88 @@
 from services.audit import audit_log
-from services.nda_service import generate_employment_nda
-from services.pdf_service import save_pdf_to_r2, PDFServiceError, generate_pdf_remote, r2_client
-from services.nda_formatter import format_nda_text
-from flask import Blueprint, render_template, request, send_file, g, abort, current_app, flash, redirect, url_for
+from services.metrics import stage
+from services.db import db
+from services import credit_ledger
+from services.user_cache import invalidate_user
+from services.nda_service import (
+    build_agreement, apply_clause_edits, update_agreement, parse_form_delta
+)
+from services.agreements import agreement_types
+from services.pdf_service import (
+    save_pdf_to_r2, PDFServiceError, render_pdf, r2_client, pdf_filename, safe_filename,
+    open_pdf_stream, r2_object_key, PDF_ENGINE, PDF_RENDER_TIMEOUT
+)
+from services.r2_stream import R2StreamUploader, R2UploadError
+from services.zip_stream import ZipStream
+from services.pdf_cache import PDFRenderCache
+from services.pdf_optimize import pdf_optimizer
+from services.document_cleanup import DocumentCleaner
+from services.pdf_jobs import JobQueue, MemoryJobStore, MongoJobStore
+from services.nda_formatter import (
+    format_nda_text, render_document_html, render_clause_html, clause_text, PDF_CSS
+)
+from services.drafts import DraftStore
+from services.page_cache import cached_page
+from services.document_listing import (
+    list_documents, count_documents, invalidate_document_count, InvalidCursor,
+    MY_DOCUMENTS_PAGE_SIZE
+)
+from flask import Blueprint, render_template, request, send_file, g, abort, current_app, flash, redirect, url_for, jsonify, Response
+import csv
 import io
+import itertools
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from pymongo import MongoClient
 from flask import redirect, abort, request
 from bson import ObjectId
-import boto3
 import os
 
 nda_bp = Blueprint("nda", __name__)
 
-uri = os.getenv("MONGO_URI")
 R2_BUCKET_NAME = os.getenv("R2_BUCKET_NAME")
+PDF_CACHE_ENABLED = os.getenv("PDF_CACHE_ENABLED", "1") == "1"
+PDF_CACHE_MEMORY_MB = int(os.getenv("PDF_CACHE_MEMORY_MB", "64"))
+# memory only works with a single app process: with several, a job's
+# status can be polled on a worker that never saw it. Use mongo there
+PDF_JOB_BACKEND = os.getenv("PDF_JOB_BACKEND", "memory")  # memory | mongo
+PDF_JOB_WORKERS = int(os.getenv("PDF_JOB_WORKERS", "4"))
+# A running job whose process stops renewing this is failed and refunded
+PDF_JOB_LEASE_SECONDS = int(os.getenv("PDF_JOB_LEASE_SECONDS", "120"))
+PDF_STREAMING = os.getenv("PDF_STREAMING") == "1"
+PDF_UPLOAD_PART_MB = int(os.getenv("PDF_UPLOAD_PART_MB", "8"))
+CLEANUP_BATCH_SIZE = int(os.getenv("CLEANUP_BATCH_SIZE", "500"))
+CLEANUP_KEY_RETRIES = int(os.getenv("CLEANUP_KEY_RETRIES", "3"))
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "200"))
+BULK_PDF_CONCURRENCY = int(os.getenv("BULK_PDF_CONCURRENCY", "4"))
+DRAFT_BACKEND = os.getenv("DRAFT_BACKEND", "mongo")  # mongo | memory
 
-db_client = MongoClient(uri)
-db = db_client["user_database"]
 document_history = db["document_history"]
 users_collection = db["users"]
 
+pdf_cache = PDFRenderCache(
+    db["pdf_cache"],
+    r2_client,
+    R2_BUCKET_NAME,
+    memory_bytes=PDF_CACHE_MEMORY_MB * 1024 * 1024,
+)
+
+drafts = DraftStore(db["nda_drafts"] if DRAFT_BACKEND == "mongo" else None)
+
+document_cleaner = DocumentCleaner(
+    document_history,
+    db["job_locks"],
+    r2_client,
+    R2_BUCKET_NAME,
+    pdf_cache,
+    batch_size=CLEANUP_BATCH_SIZE,
+    key_retries=CLEANUP_KEY_RETRIES,
+)
+
+@nda_bp.context_processor
+def inject_pdf_css():
+    return {"pdf_css": PDF_CSS}
+
+
 JURISDICTION_MAP = {
 
     # Tier-1 / Default
@@ -124,12 +186,9 @@ JURISDICTION_MAP = {
 
 @nda_bp.route("/")
 def nda_form():
-    return render_template("agreement.html")
-
-@nda_bp.route("/generate", methods=["POST"])
-def generate_nda():
-    form_data = request.form.to_dict(flat=False)
+    return cached_page(None, "agreement", (), lambda: render_template("agreement.html"))
 
+def apply_jurisdiction(form_data):
     jurisdiction_key = form_data.get("jurisdiction_key", [""])[0]
 
     if jurisdiction_key not in JURISDICTION_MAP:
@@ -141,17 +200,141 @@ def generate_nda():
     form_data["governing_law"] = [jurisdiction_data["governing_law"]]
     form_data["jurisdiction"] = [jurisdiction_data["jurisdiction"]]
 
-    nda_text = generate_employment_nda(form_data)
+
+@nda_bp.route("/generate", methods=["POST"])
+def generate_nda():
+    if not g.user:
+        abort(401)
+
+    form_data = request.form.to_dict(flat=False)
+    apply_jurisdiction(form_data)
+
+    agreement_type = form_data.get("agreement_type", ["emp-nda"])[0]
+    if agreement_type not in agreement_types():
+        abort(400, "Unknown agreement type")
+
+    # Structured clause tree, kept server-side and referenced by id
+    values, document = build_agreement(agreement_type, form_data)
+    draft_id = drafts.create(
+        ObjectId(g.user["_id"]), agreement_type, values, document, form=form_data
+    )
 
     return render_template(
         "nda_preview.html",
-        nda_text=nda_text,
+        draft_id=draft_id,
+        clauses=[(clause, clause_text(clause)) for clause in document["clauses"]],
+        agreement_title=document["title"],
         form_data=form_data,
         account_type=g.user.get("account_type", "basic"),
         credit_contract=g.user.get("credit_contract", 0)
     )
 
 
+def merge_preview_fields(form_data, delta):
+    """
+    Apply a live-preview delta to a stored form. Governing law and
+    jurisdiction are only ever derived from jurisdiction_key.
+    """
+    form_data = dict(form_data)
+    for key, items in delta.items():
+        if key in ("governing_law", "jurisdiction"):
+            continue
+        if items:
+            form_data[key] = items
+        else:
+            form_data.pop(key, None)
+
+    if "jurisdiction_key" in delta:
+        form_data.pop("governing_law", None)
+        form_data.pop("jurisdiction", None)
+        if form_data.get("jurisdiction_key", [""])[0]:
+            apply_jurisdiction(form_data)
+
+    return form_data
+
+
+def preview_clause(clause):
+    out = []
+    render_clause_html(clause, out)
+    return {"id": clause["id"], "html": "\n".join(out)}
+
+
+@nda_bp.route("/preview.json", methods=["POST"])
+def preview_json():
+    """
+    Live preview. The first call posts the whole form and gets every
+    clause plus a draft id; later calls post the draft id and only the
+    fields that changed, and get back only the clauses those fields feed,
+    by stable clause id, for the page to patch in place.
+    """
+    if not g.user:
+        abort(401)
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        abort(400, description="Expected a JSON object")
+
+    try:
+        delta = parse_form_delta(payload.get("fields") or {})
+    except ValueError as e:
+        abort(400, description=f"Invalid fields: {e}")
+
+    user_id = ObjectId(g.user["_id"])
+    draft_id = payload.get("draft_id")
+
+    if not draft_id:
+        agreement_type = payload.get("agreement_type") or "emp-nda"
+        if agreement_type not in agreement_types():
+            abort(400, description="Unknown agreement type")
+
+        form_data = merge_preview_fields({}, delta)
+
+        with stage("format"):
+            values, document = build_agreement(agreement_type, form_data)
+        draft_id = drafts.create(user_id, agreement_type, values, document, form=form_data)
+
+        return jsonify({
+            "draft_id": draft_id,
+            "revision": 0,
+            "clauses": [preview_clause(clause) for clause in document["clauses"]],
+        })
+
+    draft = drafts.get(draft_id, user_id)
+    if not draft or draft.get("form") is None:
+        abort(404, description="Draft expired. Please reload the preview.")
+
+    form_data = merge_preview_fields(draft["form"], delta)
+    changed = []
+    if form_data != draft["form"]:
+        with stage("format"):
+            values, document, changed = update_agreement(
+                draft["agreement_type"], form_data, draft["values"], draft["document"]
+            )
+
+        # Write back what the edit touched, not the whole clause tree
+        paths = {"form": form_data}
+        paths.update(
+            (f"values.{name}", value)
+            for name, value in values.items()
+            if draft["values"].get(name) != value
+        )
+        paths.update((f"document.clauses.{index}", document["clauses"][index]) for index in changed)
+        draft = drafts.patch(
+            draft,
+            {"form": form_data, "values": values, "document": document},
+            paths,
+        )
+        if draft is None:
+            # Another request (tab) moved the draft on since we read it
+            abort(409, description="Draft changed. Please retry.")
+
+    return jsonify({
+        "draft_id": draft_id,
+        "revision": draft.get("revision", 0),
+        "clauses": [preview_clause(draft["document"]["clauses"][index]) for index in changed],
+    })
+
+
 # @nda_bp.route("/generate", methods=["POST"])
 # def generate_nda():
 #     form_data = request.form.to_dict(flat=False)
@@ -168,43 +351,282 @@ def generate_nda():
 #         credit_contract=credit_contract
 #     )
 
-def reserve_contract_credit(user_id):
+def reserve_contract_credit(user_id, count=1):
     # user_id is already an ObjectId
+    # One atomic update decides the plan and reserves (see credit_ledger)
+    allowed, mode, txn_id = credit_ledger.reserve(user_id, count)
+
+    if mode == "limited":
+        invalidate_user(user_id)
+
+    return allowed, mode, txn_id
+
+
+def rollback_contract_credit(user_id, count=1, txn_id=None):
+    credit_ledger.rollback(user_id, count, txn_id)
+    invalidate_user(user_id)
+
+
+def render_and_store_pdf(user_id, user_name, html, filename=None):
+    """
+    Render (or reuse) the PDF for `html` and make sure it is in R2.
+    `filename` defaults to NDA_<user_name>_<timestamp>.pdf.
+    Returns (pdf_bytes, filename, object_key, content_hash).
+    Raises PDFServiceError if rendering fails.
+    """
+    # ♻️ Identical render already stored? Reuse the shared object
+    content_hash = None
+    cached = None
+    if PDF_CACHE_ENABLED:
+        with stage("pdf_cache"):
+            content_hash = pdf_cache.key_for(html)
+            cached = pdf_cache.acquire(content_hash)
+
+    if cached is not None:
+        pdf_bytes, object_key = cached
+        return pdf_bytes, filename or pdf_filename(user_name), object_key, content_hash
+
+    # 3️⃣ Generate PDF (remote service or local browser pool)
+    with stage("pdf_render"):
+        pdf_bytes = render_pdf(html)
+
+    # 🗜️ Optional size pass before storage (PDF_OPTIMIZE=1)
+    if pdf_optimizer is not None:
+        with stage("pdf_optimize"):
+            pdf_bytes = pdf_optimizer.optimize(pdf_bytes)
+
+    # 4️⃣ Upload to R2
+    with stage("r2_upload"):
+        if PDF_CACHE_ENABLED:
+            filename = filename or pdf_filename(user_name)
+            object_key = pdf_cache.store(content_hash, pdf_bytes)
+        else:
+            filename, object_key = save_pdf_to_r2(
+                user_id,
+                pdf_bytes,
+                user_name,
+                filename
+            )
 
-    # 1️⃣ Unlimited plan
-    unlimited = users_collection.find_one(
-        {
-            "_id": user_id,
-            "account_type": "Premium_contract"
-        }
+    return pdf_bytes, filename, object_key, content_hash
+
+
+def document_record(user_id, email, user_name, filename, object_key, content_hash,
+                    document_type="EMP_NDA"):
+    return {
+        "user_id": user_id,
+        "email": email,
+        "user_name": user_name,
+
+        "document_type": document_type,
+        "file_name": filename,
+        "file_path": object_key,
+        "content_hash": content_hash,
+
+        "created_at": datetime.now(),
+        "expires_at": datetime.now() + timedelta(days=30),
+        "status": "active"
+    }
+
+
+def record_document(user_id, email, user_name, filename, object_key, content_hash,
+                    document_type="EMP_NDA"):
+    # 5️⃣ Save metadata in Mongo
+    with stage("record_document"):
+        result = document_history.insert_one(
+            document_record(
+                user_id, email, user_name, filename, object_key, content_hash, document_type
+            )
+        )
+    invalidate_document_count(user_id)
+    return result.inserted_id
+
+
+def run_pdf_job(payload):
+    _, filename, object_key, content_hash = render_and_store_pdf(
+        payload["user_id"],
+        payload["user_name"],
+        payload["html"]
     )
 
-    if unlimited:
-        return True, "unlimited"
+    document_id = record_document(
+        payload["user_id"],
+        payload["email"],
+        payload["user_name"],
+        filename,
+        object_key,
+        content_hash,
+        payload.get("document_type", "EMP_NDA")
+    )
 
-    # 2️⃣ Limited plan (atomic reserve)
-    result = users_collection.find_one_and_update(
-        {
-            "_id": user_id,
-            "account_type": "Premium",
-            "credit_contract": {"$gte": 15}
-        },
-        {
-            "$inc": {"credit_contract": -15}
-        },
-        return_document=True
+    return {
+        "document_id": str(document_id),
+        "file_name": filename,
+        "file_path": object_key,
+    }
+
+
+def rollback_pdf_job(payload, error):
+    # 🔁 Rollback credit if PDF failed
+    if payload["mode"] == "limited":
+        rollback_contract_credit(payload["user_id"], txn_id=payload["txn_id"])
+
+
+if PDF_JOB_BACKEND == "mongo":
+    pdf_job_store = MongoJobStore(db["pdf_jobs"])
+else:
+    pdf_job_store = MemoryJobStore()
+
+pdf_jobs = JobQueue(
+    pdf_job_store,
+    run_pdf_job,
+    on_failure=rollback_pdf_job,
+    workers=PDF_JOB_WORKERS,
+    lease=PDF_JOB_LEASE_SECONDS,
+)
+
+if PDF_JOB_BACKEND == "mongo":
+    # Jobs may have been queued by another process
+    pdf_jobs.start()
+
+
+def wants_async():
+    if request.form.get("async") == "1":
+        return True
+    return "respond-async" in request.headers.get("Prefer", "")
+
+
+def stream_pdf(user_id, email, user_name, html, mode, txn_id, document_type="EMP_NDA"):
+    """
+    Stream a remote render to the client while uploading it to R2.
+    Memory stays bounded by the upload part size whatever the PDF size;
+    document_history is only written once the upload succeeded. Bytes go
+    out as they arrive, so PDF_OPTIMIZE does not apply here.
+    """
+    filename = pdf_filename(user_name)
+    content_hash = None
+
+    if PDF_CACHE_ENABLED:
+        content_hash = pdf_cache.key_for(html)
+        cached = pdf_cache.acquire(content_hash)
+        if cached is not None:
+            pdf_bytes, object_key = cached
+            record_document(
+                user_id, email, user_name, filename, object_key, content_hash, document_type
+            )
+            return send_file(
+                io.BytesIO(pdf_bytes),
+                mimetype="application/pdf",
+                as_attachment=True,
+                download_name=filename
+            )
+    else:
+        object_key = r2_object_key(user_id, filename)
+
+    # Fail before any byte is sent so the client gets a clean 503
+    try:
+        with stage("pdf_first_byte"):
+            chunks, content_length = open_pdf_stream(html)
+            first_chunk = next(chunks, b"")
+            if not first_chunk:
+                raise PDFServiceError("Empty PDF response")
+    except PDFServiceError as e:
+        if mode == "limited":
+            rollback_contract_credit(user_id, txn_id=txn_id)
+
+        current_app.logger.error(f"PDF service failed: {e}")
+        abort(503, description="Unable to generate PDF. Please try again.")
+
+    if content_hash:
+        # Referenced before the upload starts, released if it fails
+        object_key = pdf_cache.register(content_hash, int(content_length or 0))
+
+    uploader = R2StreamUploader(
+        r2_client,
+        R2_BUCKET_NAME,
+        object_key,
+        part_size=PDF_UPLOAD_PART_MB * 1024 * 1024,
     )
+    logger = current_app.logger
+
+    def discard(stored):
+        # Runs once the upload thread has stopped, so a late upload can't orphan the object
+        if content_hash:
+            pdf_cache.release(content_hash)
+        elif stored:
+            r2_client.delete_object(Bucket=R2_BUCKET_NAME, Key=object_key)
+
+    def generate():
+        client_connected = True
+        try:
+            for chunk in itertools.chain([first_chunk], chunks):
+                uploader.feed(chunk)
+                if client_connected:
+                    try:
+                        yield chunk
+                    except GeneratorExit:
+                        # Client went away: still finish the stored copy
+                        client_connected = False
+        except PDFServiceError as e:
+            uploader.abort(on_done=discard)
+            if mode == "limited":
+                rollback_contract_credit(user_id, txn_id=txn_id)
+            logger.error(f"PDF service failed mid-stream: {e}")
+            return
+
+        try:
+            uploader.finish(timeout=PDF_RENDER_TIMEOUT)
+        except R2UploadError as e:
+            # A timed-out upload is still running: stop it before letting go
+            uploader.abort(on_done=discard)
+            logger.error(str(e))
+            return
+
+        # 5️⃣ Commit metadata only once the object is in R2
+        record_document(
+            user_id, email, user_name, filename, object_key, content_hash, document_type
+        )
+
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if content_length:
+        headers["Content-Length"] = content_length
+
+    return Response(generate(), mimetype="application/pdf", headers=headers)
 
-    if result:
-        return True, "limited"
 
-    return False, "Contract credits exhausted"
+def pdf_content(user_id):
+    """
+    HTML body, title and document type for /generate-pdf.
+    Preview pages post a draft id plus the edited clauses (JSON map of
+    clause id -> text); a raw `nda_text` post is still accepted.
+    """
+    draft_id = request.form.get("draft_id")
+    if not draft_id:
+        nda_text = request.form.get("nda_text") or ""
+        return format_nda_text(nda_text, include_watermark=False), None, "EMP_NDA"
 
+    return draft_pdf_content(drafts.get(draft_id, user_id), request.form.get("edits"))
 
-def rollback_contract_credit(user_id):
-    users_collection.update_one(
-        {"_id": user_id, "account_type": "Premium"},
-        {"$inc": {"credit_contract": 15}}
+
+def draft_pdf_content(draft, raw_edits):
+    """
+    pdf_content() once the draft is loaded: `raw_edits` is the posted JSON.
+    """
+    if not draft:
+        abort(400, description="Draft expired. Please generate the agreement again.")
+
+    try:
+        edits = json.loads(raw_edits or "{}")
+        if not isinstance(edits, dict):
+            raise ValueError("edits must be an object")
+        document = apply_clause_edits(draft["document"], edits)
+    except ValueError as e:
+        abort(400, description=f"Invalid clause edits: {e}")
+
+    return (
+        render_document_html(document, include_watermark=False),
+        document["title"],
+        document["document_type"],
     )
 
 
@@ -219,53 +641,75 @@ def generate_pdf():
     user_name = user["name"]
     email = user["email"]
 
+    # 2️⃣ Format NDA (validated before any credit is taken)
+    with stage("format"):
+        content, title, document_type = pdf_content(user_id)
+
+    with stage("render_template"):
+        html = render_template(
+            "nda_pdf.html",
+            content=content,
+            title=title
+        )
+
     # 🔐 STEP 1: Plan + Credit Validation (BEFORE PDF generation)
-    allowed, mode = reserve_contract_credit(user_id)
+    with stage("reserve_credit"):
+        allowed, mode, txn_id = reserve_contract_credit(user_id)
     if not allowed:
         abort(403, description="Contract credits exhausted. Upgrade your plan.")
 
-    nda_text = request.form.get("nda_text")
-
-    # 2️⃣ Format NDA
-    formatted_clauses = format_nda_text(nda_text, include_watermark=False)
-
-    html = render_template(
-        "nda_pdf.html",
-        content=formatted_clauses
-    )
+    # ⏳ Async mode: hand off to the worker pool, client polls the job
+    if wants_async():
+        try:
+            job_id = pdf_jobs.submit(user_id, {
+                "user_id": user_id,
+                "email": email,
+                "user_name": user_name,
+                "mode": mode,
+                "txn_id": txn_id,
+                "html": html,
+                "document_type": document_type,
+            })
+        except Exception as e:
+            if mode == "limited":
+                rollback_contract_credit(user_id, txn_id=txn_id)
+
+            current_app.logger.error(f"PDF job submit failed: {e}")
+            abort(503, description="Unable to generate PDF. Please try again.")
+
+        status_url = url_for("nda.pdf_job_status", job_id=job_id)
+        response = jsonify({
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": status_url,
+            "download_url": url_for("nda.pdf_job_download", job_id=job_id),
+        })
+        response.status_code = 202
+        response.headers["Location"] = status_url
+        return response
+
+    # 📤 Streaming mode: tee the remote render to the client and R2
+    if PDF_STREAMING and PDF_ENGINE == "remote":
+        return stream_pdf(user_id, email, user_name, html, mode, txn_id, document_type)
 
-    # 3️⃣ Generate PDF (REMOTE SERVICE)
     try:
-        pdf_bytes = generate_pdf_remote(html)
+        pdf_bytes, filename, object_key, content_hash = render_and_store_pdf(
+            user_id,
+            user_name,
+            html
+        )
     except PDFServiceError as e:
         # 🔁 Rollback credit if PDF failed
         if mode == "limited":
-            rollback_contract_credit(user_id)
+            rollback_contract_credit(user_id, txn_id=txn_id)
 
         current_app.logger.error(f"PDF service failed: {e}")
         abort(503, description="Unable to generate PDF. Please try again.")
 
-    filename, object_key = save_pdf_to_r2(
-        user_id,
-        pdf_bytes,
-        user_name
+    record_document(
+        user_id, email, user_name, filename, object_key, content_hash, document_type
     )
 
-    # 5️⃣ Save metadata in Mongo
-    document_history.insert_one({
-        "user_id": user_id,
-        "email": email,
-        "user_name": user_name,
-
-        "document_type": "EMP_NDA",
-        "file_name": filename,
-        "file_path": object_key,
-
-        "created_at": datetime.now(),
-        "expires_at": datetime.now() + timedelta(days=30),
-        "status": "active"
-    })
-
     # 6️⃣ Return PDF
     return send_file(
         io.BytesIO(pdf_bytes),
@@ -275,50 +719,317 @@ def generate_pdf():
     )
 
 
-@nda_bp.route("/my-documents")
-def my_documents():
+def get_user_job(job_id):
     if not g.user:
         abort(401)
 
-    user_id = ObjectId(g.user["_id"])
+    job = pdf_jobs.get(job_id)
+    if not job or job["user_id"] != ObjectId(g.user["_id"]):
+        abort(404)
 
-    docs_cursor = document_history.find(
-        {"user_id": user_id}
-    ).sort("created_at", -1)
+    return job
 
-    documents = list(docs_cursor)  # ✅ FIX
 
-    return render_template(
-        "my_documents.html",
-        documents=documents
+@nda_bp.route("/jobs/<job_id>")
+def pdf_job_status(job_id):
+    job = get_user_job(job_id)
+
+    body = {
+        "job_id": job["_id"],
+        "status": job["status"],
+    }
+
+    if job["status"] == "done":
+        body["document_id"] = job["result"]["document_id"]
+        body["download_url"] = url_for("nda.pdf_job_download", job_id=job_id)
+    elif job["status"] == "failed":
+        body["error"] = "Unable to generate PDF. Please try again."
+
+    return jsonify(body)
+
+
+@nda_bp.route("/jobs/<job_id>/download")
+def pdf_job_download(job_id):
+    job = get_user_job(job_id)
+
+    if job["status"] == "failed":
+        abort(503, description="Unable to generate PDF. Please try again.")
+
+    if job["status"] != "done":
+        response = jsonify({"job_id": job_id, "status": job["status"]})
+        response.status_code = 202
+        response.headers["Retry-After"] = "2"
+        return response
+
+    result = job["result"]
+    obj = r2_client.get_object(
+        Bucket=R2_BUCKET_NAME,
+        Key=result["file_path"]
     )
 
-def cleanup_expired_documents():
-    now = datetime.now()
+    # 📤 Stream straight from R2, never buffer the whole PDF
+    return Response(
+        obj["Body"].iter_chunks(chunk_size=64 * 1024),
+        mimetype="application/pdf",
+        headers={
+            "Content-Disposition": f'attachment; filename="{result["file_name"]}"',
+            "Content-Length": str(obj["ContentLength"]),
+        },
+    )
 
-    expired_docs = document_history.find({
-        "expires_at": {"$lte": now},
-        "status": "active"
-    })
 
-    for doc in expired_docs:
-        object_key = doc.get("file_path")
+BULK_ROSTER_FIELDS = ("employee_name", "designation", "effective_date")
+
+
+def read_roster(file_storage):
+    """
+    Parse an uploaded CSV roster into a list of row dicts, reading it
+    row by row: an oversized roster is refused at row BULK_MAX_ROWS + 1,
+    not after decoding and parsing all of it.
+    Aborts with 400 on a malformed or oversized roster.
+    """
+    text = io.TextIOWrapper(file_storage.stream, encoding="utf-8-sig", newline="")
+    rows = []
+
+    try:
+        reader = csv.DictReader(text)
+        header = [(name or "").strip() for name in (reader.fieldnames or [])]
+        missing = [field for field in BULK_ROSTER_FIELDS if field not in header]
+        if missing:
+            abort(400, description=f"Roster is missing columns: {', '.join(missing)}")
+
+        for row in reader:
+            row = {(k or "").strip(): (v or "").strip() for k, v in row.items()}
+            if not any(row.get(field) for field in BULK_ROSTER_FIELDS):
+                continue  # skip blank lines
+            if not row.get("employee_name"):
+                abort(400, description=f"Row {len(rows) + 2}: employee_name is required")
+            if len(rows) == BULK_MAX_ROWS:
+                abort(400, description=f"Roster exceeds {BULK_MAX_ROWS} rows")
+            rows.append(row)
+    except UnicodeDecodeError:
+        abort(400, description="Roster must be a UTF-8 CSV file")
+    except csv.Error as e:
+        abort(400, description=f"Malformed roster: {e}")
+
+    if not rows:
+        abort(400, description="Roster is empty")
+
+    return rows
+
+
+@nda_bp.route("/bulk-generate", methods=["POST"])
+@audit_log("bulk_documents_generated")
+def bulk_generate_pdf():
+    if not g.user:
+        abort(401)
+
+    user = g.user
+    user_id = ObjectId(user["_id"])
+    user_name = user["name"]
+    email = user["email"]
+
+    roster = request.files.get("roster")
+    if not roster:
+        abort(400, description="Roster CSV is required")
+
+    form_data = request.form.to_dict(flat=False)
+    apply_jurisdiction(form_data)
+
+    if not form_data.get("employer_name", [""])[0].strip():
+        abort(400, description="employer_name is required")
+
+    rows = read_roster(roster)
+
+    # 🔐 Reserve credits for the whole batch in one go
+    allowed, mode, txn_id = reserve_contract_credit(user_id, count=len(rows))
+    if not allowed:
+        abort(403, description="Contract credits exhausted. Upgrade your plan.")
+
+    # Build every agreement up front (cheap, needs the request context)
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    jobs = []
+    for i, row in enumerate(rows, start=1):
+        row_data = dict(form_data)
+        for field in BULK_ROSTER_FIELDS:
+            row_data[field] = [row.get(field, "")]
+
+        _, document = build_agreement("emp-nda", row_data)
+        html = render_template(
+            "nda_pdf.html",
+            content=render_document_html(document, include_watermark=False),
+            title=document["title"]
+        )
+        filename = f"NDA_{safe_filename(row['employee_name'])}_{timestamp}_{i}.pdf"
+        jobs.append((row["employee_name"], filename, html))
+
+    logger = current_app.logger
+
+    def generate():
+        archive = ZipStream()
+        records = []
+        failures = []
+        executor = ThreadPoolExecutor(max_workers=BULK_PDF_CONCURRENCY)
 
-        # 🔥 Delete from R2
-        if object_key:
+        futures = {
+            executor.submit(render_and_store_pdf, user_id, user_name, html, filename): employee_name
+            for employee_name, filename, html in jobs
+        }
+        pending = set(futures)
+
+        def collect(future):
+            pending.discard(future)
             try:
-                r2_client.delete_object(
-                    Bucket=R2_BUCKET_NAME,
-                    Key=object_key
-                )
+                pdf_bytes, filename, object_key, content_hash = future.result()
             except Exception as e:
-                current_app.logger.error(
-                    f"Failed to delete expired R2 object {object_key}: {e}"
+                logger.error(f"Bulk PDF failed for {futures[future]}: {e}")
+                failures.append(futures[future])
+                return None, None
+
+            records.append(document_record(
+                user_id, email, user_name, filename, object_key, content_hash
+            ))
+            return filename, pdf_bytes
+
+        try:
+            # 📦 Stream each PDF into the ZIP as soon as it is ready
+            for future in as_completed(futures):
+                filename, pdf_bytes = collect(future)
+                if filename:
+                    yield archive.add(filename, pdf_bytes)
+
+            if failures:
+                yield archive.add(
+                    "FAILED.txt",
+                    ("Could not generate:\n" + "\n".join(failures) + "\n").encode()
                 )
-                continue  # don't block cleanup
 
-        # 🗑️ Remove DB record
-        document_history.delete_one({"_id": doc["_id"]})
+            yield archive.close()
+
+        finally:
+            # Client may have disconnected mid-stream: drop what never
+            # started, keep what was already stored
+            for future in list(pending):
+                if future.cancel():
+                    pending.discard(future)
+                    failures.append(futures[future])
+            executor.shutdown(wait=True)
+            for future in list(pending):
+                collect(future)
+
+            # 🔁 Partial rollback for documents that were not produced
+            if failures and mode == "limited":
+                rollback_contract_credit(user_id, count=len(failures), txn_id=txn_id)
+
+            # 5️⃣ One bulk insert for the whole batch
+            if records:
+                document_history.insert_many(records)
+                invalidate_document_count(user_id)
+
+    return Response(
+        generate(),
+        mimetype="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="NDA_bulk_{timestamp}.zip"',
+        },
+    )
+
+
+@nda_bp.route("/my-documents")
+def my_documents():
+    if not g.user:
+        abort(401)
+
+    user_id = ObjectId(g.user["_id"])
+    documents, next_cursor = documents_page(user_id)
+    total_documents = count_documents(user_id)
+
+    # The page query is a small indexed read; what a 304 saves is the
+    # render and the bytes. The ETag covers every field the cards show.
+    return cached_page(
+        user_id,
+        "my_documents",
+        (
+            [
+                (doc["_id"], doc.get("document_type"), doc.get("user_name"),
+                 doc.get("created_at"), doc.get("expires_at"), doc.get("status"))
+                for doc in documents
+            ],
+            next_cursor,
+            total_documents,
+        ),
+        lambda: render_template(
+            "my_documents.html",
+            documents=documents,
+            next_cursor=next_cursor,
+            total_documents=total_documents
+        )
+    )
+
+
+@nda_bp.route("/my-documents.json")
+def my_documents_json():
+    """
+    Infinite-scroll variant: the same pages, as JSON plus the rendered cards.
+    """
+    if not g.user:
+        abort(401)
+
+    user_id = ObjectId(g.user["_id"])
+    documents, next_cursor = documents_page(user_id)
+
+    return jsonify({
+        "documents": [document_summary(doc) for doc in documents],
+        "html": render_template("partials/document_cards.html", documents=documents),
+        "next_cursor": next_cursor,
+        "total": count_documents(user_id),
+    })
+
+
+def document_summary(doc):
+    return {
+        "id": str(doc["_id"]),
+        "document_type": doc.get("document_type"),
+        "user_name": doc.get("user_name"),
+        "created_at": doc["created_at"].isoformat() if doc.get("created_at") else None,
+        "expires_at": doc["expires_at"].isoformat() if doc.get("expires_at") else None,
+        "status": doc.get("status"),
+    }
+
+
+def page_limit(args):
+    try:
+        return int(args.get("limit", MY_DOCUMENTS_PAGE_SIZE))
+    except ValueError:
+        abort(400, description="Invalid limit")
+
+
+def documents_page(user_id):
+    limit = page_limit(request.args)
+
+    try:
+        return list_documents(user_id, request.args.get("cursor"), limit)
+    except InvalidCursor:
+        abort(400, description="Invalid cursor")
+
+def delete_document_object(doc):
+    """
+    Remove the R2 object behind a document_history entry.
+    Shared (content-addressed) renders only go once nothing references them.
+    """
+    content_hash = doc.get("content_hash")
+    if content_hash:
+        pdf_cache.release(content_hash)
+        return
+
+    r2_client.delete_object(
+        Bucket=R2_BUCKET_NAME,
+        Key=doc["file_path"]
+    )
+
+
+def cleanup_expired_documents(max_batches=None, time_budget=None):
+    return document_cleaner.run(max_batches=max_batches, time_budget=time_budget)
 
 
 def generate_r2_signed_url(
@@ -407,16 +1118,14 @@ def delete_document(doc_id):
     # 🔥 Delete from R2
     if object_key:
         try:
-            r2_client.delete_object(
-                Bucket=R2_BUCKET_NAME,
-                Key=object_key
-            )
+            delete_document_object(doc)
         except Exception as e:
             current_app.logger.error(f"R2 delete failed: {e}")
             abort(500, description="Unable to delete document")
 
     # 🗑️ Delete metadata
     document_history.delete_one({"_id": doc["_id"]})
+    invalidate_document_count(doc["user_id"])
 
     flash("Document deleted successfully", "success")
     return redirect(url_for("nda.my_documents"))
@@ -0,0 +1,11 @@
+from services.agreements.registry import (
+    AgreementType,
+    Clause,
+    TemplateError,
+    agreement_types,
+    get_agreement,
+    register_agreement,
+)
+
+# Importing a module registers its agreement type (compiled once, here)
+from services.agreements import emp_nda, employment_agreement  # noqa: F401
@@ -0,0 +1,135 @@
+from services.agreements.fields import date_field, text_field
+from services.agreements.registry import AgreementType, Clause, register_agreement
+
+DEFAULT_CONFIDENTIAL_TEXT = (
+    "business plans, source code, software architecture, algorithms, "
+    "trade secrets, customer and vendor data, financial information, "
+    "internal documents, processes, policies, product designs, "
+    "and proprietary technical or commercial information"
+)
+
+
+def confidential_text(data):
+    confidential_items = data.get("confidential[]", [])
+    if confidential_items:
+        return ", ".join(confidential_items)
+    return DEFAULT_CONFIDENTIAL_TEXT
+
+
+EMP_NDA = register_agreement(AgreementType(
+    key="emp-nda",
+    title="Employee Non-Disclosure Agreement",
+    document_type="EMP_NDA",
+    fields={
+        "employer_name": text_field("employer_name"),
+        "employee_name": text_field("employee_name"),
+        "designation": text_field("designation"),
+        "effective_date": date_field("effective_date"),
+        "governing_law": text_field("governing_law", "laws of India"),
+        "jurisdiction": text_field("jurisdiction", "Courts at New Delhi"),
+        "confidential_text": confidential_text,
+    },
+    clauses=[
+        Clause("preamble", """
+This Employment Non-Disclosure Agreement (“Agreement”) is entered into on
+{effective_date} between {employer_name}, a company incorporated
+under the laws of India, and {employee_name}, employed as {designation}.
+"""),
+
+        Clause("purpose", heading="Purpose and Consideration", body="""
+In the course of Employee’s employment, and in consideration of Employee’s employment,
+continued employment, access to Confidential Information, and other good and valuable
+consideration, the receipt and sufficiency of which are hereby acknowledged, Employee
+agrees to comply with the obligations set out in this Agreement.
+"""),
+
+        Clause("definition", heading="Definition of Confidential Information", body="""
+“Confidential Information” means all information, whether written, electronic, oral,
+visual, or in any other form, disclosed to Employee by the Company or accessed by Employee
+during employment, that is not generally available to the public and is reasonably
+understood to be confidential, including but not limited to: {confidential_text}.
+
+Confidential Information does not include information that:
+(a) is publicly available through no fault of the Employee;
+(b) was lawfully known to the Employee prior to disclosure by the Company;
+(c) is lawfully received from a third party without breach of any obligation; or
+(d) is required to be disclosed pursuant to law, regulation, or court order,
+provided the Employee gives prompt written notice to the Company where legally permissible.
+"""),
+
+        Clause("non_disclosure", heading="Non-Disclosure and Limited Use", body="""
+The Employee shall not, directly or indirectly, during or after employment, disclose,
+publish, communicate, or make available any Confidential Information to any third party,
+or use such Confidential Information for any purpose other than in the ordinary course
+of performing duties for the Company, without the prior written consent of the Company.
+"""),
+
+        Clause("ownership", heading="Ownership of Confidential Information", body="""
+All Confidential Information shall remain the exclusive property of the Company.
+Nothing in this Agreement shall be construed as granting the Employee any license or
+ownership rights in the Confidential Information except as strictly required for the
+performance of employment duties.
+"""),
+
+        Clause("third_parties", heading="Confidential Information of Third Parties", body="""
+The Employee agrees not to improperly use or disclose any confidential or proprietary
+information belonging to any third party that the Employee may access in the course
+of employment with the Company.
+"""),
+
+        Clause("return_property", heading="Return of Company Property", body="""
+Upon termination of employment for any reason, or upon the Company’s request, the
+Employee shall promptly return all documents, data, records, devices, and materials
+containing Confidential Information, whether in physical or electronic form, and shall
+not retain any copies thereof.
+"""),
+
+        Clause("survival", heading="Survival of Obligations", body="""
+The obligations under this Agreement shall survive termination of employment and shall
+continue for so long as the Confidential Information remains confidential under
+applicable law.
+"""),
+
+        Clause("remedies", heading="Remedies", body="""
+The Employee acknowledges that any breach or threatened breach of this Agreement may
+cause irreparable harm to the Company for which monetary damages may be inadequate.
+Accordingly, the Company shall be entitled to seek injunctive, equitable, and other
+appropriate relief, in addition to any other remedies available at law.
+"""),
+
+        Clause("general", heading="General Provisions", body="""
+(a) Severability: If any provision of this Agreement is held unenforceable, the
+remaining provisions shall continue in full force and effect.
+
+(b) Entire Agreement: This Agreement constitutes the entire agreement between the
+parties with respect to confidentiality and supersedes all prior agreements or
+understandings on the subject.
+
+(c) Waiver: The failure of either party to enforce any provision shall not constitute
+a waiver of such provision.
+
+(d) Governing Law: This Agreement shall be governed by and construed in accordance with
+the {governing_law}.
+
+(e) Jurisdiction: {jurisdiction} shall have exclusive jurisdiction.
+"""),
+
+        Clause("execution", """
+IN WITNESS WHEREOF, the parties have executed this Agreement as of the Effective Date.
+"""),
+
+        Clause("signatures", layout="lines", body="""
+Employee:
+Signature: ______________________
+Name: {employee_name}
+Designation: {designation}
+Date: ______________________
+
+Company:
+Signature: ______________________
+Name: {employer_name}
+Designation: ____________________
+Date: ______________________
+"""),
+    ],
+))
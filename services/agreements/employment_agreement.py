@@ -0,0 +1,105 @@
+from services.agreements.fields import date_field, text_field
+from services.agreements.registry import AgreementType, Clause, register_agreement
+
+
+EMPLOYMENT_AGREEMENT = register_agreement(AgreementType(
+    key="employment-agreement",
+    title="Employment Agreement",
+    document_type="EMP_AGREEMENT",
+    fields={
+        "employer_name": text_field("employer_name"),
+        "employee_name": text_field("employee_name"),
+        "designation": text_field("designation"),
+        "effective_date": date_field("effective_date"),
+        "work_location": text_field("work_location", "the Company’s registered office"),
+        "annual_ctc": text_field("annual_ctc", "__________"),
+        "probation_months": text_field("probation_months", "6"),
+        "notice_period": text_field("notice_period", "30 days"),
+        "governing_law": text_field("governing_law", "laws of India"),
+        "jurisdiction": text_field("jurisdiction", "Courts at New Delhi"),
+    },
+    clauses=[
+        Clause("preamble", """
+This Employment Agreement (“Agreement”) is entered into on {effective_date} between
+{employer_name}, a company incorporated under the laws of India (“Company”), and
+{employee_name} (“Employee”).
+"""),
+
+        Clause("appointment", heading="Appointment", body="""
+The Company appoints the Employee as {designation}, and the Employee accepts such
+appointment, on the terms set out in this Agreement, with effect from {effective_date}.
+The Employee shall ordinarily be based at {work_location}.
+"""),
+
+        Clause("probation", heading="Probation", body="""
+The Employee shall be on probation for {probation_months} months from the date of joining.
+The Company may confirm, extend, or terminate the employment during or at the end of the
+probation period based on the Employee’s performance and conduct.
+"""),
+
+        Clause("duties", heading="Duties and Responsibilities", body="""
+The Employee shall perform the duties reasonably assigned by the Company from time to time,
+devote full working time and attention to the business of the Company, and comply with all
+lawful instructions, policies, and codes of conduct of the Company.
+"""),
+
+        Clause("compensation", heading="Compensation", body="""
+The Employee shall be entitled to an annual cost to company of {annual_ctc}, payable in
+accordance with the Company’s payroll practices and subject to deductions required by law.
+Any bonus or incentive is at the sole discretion of the Company unless agreed in writing.
+"""),
+
+        Clause("leave", heading="Working Hours and Leave", body="""
+The Employee shall observe the working hours and be entitled to the holidays and leave
+set out in the Company’s policies, as amended from time to time, and in accordance with
+applicable law.
+"""),
+
+        Clause("confidentiality", heading="Confidentiality", body="""
+The Employee shall not, during or after employment, disclose or use any confidential or
+proprietary information of the Company except as required for the performance of duties.
+This obligation is in addition to any separate confidentiality or non-disclosure agreement
+between the parties.
+"""),
+
+        Clause("intellectual_property", heading="Intellectual Property", body="""
+All work product, inventions, software, designs, and other intellectual property created by
+the Employee in the course of employment shall vest exclusively in the Company, and the
+Employee shall execute all documents reasonably required to give effect to this clause.
+"""),
+
+        Clause("non_solicitation", heading="Non-Solicitation", body="""
+During employment and for twelve months thereafter, the Employee shall not solicit any
+employee, customer, or vendor of the Company to terminate or reduce their relationship
+with the Company.
+"""),
+
+        Clause("termination", heading="Termination", body="""
+After confirmation, either party may terminate this Agreement by giving {notice_period}
+written notice or payment in lieu of notice. The Company may terminate the employment
+without notice for misconduct, breach of this Agreement, or any other cause permitted by law.
+"""),
+
+        Clause("general", heading="Governing Law and Jurisdiction", body="""
+This Agreement shall be governed by and construed in accordance with the {governing_law}.
+{jurisdiction} shall have exclusive jurisdiction.
+"""),
+
+        Clause("execution", """
+IN WITNESS WHEREOF, the parties have executed this Agreement as of the date first written above.
+"""),
+
+        Clause("signatures", layout="lines", body="""
+Employee:
+Signature: ______________________
+Name: {employee_name}
+Date: ______________________
+
+Company:
+Signature: ______________________
+Name: {employer_name}
+Designation: ____________________
+Date: ______________________
+"""),
+    ],
+))
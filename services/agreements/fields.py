@@ -0,0 +1,39 @@
+from datetime import datetime
+from functools import lru_cache
+
+
+def get_value(data, key, default=""):
+    """
+    First value of a multi-valued form field, stripped.
+    """
+    return data.get(key, [default])[0].strip()
+
+
+@lru_cache(maxsize=1024)
+def normalize_date(date_str: str) -> str:
+    """
+    Normalizes date input to 'DD Month YYYY' format.
+    Accepts messy inputs like '2026-01-03', '2026-01-\n03'.
+    Falls back safely if parsing fails.
+    """
+    if not date_str:
+        return "__________"
+
+    cleaned = date_str.replace("\n", "").strip()
+
+    try:
+        return datetime.strptime(cleaned, "%Y-%m-%d").strftime("%d %B %Y")
+    except Exception:
+        return cleaned
+
+
+def text_field(key, default=""):
+    def resolve(data):
+        return get_value(data, key, default)
+    return resolve
+
+
+def date_field(key):
+    def resolve(data):
+        return normalize_date(get_value(data, key, ""))
+    return resolve
@@ -0,0 +1,229 @@
+import re
+from string import Formatter
+
+# "(a) ..." starts a list item inside a clause body
+LIST_ITEM = re.compile(r"^\([a-z]\)\s")
+
+
+class TemplateError(Exception):
+    pass
+
+
+class CompiledTemplate:
+    """
+    A clause template parsed once into literal / field segments and compiled
+    into a single join over them, no re-parsing per request.
+    """
+
+    __slots__ = ("source", "segments", "fields", "render")
+
+    def __init__(self, source: str):
+        self.source = source
+        self.segments = []
+        fields = []
+
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if literal:
+                self.segments.append((True, literal))
+            if field is None:
+                continue
+            if not field.isidentifier() or spec or conversion:
+                raise TemplateError(f"Unsupported placeholder {{{field}}} in clause template")
+            self.segments.append((False, field))
+            fields.append(field)
+
+        self.fields = tuple(dict.fromkeys(fields))
+        self.render = self._compile()
+
+    def _compile(self):
+        namespace = {}
+        parts = []
+
+        for i, (is_literal, value) in enumerate(self.segments):
+            if is_literal:
+                namespace[f"_s{i}"] = value
+                parts.append(f"_s{i}")
+            else:
+                parts.append(f"values[{value!r}]")
+
+        source = f"def render(values):\n    return ''.join(({', '.join(parts)},))\n"
+        if not parts:
+            source = "def render(values):\n    return ''\n"
+
+        exec(compile(source, "<clause template>", "exec"), namespace)
+        return namespace["render"]
+
+
+def compile_blocks(source, layout):
+    """
+    Split a clause body into structural blocks once, at startup:
+      ("p", template)               paragraph, hard-wrapped lines reflowed
+      ("list", [template, ...])     "(a) ..." items
+      ("lines", [template, ...])    line breaks kept (signature blocks)
+    """
+    blocks = []
+
+    for chunk in source.split("\n\n"):
+        lines = [line.strip() for line in chunk.split("\n") if line.strip()]
+        if not lines:
+            continue
+
+        if layout == "lines":
+            blocks.append(("lines", [CompiledTemplate(line) for line in lines]))
+            continue
+
+        lead, items = [], []
+        for line in lines:
+            if LIST_ITEM.match(line):
+                items.append([line])
+            elif items:
+                items[-1].append(line)
+            else:
+                lead.append(line)
+
+        if lead:
+            blocks.append(("p", CompiledTemplate(" ".join(lead))))
+        if items:
+            templates = [CompiledTemplate(" ".join(item)) for item in items]
+            # "(a)" / "(b)" paragraphs in a row form one list
+            if blocks and blocks[-1][0] == "list" and not lead:
+                blocks[-1][1].extend(templates)
+            else:
+                blocks.append(("list", templates))
+
+    return blocks
+
+
+class Clause:
+    """
+    One clause of an agreement. Numbered clauses get an "N. Heading" line,
+    numbering follows their order in the agreement.
+    `layout="lines"` keeps the body's line breaks in the document model.
+    """
+
+    __slots__ = ("id", "heading", "body", "numbered", "blocks")
+
+    def __init__(self, id, body, heading=None, numbered=None, layout="flow"):
+        self.id = id
+        self.heading = heading
+        self.body = CompiledTemplate(body.strip("\n"))
+        self.numbered = heading is not None if numbered is None else numbered
+        self.blocks = compile_blocks(self.body.source, layout)
+
+    def render_blocks(self, values):
+        blocks = []
+        for kind, template in self.blocks:
+            if kind == "p":
+                blocks.append({"t": "p", "text": template.render(values)})
+            else:
+                blocks.append({"t": kind, "items": [item.render(values) for item in template]})
+        return blocks
+
+
+class AgreementType:
+    """
+    An agreement built from clause templates.
+
+    `fields` maps a template placeholder to a resolver taking the raw
+    multi-valued form data (`request.form.to_dict(flat=False)`).
+    """
+
+    def __init__(self, key, title, document_type, fields, clauses):
+        self.key = key
+        self.title = title
+        self.document_type = document_type
+        self.fields = dict(fields)
+        self.clauses = tuple(clauses)
+
+        missing = {
+            name
+            for clause in self.clauses
+            for name in clause.body.fields
+            if name not in self.fields
+        }
+        if missing:
+            raise TemplateError(f"{key}: no resolver for {', '.join(sorted(missing))}")
+
+        # Headings are static, number them once
+        self.headings = []
+        number = 0
+        for clause in self.clauses:
+            if clause.numbered:
+                number += 1
+                self.headings.append(f"{number}. {clause.heading}")
+            else:
+                self.headings.append(clause.heading)
+
+        # Whole document as one template: one join per render
+        document = []
+        for clause, heading in zip(self.clauses, self.headings):
+            if heading:
+                document.append(heading.replace("{", "{{").replace("}", "}}"))
+            document.append(clause.body.source)
+        self.document = CompiledTemplate("\n\n".join(document))
+
+    def resolve(self, data):
+        return {name: resolve(data) for name, resolve in self.fields.items()}
+
+    def render_clauses(self, data):
+        """
+        Returns [(clause, heading, body_text)] for the given form data.
+        """
+        values = self.resolve(data)
+        return [
+            (clause, heading, clause.body.render(values))
+            for clause, heading in zip(self.clauses, self.headings)
+        ]
+
+    def render_text(self, data) -> str:
+        return self.document.render(self.resolve(data)).strip()
+
+    def changed_clauses(self, old_values, values):
+        """
+        Indexes of the clauses whose placeholders resolve differently
+        between two `resolve()` results.
+        """
+        changed = {name for name in self.fields if old_values.get(name) != values.get(name)}
+        return [
+            index
+            for index, clause in enumerate(self.clauses)
+            if not changed.isdisjoint(clause.body.fields)
+        ]
+
+    def build_clause(self, index, values):
+        clause = self.clauses[index]
+        return {
+            "id": clause.id,
+            "heading": self.headings[index],
+            "blocks": clause.render_blocks(values),
+        }
+
+    def build_document(self, data, values=None):
+        """
+        Structured document model: title + clause tree with stable clause ids.
+        """
+        values = values if values is not None else self.resolve(data)
+        return {
+            "type": self.key,
+            "title": self.title,
+            "document_type": self.document_type,
+            "clauses": [self.build_clause(i, values) for i in range(len(self.clauses))],
+        }
+
+
+_registry = {}
+
+
+def register_agreement(agreement: AgreementType):
+    if agreement.key in _registry:
+        raise ValueError(f"Agreement type {agreement.key} already registered")
+    _registry[agreement.key] = agreement
+    return agreement
+
+
+def get_agreement(key) -> AgreementType:
+    return _registry[key]
+
+
+def agreement_types():
+    return dict(_registry)
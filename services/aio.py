@@ -0,0 +1,84 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from services.db import MONGO_CLIENT_OPTIONS, MONGO_DB_NAME, MONGO_URI
+from services.lazy import LazyProxy
+from services.metrics import mongo_event_listeners
+
+# Threads for blocking SDK calls made from the event loop (boto3 has no
+# asyncio API): bounds concurrent R2 requests per process
+R2_ASYNC_THREADS = int(os.getenv("R2_ASYNC_THREADS", "16"))
+
+
+def build_async_db():
+    # Same pool settings as the sync client. The async client belongs to
+    # the event loop that first uses it: one per ASGI worker process
+    from pymongo import AsyncMongoClient
+
+    client = AsyncMongoClient(
+        MONGO_URI,
+        event_listeners=mongo_event_listeners(),
+        **MONGO_CLIENT_OPTIONS,
+    )
+    return client[MONGO_DB_NAME]
+
+
+async_db = LazyProxy(build_async_db, "async_db")
+
+
+def async_collection(collection):
+    """
+    The async driver's handle on `collection`: same database, same name.
+    Lets a service built around a sync collection offer `*_async` twins.
+    """
+    return async_db[collection.name]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=R2_ASYNC_THREADS, thread_name_prefix="r2-async"
+            )
+    return _executor
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """
+    Await a blocking call (R2 / boto3) on the bounded SDK thread pool,
+    so the event loop keeps serving while it waits. Runs in a copy of the
+    caller's context, as asyncio.to_thread() does (request metrics).
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _get_executor(), functools.partial(context.run, fn, *args, **kwargs)
+    )
+
+
+async def close():
+    """
+    Release the async clients, on ASGI shutdown.
+    """
+    global _executor
+
+    if async_db.initialized:
+        await async_db.client.close()
+
+    from services.pdf_service import close_async_pdf_client
+    await close_async_pdf_client()
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
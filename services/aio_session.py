@@ -0,0 +1,108 @@
+from itsdangerous import BadSignature
+from quart.sessions import SecureCookieSessionInterface, SessionInterface
+
+from services.aio import async_collection
+from services.session import SESSION_BACKEND
+
+
+class AsyncMongoSessionInterface(SessionInterface):
+    """
+    Quart front for the Flask app's MongoSessionInterface: same cookie,
+    signer, stored format, local cache and write-back policy, with the
+    Mongo round trips on the async driver. A session written by either
+    app is read by the other.
+    """
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+
+    def _new_session(self):
+        sessions = self.sessions
+        return sessions.session_class(
+            sid=sessions._generate_sid(sessions.sid_length), permanent=sessions.permanent
+        )
+
+    async def _delete_session(self, store_id):
+        if self.sessions.cache is not None:
+            self.sessions.cache.pop(store_id)
+        await async_collection(self.sessions.store).delete_one({"id": store_id})
+
+    async def open_session(self, app, request):
+        sessions = self.sessions
+
+        sid = request.cookies.get(app.config["SESSION_COOKIE_NAME"])
+        if not sid:
+            return self._new_session()
+
+        if sessions.use_signer:
+            try:
+                sid = sessions._unsign(app, sid)
+            except BadSignature:
+                return self._new_session()
+
+        store_id = sessions._get_store_id(sid)
+        hit, data = sessions._cached_session_data(store_id)
+        if not hit:
+            document = await async_collection(sessions.store).find_one({"id": store_id})
+            data = sessions._load_document(store_id, document)
+
+        if data is None:
+            return self._new_session()
+        return sessions.session_class(data, sid=sid)
+
+    async def save_session(self, app, session, response):
+        sessions = self.sessions
+        name = sessions.get_cookie_name(app)
+        domain = sessions.get_cookie_domain(app)
+        path = sessions.get_cookie_path(app)
+        store_id = sessions._get_store_id(session.sid)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if not session:
+            if session.modified:
+                await self._delete_session(store_id)
+                response.delete_cookie(key=name, domain=domain, path=path)
+                response.vary.add("Cookie")
+            return
+
+        # As MongoSessionInterface.save_session(): a skipped storage write
+        # still refreshes the cookie
+        if sessions.should_set_storage(app, session):
+            query, update, expiration = sessions._session_document(
+                app.permanent_session_lifetime, session, store_id
+            )
+            await async_collection(sessions.store).update_one(query, update, upsert=True)
+            sessions._cache_set(store_id, dict(session), expiration)
+
+        if sessions.should_set_cookie(app, session):
+            sessions._set_cookie(app, session, response)
+
+    async def regenerate(self, session):
+        if session:
+            await self._delete_session(self.sessions._get_store_id(session.sid))
+            session.sid = self.sessions._generate_sid(self.sessions.sid_length)
+            session.modified = True
+
+
+async def rotate_session_async(session_interface, session):
+    """
+    rotate_session() for the Quart app.
+    """
+    regenerate = getattr(session_interface, "regenerate", None)
+    if regenerate is not None:
+        await regenerate(session)
+
+
+def init_async_session(app, flask_app):
+    """
+    Give the Quart `app` the session storage of `flask_app` (already set
+    up by init_session). Cookie sessions need nothing shared: Quart's
+    signed cookie has the same format and key derivation as Flask's.
+    """
+    if SESSION_BACKEND == "cookie":
+        app.session_interface = SecureCookieSessionInterface()
+    else:
+        app.session_interface = AsyncMongoSessionInterface(flask_app.session_interface)
+    return app.session_interface
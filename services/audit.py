@@ -1,21 +1,158 @@
 from functools import wraps
 from flask import g, request
 from datetime import datetime
+import atexit
 import hashlib
-from pymongo import MongoClient
 import os
+import queue
+import threading
+import time
+from services.db import db
+from services.metrics import registry
 
 
-uri = os.getenv("MONGO_URI")
-
-db_client = MongoClient(uri)
-db = db_client["user_database"]
 audit_logs = db["audit_logs"]
 
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "100"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+AUDIT_OVERFLOW = os.getenv("AUDIT_OVERFLOW", "drop")  # drop | block
+
+
+class AuditWriter:
+    """
+    Background writer for audit events.
+
+    Events go into a bounded queue and are flushed with `insert_many` once
+    `batch_size` events are waiting or `flush_interval` seconds have passed.
+    When the queue is full, `overflow="drop"` discards (and counts) the event,
+    `overflow="block"` waits for room.
+    """
+
+    def __init__(self, collection, maxsize=10000, batch_size=100,
+                 flush_interval=1.0, overflow="drop"):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.counters = {"queued": 0, "flushed": 0, "dropped": 0, "failed": 0}
+
+        self._counter_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _count(self, name, n=1):
+        with self._counter_lock:
+            self.counters[name] += n
+        registry.inc("lawchat_audit_events_total", (("outcome", name),), n)
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="audit-writer", daemon=True
+                )
+                self._thread.start()
+
+    def write(self, event):
+        self.start()
+
+        try:
+            if self.overflow == "block":
+                self.queue.put(event)
+            else:
+                self.queue.put_nowait(event)
+        except queue.Full:
+            self._count("dropped")
+            return False
+
+        self._count("queued")
+        return True
+
+    def _flush(self, batch):
+        if not batch:
+            return
+
+        try:
+            self.collection.insert_many(batch, ordered=False)
+            self._count("flushed", len(batch))
+        except Exception as e:
+            # ❗ never break main flow
+            self._count("failed", len(batch))
+            registry.inc("lawchat_audit_flush_failures_total", ())
+            print("Audit log flush failed:", e)
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while not (self._stop.is_set() and self.queue.empty()):
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                pass
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+        self._flush(batch)
+
+    def close(self, timeout=5.0):
+        """
+        Flush everything still queued and stop the writer thread.
+        """
+        if self._thread is None:
+            return
+
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+
+    def stats(self):
+        with self._counter_lock:
+            stats = dict(self.counters)
+        stats["pending"] = self.queue.qsize()
+        return stats
+
+
+audit_writer = AuditWriter(
+    audit_logs,
+    maxsize=AUDIT_QUEUE_SIZE,
+    batch_size=AUDIT_BATCH_SIZE,
+    flush_interval=AUDIT_FLUSH_INTERVAL,
+    overflow=AUDIT_OVERFLOW,
+)
+atexit.register(audit_writer.close)
+
+registry.describe("lawchat_audit_events_total", "Audit events by outcome: queued, flushed, dropped, failed.")
+registry.describe("lawchat_audit_flush_failures_total", "Audit insert_many batches that failed.")
+registry.describe("lawchat_audit_queue_depth", "Audit events waiting for the writer thread.")
+registry.gauge("lawchat_audit_queue_depth", lambda: {(): audit_writer.queue.qsize()})
+
 
 def hash_ip(ip):
     return hashlib.sha256(ip.encode()).hexdigest()
 
+def record_audit_event(action, user, document_id, remote_addr, user_agent):
+    try:
+        audit_writer.write({
+            "user_id": user["_id"],
+            "document_id": document_id,
+            "action": action,
+            "ip_hash": hash_ip(remote_addr),
+            "user_agent": user_agent,
+            "created_at": datetime.now()
+        })
+    except Exception as e:
+        # ❗ never break main flow
+        print("Audit log failed:", e)
+
+
 def audit_log(action):
     def decorator(fn):
         @wraps(fn)
@@ -23,18 +160,13 @@ def audit_log(action):
 
             response = fn(*args, **kwargs)
 
-            try:
-                audit_logs.insert_one({
-                    "user_id": g.user["_id"],
-                    "document_id": kwargs.get("doc_id"),
-                    "action": action,
-                    "ip_hash": hash_ip(request.remote_addr),
-                    "user_agent": request.headers.get("User-Agent"),
-                    "created_at": datetime.now()
-                })
-            except Exception as e:
-                # ❗ never break main flow
-                print("Audit log failed:", e)
+            record_audit_event(
+                action,
+                g.user,
+                kwargs.get("doc_id"),
+                request.remote_addr,
+                request.headers.get("User-Agent"),
+            )
 
             return response
         return wrapper
@@ -0,0 +1,202 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+from playwright.sync_api import sync_playwright
+from playwright.sync_api import Error as PlaywrightError
+
+
+class BrowserPoolError(Exception):
+    pass
+
+
+class _RenderJob:
+    def __init__(self, html, pdf_options):
+        self.html = html
+        self.pdf_options = pdf_options
+        self.future = Future()
+
+
+class _BrowserWorker(threading.Thread):
+    """
+    Owns one Chromium instance and one reusable page.
+
+    Playwright's sync API is bound to the thread that started it, so every
+    browser lives on its own thread and only ever renders from there.
+    """
+
+    def __init__(self, pool, index):
+        super().__init__(name=f"pdf-browser-{index}", daemon=True)
+        self.pool = pool
+        self.playwright = None
+        self.browser = None
+        self.page = None
+        self.renders = 0
+
+    def _launch(self):
+        self.browser = self.playwright.chromium.launch(
+            args=["--disable-dev-shm-usage", "--no-sandbox"]
+        )
+        self.page = self.browser.new_page()
+        if self.pool.block_network:
+            # Render HTML is self-contained, nothing may leave the box
+            self.page.route("**/*", self._block_request)
+        self.renders = 0
+
+    def _block_request(self, route):
+        self.pool._count_blocked(route.request.url)
+        route.abort()
+
+    def _close_browser(self):
+        try:
+            if self.browser:
+                self.browser.close()
+        except PlaywrightError:
+            pass
+        self.browser = None
+        self.page = None
+
+    def _recycle(self):
+        self._close_browser()
+        self._launch()
+
+    def run(self):
+        try:
+            self.playwright = sync_playwright().start()
+        except Exception as e:
+            self.pool._worker_failed(e)
+            return
+
+        try:
+            while True:
+                job = self.pool._jobs.get()
+                if job is None:
+                    break
+
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+
+                try:
+                    if self.browser is None:
+                        self._launch()
+                    elif self.renders >= self.pool.max_renders or self.page.is_closed():
+                        self._recycle()
+
+                    self.page.set_content(job.html, wait_until="load")
+                    pdf_bytes = self.page.pdf(**job.pdf_options)
+                    self.renders += 1
+                    job.future.set_result(pdf_bytes)
+
+                except Exception as e:
+                    job.future.set_exception(e)
+                    # A failed render can leave the browser wedged,
+                    # relaunch lazily on the next job
+                    self._close_browser()
+        finally:
+            self._close_browser()
+            self.playwright.stop()
+
+
+class BrowserPool:
+    """
+    Pool of long-lived Chromium instances, each with a warm page.
+
+    A render is a `set_content` + `pdf()` on an already running browser;
+    a browser is relaunched after `max_renders` renders to cap memory growth.
+    With `block_network` every request the page attempts is aborted and
+    counted in `blocked_requests`.
+    """
+
+    def __init__(self, size=2, max_renders=200, pdf_options=None, block_network=True):
+        self.size = max(1, size)
+        self.max_renders = max(1, max_renders)
+        self.block_network = block_network
+        self.blocked_requests = 0
+        self.last_blocked_url = None
+        self.pdf_options = pdf_options or {
+            "format": "A4",
+            "print_background": True,
+        }
+
+        self._jobs = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._started = False
+        self._live_workers = 0
+        self._startup_error = None
+
+    def _count_blocked(self, url):
+        with self._stats_lock:
+            self.blocked_requests += 1
+            self.last_blocked_url = url
+
+    def _worker_failed(self, error):
+        with self._stats_lock:
+            self._live_workers -= 1
+            if self._live_workers > 0:
+                return
+            self._startup_error = error
+        self._fail_pending()
+
+    def _startup_failure(self):
+        return BrowserPoolError(f"Local PDF engine failed to start: {self._startup_error}")
+
+    def _fail_pending(self):
+        # No worker left to take them: fail queued renders now, not at their timeout
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None and job.future.set_running_or_notify_cancel():
+                job.future.set_exception(self._startup_failure())
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+
+            self._startup_error = None
+            self._live_workers = self.size
+            for i in range(self.size):
+                worker = _BrowserWorker(self, i)
+                worker.start()
+                self._workers.append(worker)
+
+            self._started = True
+
+    def render(self, html: str, timeout: float = 60) -> bytes:
+        if not self._started:
+            self.start()
+
+        if self._startup_error is not None:
+            raise self._startup_failure()
+
+        job = _RenderJob(html, self.pdf_options)
+        self._jobs.put(job)
+        if self._startup_error is not None:
+            # The last worker died between the check and the put
+            self._fail_pending()
+
+        try:
+            return job.future.result(timeout=timeout)
+        except TimeoutError:
+            job.future.cancel()
+            raise BrowserPoolError("Local PDF render timeout")
+        except PlaywrightError as e:
+            raise BrowserPoolError(f"Local PDF render failed: {e}")
+
+    def shutdown(self):
+        with self._lock:
+            if not self._started:
+                return
+
+            for _ in self._workers:
+                self._jobs.put(None)
+
+            for worker in self._workers:
+                worker.join(timeout=10)
+
+            self._workers = []
+            self._started = False
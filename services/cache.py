@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache with an optional per-entry TTL.
+
+    Bounded by entry count (`maxsize`) and, when `max_bytes` is given,
+    by the total `len()` of the cached values.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, max_bytes=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _weight(self, value):
+        return len(value) if self.max_bytes else 0
+
+    def _evict(self, key):
+        _, value = self._data.pop(key)
+        self._bytes -= self._weight(value)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                self._evict(key)
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        weight = self._weight(value)
+
+        if self.max_bytes and weight > self.max_bytes:
+            return
+
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        with self._lock:
+            if key in self._data:
+                self._evict(key)
+
+            self._data[key] = (expires_at, value)
+            self._bytes += weight
+
+            while len(self._data) > self.maxsize or (
+                self.max_bytes and self._bytes > self.max_bytes
+            ):
+                self._evict(next(iter(self._data)))
+
+    def purge_expired(self):
+        """
+        Drop every expired entry now rather than when next touched.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key in [
+                key for key, (expires_at, _) in self._data.items()
+                if expires_at is not None and expires_at < now
+            ]:
+                self._evict(key)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+
+            _, value = self._data[key]
+            self._evict(key)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self._data)
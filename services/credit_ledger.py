@@ -0,0 +1,367 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from services.aio import async_collection
+from services.db import db
+from services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+CONTRACT_CREDIT_COST = 15
+
+LEDGER_QUEUE_SIZE = int(os.getenv("LEDGER_QUEUE_SIZE", "10000"))
+# How often the settler thread also sweeps entries nobody handed it
+LEDGER_SWEEP_INTERVAL = float(os.getenv("LEDGER_SWEEP_INTERVAL", "300"))
+
+users_collection = db["users"]
+credit_transactions = db["credit_transactions"]
+
+
+# A ledger row is first written onto the user document, in the same
+# atomic update that moves the balance, as an entry of `pending_txns`.
+# It is then copied to credit_transactions and pulled. A process dying in
+# between leaves the entry behind for settle_pending(), so the balance and
+# the ledger cannot drift apart (a recovered reservation just has no
+# `balance_after`). Reservations are settled by a background thread, off
+# the request path.
+
+
+def _reserve_query(user_id, cost, txn):
+    is_premium = {"$eq": ["$account_type", "Premium"]}
+    return dict(
+        filter={
+            "_id": user_id,
+            "$or": [
+                {"account_type": "Premium_contract"},
+                {"account_type": "Premium", "credit_contract": {"$gte": cost}},
+            ],
+        },
+        update=[
+            {"$set": {"credit_contract": {"$cond": [
+                is_premium,
+                {"$subtract": ["$credit_contract", cost]},
+                "$credit_contract",
+            ]}}},
+            {"$set": {"pending_txns": {"$cond": [
+                is_premium,
+                {"$concatArrays": [
+                    {"$ifNull": ["$pending_txns", []]}, {"$literal": [txn]}
+                ]},
+                "$pending_txns",
+            ]}}},
+        ],
+        projection={"account_type": 1, "credit_contract": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _reserve_transaction(user_id, count, cost, reason):
+    return {
+        "_id": ObjectId(),
+        "user_id": user_id,
+        "kind": "reserve",
+        "reason": reason,
+        "count": count,
+        "delta": -cost,
+        "created_at": datetime.now(),
+    }
+
+
+def _rollback_transaction(user_id, count, amount, txn_id, reason):
+    return {
+        "_id": ObjectId(),
+        "user_id": user_id,
+        "kind": "rollback",
+        "reason": reason,
+        "count": count,
+        "delta": amount,
+        "reverses": txn_id,
+        "created_at": datetime.now(),
+    }
+
+
+def _refund(user_id, txn):
+    query = {"_id": user_id, "account_type": "Premium"}
+    if txn["reverses"] is not None:
+        # Not while another refund of the same reservation is in flight
+        query["pending_txns.reverses"] = {"$ne": txn["reverses"]}
+
+    return (
+        query,
+        {"$inc": {"credit_contract": txn["delta"]}, "$push": {"pending_txns": txn}},
+    )
+
+
+def _undo(user_id, txn):
+    return (
+        {"_id": user_id, "pending_txns._id": txn["_id"]},
+        {
+            "$inc": {"credit_contract": -txn["delta"]},
+            "$pull": {"pending_txns": {"_id": txn["_id"]}},
+        },
+    )
+
+
+def _settled(user_id, txn):
+    return (
+        {"_id": user_id},
+        {"$pull": {"pending_txns": {"_id": txn["_id"]}}},
+    )
+
+
+def _settle(user_id, txn):
+    """
+    Copy a pending entry to the ledger and drop it from the user. Returns
+    False when the ledger refused it (a second refund of one reservation),
+    in which case its balance change is reverted instead.
+    """
+    try:
+        credit_transactions.insert_one(txn)
+    except DuplicateKeyError:
+        if not credit_transactions.find_one({"_id": txn["_id"]}, {"_id": 1}):
+            users_collection.update_one(*_undo(user_id, txn))
+            return False
+
+    users_collection.update_one(*_settled(user_id, txn))
+    return True
+
+
+async def _settle_async(user_id, txn):
+    try:
+        await async_collection(credit_transactions).insert_one(txn)
+    except DuplicateKeyError:
+        if not await async_collection(credit_transactions).find_one(
+            {"_id": txn["_id"]}, {"_id": 1}
+        ):
+            await async_collection(users_collection).update_one(*_undo(user_id, txn))
+            return False
+
+    await async_collection(users_collection).update_one(*_settled(user_id, txn))
+    return True
+
+
+class LedgerSettler:
+    """
+    Background thread settling reservations off the request path.
+
+    `submit` never blocks: when the queue is full the entry is just left
+    pending (and counted). Every `sweep_interval` seconds the thread also
+    runs settle_pending(), which picks up those and the entries of
+    processes that died before settling.
+    """
+
+    def __init__(self, maxsize=10000, sweep_interval=300.0):
+        self.sweep_interval = sweep_interval
+
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.counters = {"settled": 0, "dropped": 0, "failed": 0}
+
+        self._counter_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _count(self, name, n=1):
+        with self._counter_lock:
+            self.counters[name] += n
+        registry.inc("lawchat_ledger_settle_total", (("outcome", name),), n)
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="ledger-settler", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, user_id, txn):
+        self.start()
+
+        try:
+            self.queue.put_nowait((user_id, txn))
+        except queue.Full:
+            self._count("dropped")
+            return False
+        return True
+
+    def _settle(self, user_id, txn):
+        try:
+            _settle(user_id, txn)
+            self._count("settled")
+        except Exception as e:
+            # Still pending on the user document, the next sweep retries
+            self._count("failed")
+            logger.error(f"Ledger settle failed for {txn['_id']}: {e}")
+
+    def _sweep(self):
+        try:
+            settle_pending()
+        except Exception as e:
+            logger.error(f"Ledger sweep failed: {e}")
+
+    def _run(self):
+        next_sweep = time.monotonic() + self.sweep_interval
+
+        while not (self._stop.is_set() and self.queue.empty()):
+            timeout = max(0.0, min(next_sweep - time.monotonic(), 1.0))
+            try:
+                user_id, txn = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                pass
+            else:
+                try:
+                    self._settle(user_id, txn)
+                finally:
+                    self.queue.task_done()
+
+            if time.monotonic() >= next_sweep:
+                self._sweep()
+                next_sweep = time.monotonic() + self.sweep_interval
+
+    def flush(self):
+        """
+        Wait until everything submitted so far is settled (or failed).
+        """
+        if self._thread is not None:
+            self.queue.join()
+
+    def close(self, timeout=5.0):
+        """
+        Settle everything still queued and stop the thread.
+        """
+        if self._thread is None:
+            return
+
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+
+    def stats(self):
+        with self._counter_lock:
+            stats = dict(self.counters)
+        stats["pending"] = self.queue.qsize()
+        return stats
+
+
+ledger_settler = LedgerSettler(
+    maxsize=LEDGER_QUEUE_SIZE,
+    sweep_interval=LEDGER_SWEEP_INTERVAL,
+)
+atexit.register(ledger_settler.close)
+
+registry.describe("lawchat_ledger_settle_total", "Reservations handed to the settler, by outcome: settled, dropped, failed.")
+registry.describe("lawchat_ledger_settle_queue_depth", "Reservations waiting for the settler thread.")
+registry.gauge("lawchat_ledger_settle_queue_depth", lambda: {(): ledger_settler.queue.qsize()})
+
+
+def reserve(user_id, count=1, reason="document_generated"):
+    """
+    Decide and reserve in one atomic server-side update:
+    Premium_contract users pass untouched, Premium users are charged
+    `count` documents if they can afford it.
+
+    Returns (allowed, mode, txn_id); txn_id is set for limited plans only.
+    """
+    cost = CONTRACT_CREDIT_COST * count
+    txn = _reserve_transaction(user_id, count, cost, reason)
+
+    user = users_collection.find_one_and_update(**_reserve_query(user_id, cost, txn))
+
+    if not user:
+        return False, "Contract credits exhausted", None
+
+    if user["account_type"] == "Premium_contract":
+        return True, "unlimited", None
+
+    ledger_settler.submit(user_id, dict(txn, balance_after=user["credit_contract"]))
+
+    return True, "limited", txn["_id"]
+
+
+async def reserve_async(user_id, count=1, reason="document_generated"):
+    """
+    reserve() for the asyncio serving mode: same update, same ledger.
+    """
+    cost = CONTRACT_CREDIT_COST * count
+    txn = _reserve_transaction(user_id, count, cost, reason)
+
+    user = await async_collection(users_collection).find_one_and_update(
+        **_reserve_query(user_id, cost, txn)
+    )
+
+    if not user:
+        return False, "Contract credits exhausted", None
+
+    if user["account_type"] == "Premium_contract":
+        return True, "unlimited", None
+
+    ledger_settler.submit(user_id, dict(txn, balance_after=user["credit_contract"]))
+
+    return True, "limited", txn["_id"]
+
+
+def rollback(user_id, count=1, txn_id=None, reason="generation_failed"):
+    """
+    Refund `count` documents. When `txn_id` is given the refund is recorded
+    against that reservation and applied at most once.
+    """
+    txn = _rollback_transaction(
+        user_id, count, CONTRACT_CREDIT_COST * count, txn_id, reason
+    )
+
+    if not users_collection.update_one(*_refund(user_id, txn)).modified_count:
+        # Not a limited plan, or this reservation is being refunded already
+        return False
+
+    return _settle(user_id, txn)
+
+
+async def rollback_async(user_id, count=1, txn_id=None, reason="generation_failed"):
+    txn = _rollback_transaction(
+        user_id, count, CONTRACT_CREDIT_COST * count, txn_id, reason
+    )
+
+    result = await async_collection(users_collection).update_one(*_refund(user_id, txn))
+    if not result.modified_count:
+        return False
+
+    return await _settle_async(user_id, txn)
+
+
+def settle_pending(older_than=timedelta(minutes=5)):
+    """
+    Finish ledger writes left pending by a process that died mid-way.
+    Entries younger than `older_than` may still be in flight and are left
+    alone. Returns the number of entries settled.
+    """
+    cutoff = ObjectId.from_datetime(datetime.now(timezone.utc) - older_than)
+    settled = 0
+
+    for user in users_collection.find(
+        {"pending_txns._id": {"$lt": cutoff}}, {"pending_txns": 1}
+    ):
+        for txn in user["pending_txns"]:
+            if txn["_id"] < cutoff:
+                _settle(user["_id"], txn)
+                settled += 1
+
+    return settled
+
+
+def ledger_balance_delta(user_id):
+    """
+    Net credit movement recorded for a user, for reconciliation.
+    """
+    result = list(credit_transactions.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$group": {"_id": None, "delta": {"$sum": "$delta"}}},
+    ]))
+    return result[0]["delta"] if result else 0
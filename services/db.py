@@ -0,0 +1,184 @@
+import logging
+import os
+
+from pymongo import ASCENDING, DESCENDING, IndexModel, MongoClient
+from pymongo.errors import OperationFailure
+
+from services.metrics import mongo_event_listeners
+
+logger = logging.getLogger(__name__)
+
+MONGO_URI = os.getenv("MONGO_URI")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "user_database")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+
+# Optional retention for audit logs, unset = keep forever
+AUDIT_LOG_RETENTION_DAYS = os.getenv("AUDIT_LOG_RETENTION_DAYS")
+
+# Shared by the sync client below and the async one (services/aio.py)
+MONGO_CLIENT_OPTIONS = dict(
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+    retryWrites=True,
+    connect=False,
+)
+
+# One client (and so one connection pool) per process. connect=False: no
+# SRV lookup, monitor threads or sockets until the first operation, so
+# importing the app (serverless cold start) never waits on the network
+db_client = MongoClient(
+    MONGO_URI,
+    event_listeners=mongo_event_listeners(),
+    **MONGO_CLIENT_OPTIONS,
+)
+db = db_client[MONGO_DB_NAME]
+
+
+def index_models():
+    audit_indexes = [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+    ]
+    if AUDIT_LOG_RETENTION_DAYS:
+        audit_indexes.append(IndexModel(
+            [("created_at", ASCENDING)],
+            expireAfterSeconds=int(AUDIT_LOG_RETENTION_DAYS) * 86400,
+        ))
+
+    return {
+        "document_history": [
+            # my-documents keyset pagination on (created_at, _id)
+            IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+            # expired-document cleanup. No TTL: the R2 object must go first.
+            # Status leads so both branches of the cleanup $or (active and
+            # past expires_at, or any expiring/released) use it
+            IndexModel([("status", ASCENDING), ("expires_at", ASCENDING)]),
+        ],
+        "sso_codes": [
+            IndexModel([("code", ASCENDING)]),
+            # Codes are single use and short lived
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        ],
+        "sso_used_tokens": [
+            # Replay guard for SSO tokens, only needed until they expire
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        ],
+        "sessions": [
+            # flask-session expiry (used to be created on every app start)
+            IndexModel([("expiration", ASCENDING)], expireAfterSeconds=0),
+        ],
+        "users": [
+            # credit reservation filters on _id + account_type
+            IndexModel([("_id", ASCENDING), ("account_type", ASCENDING)]),
+            # credit_ledger.settle_pending() looks for stale ledger entries
+            IndexModel([("pending_txns._id", ASCENDING)], sparse=True),
+        ],
+        "audit_logs": audit_indexes,
+        "credit_transactions": [
+            IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+            # A reservation can be refunded at most once
+            IndexModel(
+                [("reverses", ASCENDING)],
+                unique=True,
+                partialFilterExpression={"reverses": {"$type": "objectId"}},
+            ),
+        ],
+        "nda_drafts": [
+            # Drafts are only needed between preview and PDF
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        ],
+        "pdf_jobs": [
+            IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+            # Finished jobs only need to live long enough to be polled
+            IndexModel([("finished_at", ASCENDING)], expireAfterSeconds=86400),
+        ],
+    }
+
+
+def ensure_indexes():
+    """
+    Create the indexes the hot queries rely on. Safe to run repeatedly:
+    existing identical indexes are left alone.
+    """
+    created = {}
+
+    for name, models in index_models().items():
+        try:
+            created[name] = db[name].create_indexes(models)
+        except OperationFailure as e:
+            # e.g. an index with the same keys but different options
+            logger.error(f"Index bootstrap failed for {name}: {e}")
+            created[name] = []
+
+    return created
+
+
+def hot_queries():
+    """
+    Representative shapes of the queries on the request path,
+    as (label, collection, filter, sort).
+    """
+    from bson import ObjectId
+    from datetime import datetime
+
+    from services.document_cleanup import DocumentCleaner
+
+    user_id = ObjectId()
+    now = datetime.now()
+
+    return [
+        ("my_documents", "document_history", {"user_id": user_id},
+         [("created_at", DESCENDING), ("_id", DESCENDING)]),
+        ("my_documents_next_page", "document_history", {"user_id": user_id, "$or": [
+            {"created_at": {"$lt": now}},
+            {"created_at": now, "_id": {"$lt": user_id}},
+        ]}, [("created_at", DESCENDING), ("_id", DESCENDING)]),
+        ("expired_documents", "document_history", DocumentCleaner._expired_query(now), [("_id", ASCENDING)]),
+        ("expired_documents_next_batch", "document_history",
+         {**DocumentCleaner._expired_query(now), "_id": {"$gt": user_id}}, [("_id", ASCENDING)]),
+        ("sso_code", "sso_codes", {"code": "0" * 64, "used": False, "expires_at": {"$gt": now}}, None),
+        ("reserve_credit", "users", {"_id": user_id, "$or": [
+            {"account_type": "Premium_contract"},
+            {"account_type": "Premium", "credit_contract": {"$gte": 15}},
+        ]}, None),
+        ("audit_by_user", "audit_logs", {"user_id": user_id}, [("created_at", DESCENDING)]),
+    ]
+
+
+def _plan_stages(plan):
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return [stage for stage in stages if stage]
+
+
+def check_index_usage():
+    """
+    Explain each hot query and report its winning plan stages.
+    Returns a list of (label, stages, uses_index).
+    """
+    results = []
+
+    for label, collection, query, sort in hot_queries():
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+
+        plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        stages = _plan_stages(plan)
+        uses_index = "COLLSCAN" not in stages
+
+        results.append((label, stages, uses_index))
+
+    return results
@@ -0,0 +1,267 @@
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# S3 DeleteObjects accepts at most 1000 keys per call
+MAX_DELETE_KEYS = 1000
+
+
+class DocumentCleaner:
+    """
+    Batched removal of expired documents.
+
+    Each batch is claimed by flipping `status` to "expiring", so a run that
+    is interrupted half way is simply picked up again by the next one.
+    Private objects go through S3 `delete_objects`; records whose object
+    could not be deleted stay "expiring" and are retried on the next run.
+
+    Shared content-addressed renders drop one reference per document, at
+    most once: documents are marked "released" before the decrement, and
+    resumed runs only delete released records. An interruption or failure
+    in between leaks a reference (the object outlives its last document)
+    rather than deleting an object live documents still point to.
+
+    The run holds a lease in `locks`, renewed after every batch; a run that
+    lost it (e.g. stalled past `lock_ttl`) stops instead of overlapping.
+    """
+
+    def __init__(self, document_history, locks, r2_client, bucket, pdf_cache,
+                 batch_size=500, key_retries=3, lock_ttl=900):
+        self.document_history = document_history
+        self.locks = locks
+        self.r2_client = r2_client
+        self.bucket = bucket
+        self.pdf_cache = pdf_cache
+        self.batch_size = min(batch_size, MAX_DELETE_KEYS)
+        self.key_retries = key_retries
+        self.lock_ttl = lock_ttl
+
+    @staticmethod
+    def _expired_query(now):
+        return {
+            "$or": [
+                {"status": "active", "expires_at": {"$lte": now}},
+                {"status": {"$in": ["expiring", "released"]}},
+            ]
+        }
+
+    def _acquire_lock(self, owner):
+        now = datetime.now()
+        try:
+            self.locks.find_one_and_update(
+                {"_id": "document_cleanup", "locked_until": {"$lte": now}},
+                {"$set": {"locked_until": now + timedelta(seconds=self.lock_ttl), "owner": owner}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            # Held by another process
+            return False
+
+    def _renew_lock(self, owner):
+        result = self.locks.update_one(
+            {"_id": "document_cleanup", "owner": owner},
+            {"$set": {"locked_until": datetime.now() + timedelta(seconds=self.lock_ttl)}},
+        )
+        return result.matched_count == 1
+
+    def _release_lock(self, owner):
+        self.locks.update_one(
+            {"_id": "document_cleanup", "owner": owner},
+            {"$set": {"locked_until": datetime.now()}},
+        )
+
+    def _delete_keys(self, keys):
+        """
+        Delete private objects, retrying per-key failures.
+        Returns the set of keys that could not be deleted.
+        """
+        pending = list(keys)
+
+        for attempt in range(self.key_retries + 1):
+            if not pending:
+                break
+            if attempt:
+                time.sleep(min(2 ** attempt * 0.1, 2))
+
+            failed = []
+            for i in range(0, len(pending), MAX_DELETE_KEYS):
+                chunk = pending[i:i + MAX_DELETE_KEYS]
+                try:
+                    resp = self.r2_client.delete_objects(
+                        Bucket=self.bucket,
+                        Delete={
+                            "Objects": [{"Key": key} for key in chunk],
+                            "Quiet": True,
+                        },
+                    )
+                except Exception as e:
+                    logger.error(f"R2 delete_objects failed: {e}")
+                    failed += chunk
+                    continue
+
+                # Quiet mode only reports the failures
+                failed += [err["Key"] for err in resp.get("Errors", [])]
+
+            pending = failed
+
+        for key in pending:
+            logger.error(f"Failed to delete expired R2 object {key}")
+
+        return set(pending)
+
+    def _release_shared(self, docs):
+        """
+        Drop one reference per document on shared renders. The documents
+        are marked "released" first, so no retry can drop them twice.
+        """
+        if not docs:
+            return
+
+        self.document_history.update_many(
+            {"_id": {"$in": [doc["_id"] for doc in docs]}},
+            {"$set": {"status": "released"}},
+        )
+
+        counts = Counter(doc["content_hash"] for doc in docs)
+        for content_hash, count in counts.items():
+            try:
+                self.pdf_cache.release(content_hash, count)
+            except Exception as e:
+                # Not retried: the decrement may have been applied
+                logger.error(f"Failed to release shared render {content_hash} "
+                             f"({count} refs leaked): {e}")
+
+    def _run_batch(self, now, after_id):
+        query = self._expired_query(now)
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+
+        docs = list(
+            self.document_history.find(
+                query,
+                {"file_path": 1, "content_hash": 1, "status": 1},
+            )
+            .sort("_id", 1)
+            .limit(self.batch_size)
+        )
+        if not docs:
+            return 0, 0, None
+
+        # Claim: survives an interruption between here and delete_many
+        self.document_history.update_many(
+            {"_id": {"$in": [doc["_id"] for doc in docs]}, "status": "active"},
+            {"$set": {"status": "expiring"}},
+        )
+
+        # Released on an earlier, interrupted run: only the record is left
+        shared = [
+            doc for doc in docs
+            if doc.get("content_hash") and doc.get("status") != "released"
+        ]
+        private = [
+            doc for doc in docs
+            if not doc.get("content_hash")
+            and doc.get("file_path")
+            # Legacy public URLs are not keys in our bucket
+            and not doc["file_path"].startswith("http")
+        ]
+
+        self._release_shared(shared)
+        failed_keys = self._delete_keys([doc["file_path"] for doc in private])
+        failed_ids = {doc["_id"] for doc in private if doc["file_path"] in failed_keys}
+
+        done_ids = [doc["_id"] for doc in docs if doc["_id"] not in failed_ids]
+        if done_ids:
+            self.document_history.delete_many({"_id": {"$in": done_ids}})
+
+        return len(done_ids), len(failed_ids), docs[-1]["_id"]
+
+    def run(self, max_batches=None, time_budget=None):
+        """
+        Page through expired documents until none are left, `max_batches`
+        batches have run or `time_budget` seconds have passed.
+        Returns a report with throughput and the remaining backlog.
+        """
+        owner = f"{threading.get_ident()}-{time.time()}"
+        if not self._acquire_lock(owner):
+            return {"status": "locked"}
+
+        started = time.monotonic()
+        now = datetime.now()
+        deleted = failed = batches = 0
+        after_id = None
+
+        try:
+            while max_batches is None or batches < max_batches:
+                if time_budget is not None and time.monotonic() - started >= time_budget:
+                    break
+
+                # Keyset paging on _id: failures left behind are not
+                # refetched in this run
+                done, errors, after_id = self._run_batch(now, after_id)
+                if after_id is None:
+                    break
+
+                batches += 1
+                deleted += done
+                failed += errors
+
+                if not self._renew_lock(owner):
+                    logger.error("Document cleanup lost its lock, stopping")
+                    break
+        finally:
+            self._release_lock(owner)
+
+        elapsed = time.monotonic() - started
+        remaining = self.document_history.count_documents(self._expired_query(now))
+
+        return {
+            "status": "ok",
+            "deleted": deleted,
+            "failed": failed,
+            "batches": batches,
+            "elapsed_s": round(elapsed, 3),
+            "docs_per_s": round(deleted / elapsed, 1) if elapsed else None,
+            "remaining": remaining,
+        }
+
+
+class CleanupScheduler:
+    """
+    Runs `cleaner.run()` every `interval` seconds on a daemon thread.
+    """
+
+    def __init__(self, cleaner, interval=3600, time_budget=None):
+        self.cleaner = cleaner
+        self.interval = interval
+        self.time_budget = time_budget
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(
+            target=self._loop, name="document-cleanup", daemon=True
+        )
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                report = self.cleaner.run(time_budget=self.time_budget)
+                logger.info(f"Expired document cleanup: {report}")
+            except Exception as e:
+                logger.error(f"Expired document cleanup failed: {e}")
+
+    def stop(self):
+        self._stop.set()
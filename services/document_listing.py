@@ -0,0 +1,136 @@
+import base64
+import os
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import DESCENDING
+
+from services.aio import async_collection
+from services.cache import TTLCache
+from services.db import db
+from services.page_cache import invalidate_user_pages
+
+MY_DOCUMENTS_PAGE_SIZE = int(os.getenv("MY_DOCUMENTS_PAGE_SIZE", "24"))
+MY_DOCUMENTS_MAX_PAGE_SIZE = 100
+DOCUMENT_COUNT_TTL = int(os.getenv("DOCUMENT_COUNT_TTL", "60"))
+
+# Only what my_documents.html shows
+LISTING_FIELDS = {
+    "document_type": 1,
+    "user_name": 1,
+    "created_at": 1,
+    "expires_at": 1,
+    "status": 1,
+}
+
+# Newest first, _id breaks ties between equal timestamps
+LISTING_SORT = [("created_at", DESCENDING), ("_id", DESCENDING)]
+
+document_history = db["document_history"]
+
+_counts = TTLCache(maxsize=4096, ttl=DOCUMENT_COUNT_TTL)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(doc) -> str:
+    raw = f"{doc['created_at'].isoformat()}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, doc_id = raw.split("|")
+        return datetime.fromisoformat(created_at), ObjectId(doc_id)
+    except (ValueError, InvalidId, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+
+def list_documents(user_id, cursor=None, limit=MY_DOCUMENTS_PAGE_SIZE):
+    """
+    One page of a user's documents, newest first.
+
+    Keyset pagination on (created_at, _id) over the
+    (user_id, created_at, _id) index: every page is an index range scan of
+    `limit` entries, however long the history. Returns (documents,
+    next_cursor); next_cursor is None on the last page.
+    """
+    query, limit = _page_query(user_id, cursor, limit)
+
+    # One extra row tells whether there is a next page
+    documents = list(
+        document_history.find(query, LISTING_FIELDS).sort(LISTING_SORT).limit(limit + 1)
+    )
+
+    return _page(documents, limit)
+
+
+async def list_documents_async(user_id, cursor=None, limit=MY_DOCUMENTS_PAGE_SIZE):
+    """
+    list_documents() for the asyncio serving mode.
+    """
+    query, limit = _page_query(user_id, cursor, limit)
+
+    documents = await async_collection(document_history).find(
+        query, LISTING_FIELDS
+    ).sort(LISTING_SORT).limit(limit + 1).to_list()
+
+    return _page(documents, limit)
+
+
+def _page_query(user_id, cursor, limit):
+    limit = max(1, min(limit, MY_DOCUMENTS_MAX_PAGE_SIZE))
+    query = {"user_id": user_id}
+
+    if cursor:
+        created_at, doc_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": doc_id}},
+        ]
+
+    return query, limit
+
+
+def _page(documents, limit):
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1])
+
+    return documents, next_cursor
+
+
+def count_documents(user_id) -> int:
+    """
+    Cached per-user document count, refreshed every DOCUMENT_COUNT_TTL
+    seconds or when the user's documents change in this process.
+    """
+    key = str(user_id)
+
+    count = _counts.get(key)
+    if count is None:
+        count = document_history.count_documents({"user_id": user_id})
+        _counts.set(key, count)
+
+    return count
+
+
+async def count_documents_async(user_id) -> int:
+    key = str(user_id)
+
+    count = _counts.get(key)
+    if count is None:
+        count = await async_collection(document_history).count_documents({"user_id": user_id})
+        _counts.set(key, count)
+
+    return count
+
+
+def invalidate_document_count(user_id):
+    _counts.pop(str(user_id))
+    invalidate_user_pages(user_id)
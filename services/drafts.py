@@ -0,0 +1,143 @@
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from services.aio import async_collection
+from services.cache import TTLCache
+
+DRAFT_TTL_HOURS = int(os.getenv("DRAFT_TTL_HOURS", "24"))
+DRAFT_CACHE_SIZE = int(os.getenv("DRAFT_CACHE_SIZE", "1024"))
+DRAFT_CACHE_TTL = int(os.getenv("DRAFT_CACHE_TTL", "300"))
+
+
+class DraftStore:
+    """
+    Server-side agreement drafts, referenced by id from the preview page.
+
+    A draft holds the form it was built from, the resolved field values and
+    the structured document model (the last rendered clause set), so the
+    PDF step never re-parses text sent back by the browser and a live
+    preview only rebuilds what an edit touched.
+    Mongo (`nda_drafts`, TTL on expires_at) is the shared tier; a small
+    in-process cache sits in front of it. Pass collection=None for a
+    memory-only store.
+    """
+
+    def __init__(self, collection=None, ttl_hours=DRAFT_TTL_HOURS,
+                 cache_size=DRAFT_CACHE_SIZE, cache_ttl=DRAFT_CACHE_TTL):
+        self.collection = collection
+        self.ttl = timedelta(hours=ttl_hours)
+        self.cache = TTLCache(
+            maxsize=cache_size,
+            ttl=cache_ttl if collection is not None else ttl_hours * 3600,
+        )
+        # Revision checks of the memory-only store
+        self._lock = threading.Lock()
+
+    def _new_draft(self, user_id, agreement_type, values, document, form):
+        now = datetime.now()
+        return {
+            "_id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "agreement_type": agreement_type,
+            "form": form,
+            "values": values,
+            "document": document,
+            "revision": 0,
+            "created_at": now,
+            "expires_at": now + self.ttl,
+        }
+
+    def create(self, user_id, agreement_type, values, document, form=None) -> str:
+        draft = self._new_draft(user_id, agreement_type, values, document, form)
+
+        if self.collection is not None:
+            self.collection.insert_one(draft)
+        self.cache.set(draft["_id"], draft)
+        return draft["_id"]
+
+    async def create_async(self, user_id, agreement_type, values, document, form=None) -> str:
+        draft = self._new_draft(user_id, agreement_type, values, document, form)
+
+        if self.collection is not None:
+            await async_collection(self.collection).insert_one(draft)
+        self.cache.set(draft["_id"], draft)
+        return draft["_id"]
+
+    def get(self, draft_id, user_id):
+        """
+        The user's draft, or None if it is unknown, expired or not theirs.
+        """
+        if not isinstance(draft_id, str) or not draft_id:
+            return None
+
+        draft = self.cache.get(draft_id)
+        if draft is None and self.collection is not None:
+            draft = self.collection.find_one({"_id": draft_id})
+            if draft is not None:
+                self.cache.set(draft_id, draft)
+
+        return self._visible(draft, user_id)
+
+    async def get_async(self, draft_id, user_id):
+        if not isinstance(draft_id, str) or not draft_id:
+            return None
+
+        draft = self.cache.get(draft_id)
+        if draft is None and self.collection is not None:
+            draft = await async_collection(self.collection).find_one({"_id": draft_id})
+            if draft is not None:
+                self.cache.set(draft_id, draft)
+
+        return self._visible(draft, user_id)
+
+    @staticmethod
+    def _visible(draft, user_id):
+        if draft is None or draft["user_id"] != user_id:
+            return None
+        if draft["expires_at"] <= datetime.now():
+            return None
+        return draft
+
+    def update(self, draft, **fields):
+        """
+        Write changed fields back to a draft returned by get(). Returns the
+        updated draft; the one passed in (possibly shared through the
+        cache with other requests) is left as it was.
+        """
+        draft = dict(draft, **fields)
+        if self.collection is not None:
+            self.collection.update_one({"_id": draft["_id"]}, {"$set": fields})
+        self.cache.set(draft["_id"], draft)
+        return draft
+
+    def patch(self, draft, fields, paths):
+        """
+        update(), but Mongo only receives `paths` (dotted sub-field ->
+        value), for when a small part of a large field changed, and only
+        if nobody wrote the draft since it was read: the write bumps
+        `revision` and is refused when it moved. Returns the updated
+        draft, or None on such a conflict.
+        """
+        revision = draft.get("revision", 0)
+        updated = dict(draft, **fields, revision=revision + 1)
+
+        if self.collection is not None:
+            result = self.collection.update_one(
+                {"_id": draft["_id"], "revision": revision},
+                {"$set": paths, "$inc": {"revision": 1}},
+            )
+            if not result.matched_count:
+                # Our copy is stale, the next get() reloads it
+                self.cache.pop(draft["_id"])
+                return None
+            self.cache.set(draft["_id"], updated)
+            return updated
+
+        with self._lock:
+            current = self.cache.get(draft["_id"])
+            if current is None or current.get("revision", 0) != revision:
+                return None
+            self.cache.set(draft["_id"], updated)
+        return updated
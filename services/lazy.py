@@ -0,0 +1,44 @@
+import threading
+
+
+class LazyProxy:
+    """
+    Stand-in for an expensive object (SDK client, connection pool) that is
+    only built on first use. Attribute and item access go to the real
+    object; building it is thread-safe and happens once.
+    """
+
+    _UNSET = object()
+
+    def __init__(self, factory, name=None):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_name", name or getattr(factory, "__name__", "lazy"))
+        object.__setattr__(self, "_lock", threading.Lock())
+        object.__setattr__(self, "_value", self._UNSET)
+
+    def resolve(self):
+        value = self._value
+        if value is self._UNSET:
+            with self._lock:
+                value = self._value
+                if value is self._UNSET:
+                    value = self._factory()
+                    object.__setattr__(self, "_value", value)
+        return value
+
+    @property
+    def initialized(self):
+        return self._value is not self._UNSET
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.resolve(), name, value)
+
+    def __getitem__(self, key):
+        return self.resolve()[key]
+
+    def __repr__(self):
+        state = repr(self._value) if self.initialized else "not initialized"
+        return f"<LazyProxy {self._name}: {state}>"
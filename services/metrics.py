@@ -0,0 +1,344 @@
+import bisect
+import contextvars
+import hmac
+import logging
+import os
+import threading
+import time
+
+from flask import Response, abort, current_app, g, request
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Server-Timing tells any client how long each backend stage took: opt in
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "0") == "1"
+# Bearer token for /metrics. Without one the endpoint only exists in debug
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Seconds. Covers a cache hit (~ms) up to a slow cold render
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Process-local histograms and counters, rendered in the Prometheus text
+    format. Each worker process exposes its own numbers; scrape every
+    process or aggregate upstream.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}   # name -> {labels: Histogram}
+        self._counters = {}     # name -> {labels: int}
+        self._gauges = {}       # name -> callable returning {labels: value}
+        self._help = {}
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + amount
+
+    def gauge(self, name, read):
+        """
+        Register a gauge read at render time: `read()` returns {labels: value}.
+        """
+        with self._lock:
+            self._gauges[name] = read
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (
+            f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+            for key, value in pairs
+        )
+        return "{" + ",".join(escaped) + "}"
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# HELP {name} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts):
+                        cumulative += count
+                        le = bound if bound == "+Inf" else repr(float(bound))
+                        lines.append(
+                            f"{name}_bucket{self._labels(labels, [('le', le)])} {cumulative}"
+                        )
+                    lines.append(f"{name}_sum{self._labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{self._labels(labels)} {histogram.count}")
+
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {name} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{self._labels(labels)} {value}")
+
+            gauges = sorted(self._gauges.items())
+
+        # Outside the lock: a gauge may take locks of its own
+        for name, read in gauges:
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in sorted(read().items()):
+                lines.append(f"{name}{self._labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+registry.describe("lawchat_stage_seconds", "Time spent per pipeline stage.")
+registry.describe("lawchat_stage_errors_total", "Pipeline stages that raised, by exception type.")
+registry.describe("lawchat_mongo_command_seconds", "MongoDB command round trips.")
+registry.describe("lawchat_mongo_command_errors_total", "Failed MongoDB commands.")
+registry.describe("lawchat_r2_request_seconds", "R2 (S3 API) calls, including retries.")
+registry.describe("lawchat_r2_request_errors_total", "Failed R2 calls.")
+registry.describe("lawchat_http_request_seconds", "Request handling time (Flask and ASGI views).")
+
+
+# Stage timings of the request being served, for its Server-Timing header.
+# A context variable rather than flask.g so the Quart views (asgi.py), and
+# the threads they hand work to, fill it too
+_server_timings = contextvars.ContextVar("server_timings", default=None)
+
+
+def _add_server_timing(name, seconds):
+    timings = _server_timings.get()
+    if timings is not None:
+        total, count = timings.get(name, (0.0, 0))
+        timings[name] = (total + seconds, count + 1)
+
+
+def start_request():
+    """
+    Start timing a request; returns its start time for finish_request().
+    """
+    if METRICS_SERVER_TIMING:
+        _server_timings.set({})
+    return time.perf_counter()
+
+
+def finish_request(response, endpoint, method, started):
+    """
+    Record the request duration and set its Server-Timing header.
+    Works on Flask and Quart responses alike.
+    """
+    elapsed = time.perf_counter() - started
+    observe_request(endpoint, method, response.status_code, elapsed)
+
+    if METRICS_SERVER_TIMING:
+        response.headers["Server-Timing"] = server_timing_header(
+            _server_timings.get() or {}, elapsed
+        )
+        _server_timings.set(None)
+    return response
+
+
+class _Stage:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        labels = (("stage", self.name),)
+        registry.observe("lawchat_stage_seconds", labels, elapsed)
+        if exc_type is not None:
+            registry.inc("lawchat_stage_errors_total", labels + (("error", exc_type.__name__),))
+        _add_server_timing(self.name, elapsed)
+        return False
+
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+def stage(name):
+    """
+    Time a block as a pipeline stage:
+
+        with stage("pdf_render"):
+            ...
+
+    Recorded in the stage histogram (errors counted by exception type)
+    and echoed in the request's Server-Timing header.
+    """
+    if not METRICS_ENABLED:
+        return _NOOP_STAGE
+    return _Stage(name)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Times every command on the client it is registered with.
+    Runs on the thread issuing the command, so request attribution works.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        seconds = event.duration_micros / 1e6
+        registry.observe("lawchat_mongo_command_seconds", (("command", event.command_name),), seconds)
+        _add_server_timing("mongo", seconds)
+
+    def failed(self, event):
+        seconds = event.duration_micros / 1e6
+        labels = (("command", event.command_name),)
+        registry.observe("lawchat_mongo_command_seconds", labels, seconds)
+        registry.inc("lawchat_mongo_command_errors_total", labels)
+        _add_server_timing("mongo", seconds)
+
+
+def mongo_event_listeners():
+    """
+    `event_listeners` for MongoClient: empty when metrics are disabled.
+    """
+    return [MongoCommandMetrics()] if METRICS_ENABLED else []
+
+
+def instrument_boto3(client):
+    """
+    Time every API call of a boto3 client through its event hooks.
+    """
+    if not METRICS_ENABLED:
+        return client
+
+    def before_call(model, context, **kwargs):
+        context["metrics_started"] = time.perf_counter()
+
+    def finish(model, context, failed):
+        started = context.pop("metrics_started", None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        labels = (("operation", model.name),)
+        registry.observe("lawchat_r2_request_seconds", labels, seconds)
+        if failed:
+            registry.inc("lawchat_r2_request_errors_total", labels)
+        _add_server_timing("r2", seconds)
+
+    def after_call(model, context, parsed=None, **kwargs):
+        status = (parsed or {}).get("ResponseMetadata", {}).get("HTTPStatusCode", 200)
+        finish(model, context, failed=status >= 400)
+
+    def after_call_error(model, context, **kwargs):
+        finish(model, context, failed=True)
+
+    events = client.meta.events
+    events.register("before-call.s3", before_call)
+    events.register("after-call.s3", after_call)
+    events.register("after-call-error.s3", after_call_error)
+    return client
+
+
+def server_timing_header(timings, total):
+    parts = []
+    for name, (seconds, count) in timings.items():
+        entry = f"{name};dur={seconds * 1000:.1f}"
+        if count > 1:
+            entry += f';desc="{count} calls"'
+        parts.append(entry)
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def observe_request(endpoint, method, status, seconds):
+    registry.observe(
+        "lawchat_http_request_seconds",
+        (
+            ("endpoint", endpoint or "unmatched"),
+            ("method", method),
+            ("status", status),
+        ),
+        seconds,
+    )
+
+
+def init_app(app):
+    """
+    Request timing, Server-Timing headers and the /metrics endpoint.
+    Does nothing when METRICS_ENABLED=0. /metrics answers 404 unless a
+    METRICS_TOKEN is set or the app is in debug mode, checked per request.
+    """
+    if not METRICS_ENABLED:
+        return
+
+    @app.before_request
+    def start_request_timer():
+        g._request_started = start_request()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop("_request_started", None)
+        if started is None:
+            return response
+
+        return finish_request(response, request.endpoint, request.method, started)
+
+    if not METRICS_TOKEN:
+        logger.info("METRICS_TOKEN is not set, /metrics is only served in debug mode")
+
+    @app.route("/metrics")
+    def metrics():
+        # Per request: debug can be switched on after init_app (flask run --debug)
+        if not METRICS_TOKEN and not current_app.debug:
+            abort(404)
+
+        if METRICS_TOKEN:
+            supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+            if not hmac.compare_digest(supplied.encode(), METRICS_TOKEN.encode()):
+                abort(401)
+
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
@@ -1,9 +1,48 @@
 import re
 import html
+from pathlib import Path
 
 MAX_LINE_LENGTH = 500       # Prevent extremely long lines
 MAX_LINES = 200             # Prevent extremely large PDFs
 
+# Precompiled Tailwind subset inlined into nda_pdf.html
+PDF_CSS_PATH = Path(__file__).resolve().parent.parent / "static" / "css" / "nda_pdf.min.css"
+
+
+def _strip_header_comment(css: str) -> str:
+    # The file opens with a /* ... */ note on where it comes from, which
+    # has no business in every render. Anything else is kept as is
+    css = css.strip()
+    if css.startswith("/*"):
+        css = css[css.index("*/") + 2:]
+    return css.strip()
+
+
+PDF_CSS = _strip_header_comment(PDF_CSS_PATH.read_text(encoding="utf-8"))
+
+# Anything the render HTML could fetch from the network
+EXTERNAL_REF = re.compile(
+    r"""(?:\b(?:src|href|srcset|action)\s*=\s*["']?\s*(?:https?:)?//)|(?:url\(\s*["']?\s*(?:https?:)?//)|@import""",
+    re.IGNORECASE,
+)
+
+CONTROL_CHARS = re.compile(r"[\x00-\x1f\x7f-\x9f]")
+
+WATERMARK_HTML = """
+        <div style="
+            position: fixed;
+            top: 50%;
+            left: 50%;
+            transform: translate(-50%, -50%) rotate(-30deg);
+            font-size: 5rem;
+            color: rgba(0,0,0,0.05);
+            pointer-events: none;
+            user-select: none;
+            z-index: 0;">
+            DRAFT · LawChatAI
+        </div>
+        """
+
 def clean_text(text: str) -> str:
     """
     Normalize newlines, remove excessive blank lines, strip spaces.
@@ -19,7 +58,7 @@ def sanitize_line(line: str) -> str:
     # Escape HTML special chars
     line = html.escape(line)
     # Remove non-printable characters
-    line = re.sub(r"[\x00-\x1f\x7f-\x9f]", "", line)
+    line = CONTROL_CHARS.sub("", line)
     # Truncate to MAX_LINE_LENGTH
     if len(line) > MAX_LINE_LENGTH:
         line = line[:MAX_LINE_LENGTH] + "…"
@@ -51,20 +90,59 @@ def format_nda_text(nda_text: str, include_watermark: bool = False) -> str:
 
     # Optional watermark overlay
     if include_watermark:
-        watermark_html = """
-        <div style="
-            position: fixed;
-            top: 50%;
-            left: 50%;
-            transform: translate(-50%, -50%) rotate(-30deg);
-            font-size: 5rem;
-            color: rgba(0,0,0,0.05);
-            pointer-events: none;
-            user-select: none;
-            z-index: 0;">
-            DRAFT · LawChatAI
-        </div>
-        """
-        html_lines.insert(0, watermark_html)
+        html_lines.insert(0, WATERMARK_HTML)
 
     return "\n".join(html_lines)
+
+
+def safe_text(text: str) -> str:
+    return html.escape(CONTROL_CHARS.sub("", text))
+
+
+def render_clause_html(clause, out):
+    """
+    Append the HTML of one clause of the document model to `out`.
+    """
+    if clause["heading"]:
+        out.append(f"<h2 class='font-semibold mt-6 mb-2'>{safe_text(clause['heading'])}</h2>")
+
+    for block in clause["blocks"]:
+        kind = block["t"]
+        if kind == "p":
+            out.append(f"<p class='text-sm leading-7'>{safe_text(block['text'])}</p>")
+        elif kind == "list":
+            out.append("<ul class='text-sm leading-7'>")
+            out.extend(f"<li>{safe_text(item)}</li>" for item in block["items"])
+            out.append("</ul>")
+        else:  # "lines"
+            lines = "<br>".join(safe_text(item) for item in block["items"])
+            out.append(f"<p class='text-sm leading-7'>{lines}</p>")
+
+
+def external_references(render_html: str):
+    """
+    Network references left in a render HTML, should always be empty.
+    """
+    return [match.group(0) for match in EXTERNAL_REF.finditer(render_html)]
+
+
+def clause_text(clause) -> str:
+    """
+    Plain text of a clause body, as shown in the editable preview.
+    """
+    parts = []
+    for block in clause["blocks"]:
+        parts.append(block["text"] if block["t"] == "p" else "\n".join(block["items"]))
+    return "\n\n".join(parts)
+
+
+def render_document_html(document, include_watermark: bool = False) -> str:
+    """
+    Single pass over the structured document model (see
+    AgreementType.build_document): headings and blocks are already known,
+    nothing is re-parsed and nothing is truncated.
+    """
+    out = [WATERMARK_HTML] if include_watermark else []
+    for clause in document["clauses"]:
+        render_clause_html(clause, out)
+    return "\n".join(out)
@@ -1,148 +1,115 @@
-from datetime import datetime
+from services.agreements import get_agreement
+from services.agreements.fields import normalize_date  # noqa: F401 (public helper)
 
 
-def normalize_date(date_str: str) -> str:
+def generate_agreement(agreement_type, data):
     """
-    Normalizes date input to 'DD Month YYYY' format.
-    Accepts messy inputs like '2026-01-03', '2026-01-\n03'.
-    Falls back safely if parsing fails.
+    Render the plain-text agreement of the given registered type.
     """
-    if not date_str:
-        return "__________"
-
-    cleaned = date_str.replace("\n", "").strip()
-
-    try:
-        return datetime.strptime(cleaned, "%Y-%m-%d").strftime("%d %B %Y")
-    except Exception:
-        return cleaned
+    return get_agreement(agreement_type).render_text(data)
 
 
 def generate_employment_nda(data):
-    def get_value(key, default=""):
-        return data.get(key, [default])[0].strip()
-
-    employer_name = get_value("employer_name")
-    employee_name = get_value("employee_name")
-    designation = get_value("designation")
-
-    raw_date = get_value("effective_date", "")
-    effective_date = normalize_date(raw_date)
-
-    governing_law = get_value("governing_law", "laws of India")
-    jurisdiction = get_value("jurisdiction", "Courts at New Delhi")
-
-    confidential_items = data.get("confidential[]", [])
-    if confidential_items:
-        confidential_text = ", ".join(confidential_items)
-    else:
-        confidential_text = (
-            "business plans, source code, software architecture, algorithms, "
-            "trade secrets, customer and vendor data, financial information, "
-            "internal documents, processes, policies, product designs, "
-            "and proprietary technical or commercial information"
-        )
-
-    nda = f"""
-
-This Employment Non-Disclosure Agreement (“Agreement”) is entered into on
-{effective_date} between {employer_name}, a company incorporated
-under the laws of India, and {employee_name}, employed as {designation}.
-
-1. Purpose and Consideration
-
-In the course of Employee’s employment, and in consideration of Employee’s employment,
-continued employment, access to Confidential Information, and other good and valuable
-consideration, the receipt and sufficiency of which are hereby acknowledged, Employee
-agrees to comply with the obligations set out in this Agreement.
-
-2. Definition of Confidential Information
-
-“Confidential Information” means all information, whether written, electronic, oral,
-visual, or in any other form, disclosed to Employee by the Company or accessed by Employee
-during employment, that is not generally available to the public and is reasonably
-understood to be confidential, including but not limited to: {confidential_text}.
-
-Confidential Information does not include information that:
-(a) is publicly available through no fault of the Employee;
-(b) was lawfully known to the Employee prior to disclosure by the Company;
-(c) is lawfully received from a third party without breach of any obligation; or
-(d) is required to be disclosed pursuant to law, regulation, or court order,
-provided the Employee gives prompt written notice to the Company where legally permissible.
-
-3. Non-Disclosure and Limited Use
-
-The Employee shall not, directly or indirectly, during or after employment, disclose,
-publish, communicate, or make available any Confidential Information to any third party,
-or use such Confidential Information for any purpose other than in the ordinary course
-of performing duties for the Company, without the prior written consent of the Company.
+    return generate_agreement("emp-nda", data)
 
-4. Ownership of Confidential Information
 
-All Confidential Information shall remain the exclusive property of the Company.
-Nothing in this Agreement shall be construed as granting the Employee any license or
-ownership rights in the Confidential Information except as strictly required for the
-performance of employment duties.
+MAX_CLAUSE_CHARS = 5000     # Cap on one edited clause
+MAX_PREVIEW_FIELDS = 50     # Form fields in one live-preview delta
+MAX_FIELD_VALUES = 20       # Values of one multi-valued field
+MAX_FIELD_CHARS = 1000      # Cap on one field value
 
-5. Confidential Information of Third Parties
 
-The Employee agrees not to improperly use or disclose any confidential or proprietary
-information belonging to any third party that the Employee may access in the course
-of employment with the Company.
-
-6. Return of Company Property
-
-Upon termination of employment for any reason, or upon the Company’s request, the
-Employee shall promptly return all documents, data, records, devices, and materials
-containing Confidential Information, whether in physical or electronic form, and shall
-not retain any copies thereof.
-
-7. Survival of Obligations
-
-The obligations under this Agreement shall survive termination of employment and shall
-continue for so long as the Confidential Information remains confidential under
-applicable law.
+def build_agreement(agreement_type, data):
+    """
+    Resolve the form once and build the structured document model.
+    Returns (values, document).
+    """
+    agreement = get_agreement(agreement_type)
+    values = agreement.resolve(data)
+    return values, agreement.build_document(data, values)
 
-8. Remedies
 
-The Employee acknowledges that any breach or threatened breach of this Agreement may
-cause irreparable harm to the Company for which monetary damages may be inadequate.
-Accordingly, the Company shall be entitled to seek injunctive, equitable, and other
-appropriate relief, in addition to any other remedies available at law.
+def update_agreement(agreement_type, data, values, document):
+    """
+    Re-resolve `data` and rebuild only the clauses whose placeholders
+    changed. Returns (values, document, indexes of the changed clauses);
+    unchanged clauses are shared with the `document` passed in.
+    """
+    agreement = get_agreement(agreement_type)
+    new_values = agreement.resolve(data)
+    changed = agreement.changed_clauses(values, new_values)
+    if not changed:
+        return new_values, document, []
 
-9. General Provisions
+    clauses = list(document["clauses"])
+    for index in changed:
+        clauses[index] = agreement.build_clause(index, new_values)
+    return new_values, dict(document, clauses=clauses), changed
 
-(a) Severability: If any provision of this Agreement is held unenforceable, the
-remaining provisions shall continue in full force and effect.
 
-(b) Entire Agreement: This Agreement constitutes the entire agreement between the
-parties with respect to confidentiality and supersedes all prior agreements or
-understandings on the subject.
+def parse_form_delta(fields):
+    """
+    Validate a live-preview delta: form field -> value or list of values,
+    shaped like `request.form.to_dict(flat=False)`. An empty list means the
+    field was cleared. Raises ValueError on anything else.
+    """
+    if not isinstance(fields, dict) or len(fields) > MAX_PREVIEW_FIELDS:
+        raise ValueError("fields must be an object of at most "
+                         f"{MAX_PREVIEW_FIELDS} entries")
 
-(c) Waiver: The failure of either party to enforce any provision shall not constitute
-a waiver of such provision.
+    delta = {}
+    for key, value in fields.items():
+        # Draft forms are stored in Mongo, keep keys storable
+        if not key or key.startswith("$") or "." in key:
+            raise ValueError(f"Invalid field name {key!r}")
 
-(d) Governing Law: This Agreement shall be governed by and construed in accordance with
-the {governing_law}.
+        items = value if isinstance(value, list) else [value]
+        if len(items) > MAX_FIELD_VALUES:
+            raise ValueError(f"Too many values for {key!r}")
+        for item in items:
+            if not isinstance(item, str) or len(item) > MAX_FIELD_CHARS:
+                raise ValueError(f"Invalid value for {key!r}")
 
-(e) Jurisdiction: {jurisdiction} shall have exclusive jurisdiction.
+        delta[key] = items
+    return delta
 
-IN WITNESS WHEREOF, the parties have executed this Agreement as of the Effective Date.
 
-Employee:
-Signature: ______________________
-Name: {employee_name}
-Designation: {designation}
-Date: ______________________
+def edited_blocks(text):
+    """
+    Blocks for a clause body edited in the preview. The user's own line
+    breaks are kept, blank lines separate paragraphs.
+    """
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    blocks = []
+    for chunk in text.split("\n\n"):
+        lines = [line.strip() for line in chunk.split("\n") if line.strip()]
+        if lines:
+            blocks.append({"t": "lines", "items": lines})
+    return blocks
 
-Company:
-Signature: ______________________
-Name: {employer_name}
-Designation: ____________________
-Date: ______________________
-"""
 
-    return nda.strip()
+def apply_clause_edits(document, edits):
+    """
+    Return a copy of `document` with the edited clause bodies replaced.
+    `edits` maps clause id -> edited text. Raises ValueError on an unknown
+    clause id or an oversized edit.
+    """
+    if not edits:
+        return document
+
+    clause_ids = {clause["id"] for clause in document["clauses"]}
+    for clause_id, text in edits.items():
+        if clause_id not in clause_ids or not isinstance(text, str):
+            raise ValueError(f"Unknown clause {clause_id!r}")
+        if len(text) > MAX_CLAUSE_CHARS:
+            raise ValueError(f"Clause {clause_id!r} exceeds {MAX_CLAUSE_CHARS} characters")
+
+    clauses = [
+        dict(clause, blocks=edited_blocks(edits[clause["id"]]), edited=True)
+        if clause["id"] in edits else clause
+        for clause in document["clauses"]
+    ]
+    return dict(document, clauses=clauses)
 
 
 # def generate_employment_nda(data):
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+from flask import Response, request
+
+from services.cache import TTLCache
+
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "1") == "1"
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "2048"))
+PAGE_CACHE_MAX_MB = int(os.getenv("PAGE_CACHE_MAX_MB", "32"))
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", "600"))
+# Bumps every ETag on deploy; templates are hashed, Python view code is not
+PAGE_CACHE_VERSION = os.getenv("PAGE_CACHE_VERSION") or os.getenv("VERCEL_GIT_COMMIT_SHA", "")
+
+ROOT = Path(__file__).resolve().parent.parent
+TEMPLATE_DIRS = (ROOT / "templates", ROOT / "static")
+
+_fragments = TTLCache(maxsize=PAGE_CACHE_SIZE, ttl=PAGE_CACHE_TTL,
+                      max_bytes=PAGE_CACHE_MAX_MB * 1024 * 1024)
+_generations = TTLCache(maxsize=PAGE_CACHE_SIZE * 4)
+_version_lock = threading.Lock()
+_template_version = None
+
+
+def template_version() -> str:
+    """
+    Hash of every template and static asset, computed once per process.
+    """
+    global _template_version
+
+    with _version_lock:
+        if _template_version is None:
+            digest = hashlib.sha256(PAGE_CACHE_VERSION.encode())
+            for directory in TEMPLATE_DIRS:
+                for path in sorted(directory.rglob("*")):
+                    if path.is_file():
+                        digest.update(str(path.relative_to(ROOT)).encode())
+                        digest.update(path.read_bytes())
+            _template_version = digest.hexdigest()[:16]
+
+    return _template_version
+
+
+def page_etag(page, *inputs) -> str:
+    """
+    Strong ETag for `page` rendered from `inputs` (anything with a stable repr).
+    """
+    raw = repr((template_version(), page, inputs)).encode()
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+def invalidate_user_pages(user_id):
+    """
+    Drop a user's cached fragments, e.g. after their credits or documents changed.
+    """
+    key = str(user_id)
+    _generations.set(key, _generations.get(key, 0) + 1)
+
+
+def _not_modified(etag):
+    response = Response(status=304)
+    return _cache_headers(response, etag)
+
+
+def _cache_headers(response, etag):
+    response.set_etag(etag)
+    # Per-user pages: browsers may keep them but must revalidate every time
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Cookie")
+    return response
+
+
+def cached_page(user_id, page, inputs, render):
+    """
+    Conditional GET for a rendered page.
+
+    `inputs` must capture everything the page depends on. A matching
+    If-None-Match gets a 304 with no render; otherwise the HTML comes from
+    the per-user fragment cache, or from `render()` on a miss.
+    """
+    if not PAGE_CACHE_ENABLED:
+        return render()
+
+    etag = page_etag(page, *inputs)
+    if request.if_none_match.contains(etag):
+        return _not_modified(etag)
+
+    owner = str(user_id) if user_id is not None else "*"
+    key = (owner, _generations.get(owner, 0), etag)
+
+    html = _fragments.get(key)
+    if html is None:
+        html = render()
+        _fragments.set(key, html)
+
+    return _cache_headers(Response(html, mimetype="text/html"), etag)
@@ -0,0 +1,207 @@
+import hashlib
+import uuid
+from datetime import datetime
+
+from pymongo import ReturnDocument
+
+from services.aio import async_collection, run_blocking
+from services.cache import TTLCache
+
+
+class PDFRenderCache:
+    """
+    Content-addressed cache of rendered PDFs.
+
+    Keyed by the SHA-256 of the final render HTML. Two tiers:
+      - in-process LRU of PDF bytes (bounded by `memory_bytes`)
+      - persistent: one shared R2 object per hash + a Mongo record holding
+        its reference count (one ref per `document_history` entry)
+
+    The reference is taken before the upload, and every record gets an
+    object key of its own: once a record is deleted its key is never
+    written again, so deleting the object cannot race a new upload.
+    """
+
+    def __init__(self, collection, r2_client, bucket, memory_bytes=64 * 1024 * 1024):
+        self.collection = collection
+        self.r2_client = r2_client
+        self.bucket = bucket
+        self.memory = TTLCache(maxsize=1024, max_bytes=memory_bytes)
+
+    @staticmethod
+    def key_for(html: str) -> str:
+        return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _new_object_key(content_hash: str) -> str:
+        return f"documents/shared/{content_hash}-{uuid.uuid4().hex[:12]}.pdf"
+
+    def acquire(self, content_hash: str):
+        """
+        Take a reference on an existing render.
+        Returns (PDF bytes, object key), or None on a miss.
+        """
+        record = self.collection.find_one_and_update(**self._acquire_query(content_hash))
+
+        if not record:
+            self.memory.pop(content_hash)
+            return None
+
+        pdf_bytes = self.memory.get(content_hash)
+        if pdf_bytes is not None:
+            return pdf_bytes, record["object_key"]
+
+        try:
+            pdf_bytes = self._download(record["object_key"])
+        except Exception:
+            # Object vanished underneath the record (or is still being
+            # uploaded), give the ref back and fall through to a fresh render
+            self.release(content_hash)
+            return None
+
+        self.memory.set(content_hash, pdf_bytes)
+        return pdf_bytes, record["object_key"]
+
+    async def acquire_async(self, content_hash: str):
+        """
+        acquire() for the asyncio serving mode.
+        """
+        record = await async_collection(self.collection).find_one_and_update(
+            **self._acquire_query(content_hash)
+        )
+
+        if not record:
+            self.memory.pop(content_hash)
+            return None
+
+        pdf_bytes = self.memory.get(content_hash)
+        if pdf_bytes is not None:
+            return pdf_bytes, record["object_key"]
+
+        try:
+            pdf_bytes = await run_blocking(self._download, record["object_key"])
+        except Exception:
+            await run_blocking(self.release, content_hash)
+            return None
+
+        self.memory.set(content_hash, pdf_bytes)
+        return pdf_bytes, record["object_key"]
+
+    @staticmethod
+    def _acquire_query(content_hash):
+        # Only live objects (refs > 0) can be shared, a record that dropped
+        # to zero is being deleted
+        return dict(
+            filter={"_id": content_hash, "refs": {"$gt": 0}},
+            update={"$inc": {"refs": 1}, "$set": {"last_used_at": datetime.now()}},
+            projection={"object_key": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _download(self, object_key):
+        obj = self.r2_client.get_object(Bucket=self.bucket, Key=object_key)
+        return obj["Body"].read()
+
+    def _upload(self, object_key, pdf_bytes):
+        self.r2_client.put_object(
+            Bucket=self.bucket,
+            Key=object_key,
+            Body=pdf_bytes,
+            ContentType="application/pdf",
+        )
+
+    def store(self, content_hash: str, pdf_bytes: bytes) -> str:
+        """
+        Take a reference on `content_hash` and upload a fresh render under
+        its object key. Returns the object key.
+        """
+        object_key = self.register(content_hash, len(pdf_bytes))
+
+        try:
+            self._upload(object_key, pdf_bytes)
+        except Exception:
+            self.release(content_hash)
+            raise
+
+        self.memory.set(content_hash, pdf_bytes)
+        return object_key
+
+    async def store_async(self, content_hash: str, pdf_bytes: bytes) -> str:
+        """
+        store() for the asyncio serving mode.
+        """
+        record = await async_collection(self.collection).find_one_and_update(
+            **self._register_query(content_hash, len(pdf_bytes))
+        )
+        object_key = record["object_key"]
+
+        try:
+            await run_blocking(self._upload, object_key, pdf_bytes)
+        except Exception:
+            await run_blocking(self.release, content_hash)
+            raise
+
+        self.memory.set(content_hash, pdf_bytes)
+        return object_key
+
+    def register(self, content_hash: str, size: int = 0) -> str:
+        """
+        Take a reference on `content_hash` before its object is uploaded,
+        e.g. by a streaming upload. Returns the object key to upload to;
+        release() the reference if the upload fails.
+        """
+        record = self.collection.find_one_and_update(
+            **self._register_query(content_hash, size)
+        )
+        return record["object_key"]
+
+    def _register_query(self, content_hash, size):
+        # Also revives a record at zero refs that release() has not
+        # deleted yet: its conditional delete then leaves it alone
+        now = datetime.now()
+        return dict(
+            filter={"_id": content_hash},
+            update={
+                "$inc": {"refs": 1},
+                "$set": {"last_used_at": now},
+                "$setOnInsert": {
+                    "object_key": self._new_object_key(content_hash),
+                    "size": size,
+                    "created_at": now,
+                },
+            },
+            projection={"object_key": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def release(self, content_hash: str, count: int = 1) -> bool:
+        """
+        Drop `count` references. The shared R2 object is deleted only when the
+        last reference goes away. Returns True if the object was deleted.
+        """
+        record = self.collection.find_one_and_update(
+            {"_id": content_hash},
+            {"$inc": {"refs": -count}},
+            projection={"object_key": 1, "refs": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+
+        if not record or record["refs"] > 0:
+            return False
+
+        # Conditional delete: a concurrent store() may have re-referenced it.
+        # Once the record is gone its object key is never reused, so the
+        # object can go without racing a new upload
+        result = self.collection.delete_one(
+            {"_id": content_hash, "refs": {"$lte": 0}}
+        )
+        if not result.deleted_count:
+            return False
+
+        self.memory.pop(content_hash)
+        self.r2_client.delete_object(
+            Bucket=self.bucket,
+            Key=record["object_key"],
+        )
+        return True
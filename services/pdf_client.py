@@ -0,0 +1,310 @@
+import gzip
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+
+class PDFClientError(Exception):
+    pass
+
+
+class CircuitOpenError(PDFClientError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    closed → open after `failure_threshold` consecutive failures;
+    open → half-open after `reset_timeout` seconds, letting one probe through;
+    half-open → closed on success, back to open on failure.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half-open"
+                self._probing = False
+
+            # half-open: a single probe at a time
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_abandoned(self):
+        """
+        The call ended without telling anything about the service (e.g. it
+        was cancelled): free the probe slot, so the next caller probes.
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half-open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class PDFServiceClient:
+    """
+    Pooled keep-alive client for the remote PDF service.
+
+    Request bodies are gzip-compressed; connection errors and 429/5xx
+    gateway responses are retried with full-jitter exponential backoff;
+    a circuit breaker fails fast while the service is unhealthy.
+    """
+
+    def __init__(
+        self,
+        url,
+        token,
+        pool_size=10,
+        connect_timeout=5,
+        read_timeout=60,
+        retries=2,
+        backoff_base=0.25,
+        backoff_max=2.0,
+        compress=True,
+        breaker=None,
+    ):
+        self.url = url
+        self.token = token
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.compress = compress
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = self._session(pool_size, connect_timeout, read_timeout)
+
+        # Most recent per-attempt timings, newest last
+        self.attempts = deque(maxlen=200)
+
+    def _session(self, pool_size, connect_timeout, read_timeout):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _body(self, html):
+        body = json.dumps({"html": html}).encode("utf-8")
+        headers = {
+            "X-INTERNAL-TOKEN": self.token,
+            "Content-Type": "application/json",
+        }
+
+        if self.compress:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+
+        return body, headers
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _record(self, attempt, started, status=None, error=None):
+        timing = {
+            "attempt": attempt,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "status": status,
+            "error": error,
+        }
+        self.attempts.append(timing)
+        logger.debug(f"PDF service attempt: {timing}")
+
+    def post(self, html, stream=False):
+        """
+        POST the HTML and return the successful `requests.Response`.
+        Raises PDFClientError on failure, CircuitOpenError when failing fast.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError("PDF service unavailable (circuit open)")
+
+        try:
+            return self._post(html, stream)
+        except PDFClientError:
+            raise
+        except BaseException:
+            # No verdict recorded: don't leave a half-open probe held forever
+            self.breaker.record_abandoned()
+            raise
+
+    def _post(self, html, stream):
+        body, headers = self._body(html)
+        last_error = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self._backoff(attempt))
+
+            started = time.perf_counter()
+            try:
+                resp = self.session.post(
+                    self.url,
+                    data=body,
+                    headers=headers,
+                    timeout=self.timeout,
+                    stream=stream,
+                )
+            except requests.exceptions.ConnectionError as e:
+                # Includes connect timeouts: nothing reached the service
+                self._record(attempt, started, error="connection")
+                last_error = PDFClientError(f"PDF service request failed: {str(e)}")
+                continue
+            except requests.exceptions.Timeout:
+                # Read timeout: the service got the job, don't pile on
+                self._record(attempt, started, error="timeout")
+                last_error = PDFClientError("PDF service timeout")
+                break
+            except requests.exceptions.RequestException as e:
+                self._record(attempt, started, error="request")
+                last_error = PDFClientError(f"PDF service request failed: {str(e)}")
+                break
+
+            self._record(attempt, started, status=resp.status_code)
+
+            if resp.status_code == 200:
+                self.breaker.record_success()
+                return resp
+
+            last_error = PDFClientError(
+                f"PDF service error {resp.status_code}: {resp.text[:300]}"
+            )
+            resp.close()
+
+            if resp.status_code not in RETRYABLE_STATUS:
+                # 4xx: our request is wrong, the service itself is fine
+                if resp.status_code < 500:
+                    self.breaker.record_success()
+                    raise last_error
+                break
+
+        self.breaker.record_failure()
+        raise last_error
+
+
+class AsyncPDFServiceClient(PDFServiceClient):
+    """
+    PDFServiceClient for the asyncio serving mode, on an httpx.AsyncClient.
+
+    Same body encoding, retry policy and circuit breaker; a render in
+    flight costs an open connection, not a thread, so `pool_size` can be
+    in the hundreds. Reads the whole body (no streaming).
+    """
+
+    def _session(self, pool_size, connect_timeout, read_timeout):
+        import httpx
+
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout, pool=read_timeout),
+        )
+
+    async def post(self, html):
+        """
+        POST the HTML and return the successful `httpx.Response`.
+        Raises PDFClientError on failure, CircuitOpenError when failing fast.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError("PDF service unavailable (circuit open)")
+
+        try:
+            return await self._post_async(html)
+        except PDFClientError:
+            raise
+        except BaseException:
+            # Cancelled (client went away) or unexpected: free the probe
+            self.breaker.record_abandoned()
+            raise
+
+    async def _post_async(self, html):
+        import asyncio
+        import httpx
+
+        body, headers = self._body(html)
+        last_error = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self._backoff(attempt))
+
+            started = time.perf_counter()
+            try:
+                resp = await self.session.post(self.url, content=body, headers=headers)
+            except (httpx.NetworkError, httpx.RemoteProtocolError,
+                    httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # What requests calls a ConnectionError: refused, reset or
+                # dropped connections, no free connection in the pool
+                self._record(attempt, started, error="connection")
+                last_error = PDFClientError(f"PDF service request failed: {str(e)}")
+                continue
+            except httpx.TimeoutException:
+                # Read timeout: the service got the job, don't pile on
+                self._record(attempt, started, error="timeout")
+                last_error = PDFClientError("PDF service timeout")
+                break
+            except httpx.HTTPError as e:
+                self._record(attempt, started, error="request")
+                last_error = PDFClientError(f"PDF service request failed: {str(e)}")
+                break
+
+            self._record(attempt, started, status=resp.status_code)
+
+            if resp.status_code == 200:
+                self.breaker.record_success()
+                return resp
+
+            last_error = PDFClientError(
+                f"PDF service error {resp.status_code}: {resp.text[:300]}"
+            )
+
+            if resp.status_code not in RETRYABLE_STATUS:
+                # 4xx: our request is wrong, the service itself is fine
+                if resp.status_code < 500:
+                    self.breaker.record_success()
+                    raise last_error
+                break
+
+        self.breaker.record_failure()
+        raise last_error
+
+    async def close(self):
+        await self.session.aclose()
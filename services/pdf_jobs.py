@@ -0,0 +1,259 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryJobStore:
+    """
+    In-process backend: jobs live in a dict, pending ids in a queue.
+    Only the process that enqueued a job can run or report on it, so with
+    several app workers a status poll can land on one that never saw the
+    job: use MongoJobStore there. Finished jobs are dropped after
+    `retention` seconds.
+    """
+
+    def __init__(self, retention=86400):
+        self.retention = retention
+
+        self._jobs = {}
+        self._pending = queue.Queue()
+        self._lock = threading.Lock()
+
+    def insert(self, job):
+        with self._lock:
+            self._jobs[job["_id"]] = job
+        self._pending.put(job["_id"])
+
+    def claim(self, timeout, lease):
+        try:
+            job_id = self._pending.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+        now = datetime.now()
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = "running"
+            job["started_at"] = now
+            job["lease_until"] = now + timedelta(seconds=lease)
+            return dict(job)
+
+    def renew(self, job_ids, lease):
+        lease_until = datetime.now() + timedelta(seconds=lease)
+        with self._lock:
+            for job_id in job_ids:
+                job = self._jobs.get(job_id)
+                if job and job["status"] == "running":
+                    job["lease_until"] = lease_until
+
+    def finish(self, job_id, fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job["status"] != "running":
+                return False
+            job.update(fields)
+            return True
+
+    def expire(self, now):
+        expired = []
+        evict_before = now - timedelta(seconds=self.retention)
+
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job["status"] == "running" and job["lease_until"] < now:
+                    job.update(status="failed", error="lease expired", finished_at=now)
+                    expired.append(dict(job))
+                elif job.get("finished_at") and job["finished_at"] < evict_before:
+                    del self._jobs[job_id]
+
+        return expired
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+
+class MongoJobStore:
+    """
+    Mongo-backed backend: any process running workers can claim a job,
+    and any process can report its status. Finished jobs expire through
+    the TTL index on `finished_at` (services/db.py).
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def insert(self, job):
+        self.collection.insert_one(job)
+
+    def claim(self, timeout, lease):
+        now = datetime.now()
+        job = self.collection.find_one_and_update(
+            {"status": "queued"},
+            {"$set": {
+                "status": "running",
+                "started_at": now,
+                "lease_until": now + timedelta(seconds=lease),
+            }},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+        if job is None:
+            time.sleep(timeout)
+
+        return job
+
+    def renew(self, job_ids, lease):
+        if job_ids:
+            self.collection.update_many(
+                {"_id": {"$in": list(job_ids)}, "status": "running"},
+                {"$set": {"lease_until": datetime.now() + timedelta(seconds=lease)}},
+            )
+
+    def finish(self, job_id, fields):
+        result = self.collection.update_one(
+            {"_id": job_id, "status": "running"}, {"$set": fields}
+        )
+        return result.matched_count == 1
+
+    def expire(self, now):
+        # One at a time, so each expired job is failed (and handed to
+        # on_failure) by exactly one process
+        expired = []
+        while True:
+            job = self.collection.find_one_and_update(
+                {"status": "running", "lease_until": {"$lt": now}},
+                {"$set": {"status": "failed", "error": "lease expired", "finished_at": now}},
+                return_document=ReturnDocument.AFTER,
+            )
+            if job is None:
+                return expired
+            expired.append(job)
+
+    def get(self, job_id):
+        return self.collection.find_one({"_id": job_id}, {"payload": 0})
+
+
+class JobQueue:
+    """
+    Background worker pool for PDF generation.
+
+    `handler(payload)` does the work and returns a result dict stored on the
+    job; if it raises, the job is marked failed and `on_failure(payload, exc)`
+    runs (e.g. to roll back a reserved credit).
+
+    A running job holds a lease of `lease` seconds, renewed while its
+    worker is alive. Jobs whose lease ran out (the process died mid-render)
+    are failed by the next reaper pass, in any process, with on_failure.
+    """
+
+    def __init__(self, store, handler, on_failure=None, workers=4, poll_interval=0.5,
+                 lease=120):
+        self.store = store
+        self.handler = handler
+        self.on_failure = on_failure
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.lease = lease
+
+        self._threads = []
+        self._running = set()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+
+            for i in range(self.workers):
+                t = threading.Thread(
+                    target=self._run, name=f"pdf-job-{i}", daemon=True
+                )
+                t.start()
+                self._threads.append(t)
+
+            t = threading.Thread(target=self._reap, name="pdf-job-reaper", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, user_id, payload) -> str:
+        job_id = uuid.uuid4().hex
+        self.store.insert({
+            "_id": job_id,
+            "user_id": user_id,
+            "status": "queued",
+            "payload": payload,
+            "result": None,
+            "error": None,
+            "created_at": datetime.now(),
+        })
+
+        self.start()
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _fail(self, job, error):
+        if self.on_failure:
+            try:
+                self.on_failure(job["payload"], error)
+            except Exception as rollback_error:
+                logger.error(
+                    f"PDF job {job['_id']} failure hook failed: {rollback_error}"
+                )
+
+    def _reap(self):
+        while True:
+            time.sleep(self.lease / 4)
+
+            try:
+                with self._lock:
+                    running = set(self._running)
+                self.store.renew(running, self.lease)
+
+                for job in self.store.expire(datetime.now()):
+                    logger.error(f"PDF job {job['_id']} lost its worker, failing it")
+                    self._fail(job, RuntimeError("lease expired"))
+            except Exception as e:
+                logger.error(f"PDF job reaper failed: {e}")
+
+    def _run(self):
+        while True:
+            job = self.store.claim(self.poll_interval, self.lease)
+            if job is None:
+                continue
+
+            with self._lock:
+                self._running.add(job["_id"])
+
+            try:
+                result = self.handler(job["payload"])
+            except Exception as e:
+                logger.error(f"PDF job {job['_id']} failed: {e}")
+                if self.store.finish(job["_id"], {
+                    "status": "failed",
+                    "error": str(e),
+                    "finished_at": datetime.now(),
+                }):
+                    self._fail(job, e)
+            else:
+                if not self.store.finish(job["_id"], {
+                    "status": "done",
+                    "result": result,
+                    "finished_at": datetime.now(),
+                }):
+                    # Reaped (and rolled back) while this worker was stalled
+                    logger.error(f"PDF job {job['_id']} finished after its lease expired")
+            finally:
+                with self._lock:
+                    self._running.discard(job["_id"])
@@ -0,0 +1,257 @@
+import atexit
+import hashlib
+import importlib.util
+import io
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Off by default: needs pikepdf (in requirements.txt), ghostscript optional
+PDF_OPTIMIZE = os.getenv("PDF_OPTIMIZE", "0") == "1"
+# "pikepdf": lossless restructure; "ghostscript": rewrite through gs first
+# (re-subsets and dedupes fonts), then the pikepdf pass
+PDF_OPTIMIZE_ENGINE = os.getenv("PDF_OPTIMIZE_ENGINE", "pikepdf")
+PDF_OPTIMIZE_WORKERS = int(os.getenv("PDF_OPTIMIZE_WORKERS", "2"))
+# Seconds to wait for a worker before storing the PDF as rendered
+PDF_OPTIMIZE_TIMEOUT = float(os.getenv("PDF_OPTIMIZE_TIMEOUT", "5"))
+# Keep the original unless the result is at least this much smaller
+PDF_OPTIMIZE_MIN_SAVING = float(os.getenv("PDF_OPTIMIZE_MIN_SAVING", "0.02"))
+PDF_OPTIMIZE_LINEARIZE = os.getenv("PDF_OPTIMIZE_LINEARIZE", "1") == "1"
+GHOSTSCRIPT_BIN = os.getenv("GHOSTSCRIPT_BIN", "gs")
+
+FONT_FILE_KEYS = ("/FontFile", "/FontFile2", "/FontFile3")
+
+registry.describe("lawchat_pdf_optimize_total", "PDF post-processing runs, by outcome.")
+registry.describe("lawchat_pdf_optimize_bytes_saved_total", "Bytes removed from stored PDFs.")
+
+
+class PDFOptimizeError(Exception):
+    pass
+
+
+def _font_descriptors(pdf):
+    for page in pdf.pages:
+        fonts = page.obj.get("/Resources", {}).get("/Font", {})
+        for font in fonts.values():
+            # Type0 fonts keep their descriptor on the descendant font
+            for candidate in [font, *font.get("/DescendantFonts", [])]:
+                descriptor = candidate.get("/FontDescriptor")
+                if descriptor is not None:
+                    yield descriptor
+
+
+def dedupe_fonts(pdf) -> int:
+    """
+    Point identical embedded font programs at one stream.
+    Returns how many duplicates were dropped.
+    """
+    seen = {}
+    dropped = 0
+
+    for descriptor in _font_descriptors(pdf):
+        for key in FONT_FILE_KEYS:
+            stream = descriptor.get(key)
+            if stream is None:
+                continue
+
+            digest = hashlib.sha256(stream.read_raw_bytes()).digest()
+            first = seen.setdefault((key, digest), stream)
+            if first.objgen != stream.objgen:
+                descriptor[key] = first
+                dropped += 1
+
+    return dropped
+
+
+def strip_metadata(pdf):
+    """
+    Drop the XMP packet and every document info entry but the title.
+    """
+    if "/Metadata" in pdf.Root:
+        del pdf.Root["/Metadata"]
+
+    title = pdf.docinfo.get("/Title")
+    for key in list(pdf.docinfo.keys()):
+        del pdf.docinfo[key]
+    if title is not None:
+        pdf.docinfo["/Title"] = title
+
+
+def _ghostscript(pdf_bytes: bytes) -> bytes:
+    if shutil.which(GHOSTSCRIPT_BIN) is None:
+        raise PDFOptimizeError(f"{GHOSTSCRIPT_BIN} not found")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "in.pdf")
+        target = os.path.join(tmp, "out.pdf")
+        with open(source, "wb") as f:
+            f.write(pdf_bytes)
+
+        result = subprocess.run(
+            [
+                GHOSTSCRIPT_BIN, "-q", "-dBATCH", "-dNOPAUSE", "-dSAFER",
+                "-sDEVICE=pdfwrite", "-dPDFSETTINGS=/printer",
+                "-dSubsetFonts=true", "-dCompressFonts=true",
+                "-dDetectDuplicateImages=true",
+                f"-sOutputFile={target}", source,
+            ],
+            capture_output=True,
+            timeout=PDF_OPTIMIZE_TIMEOUT * 4,
+        )
+        if result.returncode != 0:
+            raise PDFOptimizeError(f"ghostscript failed: {result.stderr[-300:]!r}")
+
+        with open(target, "rb") as f:
+            return f.read()
+
+
+def optimize_pdf(pdf_bytes: bytes, engine=PDF_OPTIMIZE_ENGINE,
+                 linearize=PDF_OPTIMIZE_LINEARIZE) -> bytes:
+    """
+    Smaller, equivalent PDF: fonts deduplicated (and re-subset with
+    ghostscript), metadata stripped, streams recompressed, small objects
+    packed into object streams, optionally linearized for fast first-page
+    display. CPU bound, runs in the worker processes.
+    """
+    import pikepdf
+
+    if engine == "ghostscript":
+        pdf_bytes = _ghostscript(pdf_bytes)
+    elif engine != "pikepdf":
+        raise PDFOptimizeError(f"Unknown PDF_OPTIMIZE_ENGINE: {engine!r}")
+
+    out = io.BytesIO()
+    with pikepdf.open(io.BytesIO(pdf_bytes)) as pdf:
+        dedupe_fonts(pdf)
+        strip_metadata(pdf)
+        pdf.remove_unreferenced_resources()
+        pdf.save(
+            out,
+            compress_streams=True,
+            stream_decode_level=pikepdf.StreamDecodeLevel.generalized,
+            recompress_flate=True,
+            object_stream_mode=pikepdf.ObjectStreamMode.generate,
+            linearize=linearize,
+            deterministic_id=True,
+        )
+
+    return out.getvalue()
+
+
+def _init_worker():
+    import pikepdf
+
+    # Per process setting; these workers only ever optimize
+    pikepdf.settings.set_flate_compression_level(9)
+
+
+class PDFOptimizer:
+    """
+    Runs optimize_pdf() in a small process pool, off the GIL.
+
+    Never fails a download: errors, timeouts and a saturated pool all fall
+    back to the PDF as rendered. At most `workers * 2` jobs are in flight;
+    beyond that the step is skipped rather than queued, so it can't stretch
+    tail latency under load. Workers start on first use (about a second
+    for spawn + pikepdf import), after which a call costs the optimize
+    time plus a copy of the PDF each way.
+    """
+
+    def __init__(self, workers=PDF_OPTIMIZE_WORKERS, timeout=PDF_OPTIMIZE_TIMEOUT,
+                 min_saving=PDF_OPTIMIZE_MIN_SAVING, engine=PDF_OPTIMIZE_ENGINE,
+                 linearize=PDF_OPTIMIZE_LINEARIZE):
+        self.workers = workers
+        self.timeout = timeout
+        self.min_saving = min_saving
+        self.engine = engine
+        self.linearize = linearize
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers * 2)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process with Mongo / browser threads is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+                atexit.register(self.shutdown)
+        return self._executor
+
+    def _count(self, outcome):
+        registry.inc("lawchat_pdf_optimize_total", (("outcome", outcome),))
+
+    def optimize(self, pdf_bytes: bytes) -> bytes:
+        """
+        The optimized PDF if it saves at least `min_saving`, else `pdf_bytes`.
+        """
+        if not self._slots.acquire(blocking=False):
+            self._count("busy")
+            return pdf_bytes
+
+        try:
+            future = self._get_executor().submit(
+                optimize_pdf, pdf_bytes, self.engine, self.linearize
+            )
+        except Exception as e:
+            self._slots.release()
+            self._count("error")
+            logger.warning("PDF optimize unavailable: %s", e)
+            return pdf_bytes
+
+        # The slot is held until the worker is done, even past a timeout
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            optimized = future.result(timeout=self.timeout)
+        except TimeoutError:
+            self._count("timeout")
+            logger.warning("PDF optimize timed out after %ss", self.timeout)
+            return pdf_bytes
+        except Exception as e:
+            self._count("error")
+            logger.warning("PDF optimize failed: %s", e)
+            return pdf_bytes
+
+        saved = len(pdf_bytes) - len(optimized)
+        if saved < len(pdf_bytes) * self.min_saving:
+            self._count("no_gain")
+            return pdf_bytes
+
+        self._count("optimized")
+        registry.inc("lawchat_pdf_optimize_bytes_saved_total", (), saved)
+        logger.info("PDF optimized: %d -> %d bytes (-%d)", len(pdf_bytes), len(optimized), saved)
+        return optimized
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+def _make_optimizer():
+    if not PDF_OPTIMIZE:
+        return None
+
+    # find_spec, not import: pikepdf only loads in the workers
+    if importlib.util.find_spec("pikepdf") is None:
+        logger.warning("PDF_OPTIMIZE=1 but pikepdf is not installed, PDFs are stored as rendered")
+        return None
+    return PDFOptimizer()
+
+
+pdf_optimizer = _make_optimizer()
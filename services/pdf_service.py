@@ -1,64 +1,258 @@
 from datetime import datetime
+import asyncio
+import atexit
 import os
 import tempfile
-from playwright.sync_api import sync_playwright, Playwright
-from playwright.sync_api import Error as PlaywrightError
-import requests
+import threading
 import uuid
 from datetime import datetime
-import boto3
 import os
+from services.lazy import LazyProxy
+from services.metrics import instrument_boto3
 
 R2_ACCOUNT_ID = os.getenv("R2_ACCOUNT_ID")
 R2_ACCESS_KEY_ID = os.getenv("R2_ACCESS_KEY_ID")
 R2_SECRET_ACCESS_KEY = os.getenv("R2_SECRET_ACCESS_KEY")
 R2_BUCKET_NAME = os.getenv("R2_BUCKET_NAME")
 R2_PUBLIC_BASE_URL = os.getenv("R2_PUBLIC_BASE_URL")  # optional
+# Any S3-compatible endpoint instead of R2's, e.g. a local MinIO for load tests
+R2_ENDPOINT_URL = os.getenv("R2_ENDPOINT_URL") or f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com"
 PDF_SERVICE_URL = os.getenv("PDF_SERVICE_URL")
 PDF_SERVICE_TOKEN = os.getenv("PDF_SERVICE_TOKEN")
 
-r2_client = boto3.client(
-    "s3",
-    endpoint_url=f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com",
-    aws_access_key_id=R2_ACCESS_KEY_ID,
-    aws_secret_access_key=R2_SECRET_ACCESS_KEY,
-    region_name="auto",
-)
+# "remote" → PDF_SERVICE_URL, "local" → embedded Chromium pool
+PDF_ENGINE = os.getenv("PDF_ENGINE", "remote")
+PDF_POOL_SIZE = int(os.getenv("PDF_POOL_SIZE", "2"))
+PDF_POOL_MAX_RENDERS = int(os.getenv("PDF_POOL_MAX_RENDERS", "200"))
+PDF_RENDER_TIMEOUT = int(os.getenv("PDF_RENDER_TIMEOUT", "60"))
+
+PDF_SERVICE_POOL_SIZE = int(os.getenv("PDF_SERVICE_POOL_SIZE", "10"))
+PDF_SERVICE_RETRIES = int(os.getenv("PDF_SERVICE_RETRIES", "2"))
+PDF_SERVICE_GZIP = os.getenv("PDF_SERVICE_GZIP", "1") == "1"
+PDF_BREAKER_THRESHOLD = int(os.getenv("PDF_BREAKER_THRESHOLD", "5"))
+PDF_BREAKER_RESET = int(os.getenv("PDF_BREAKER_RESET", "30"))
+# Connections to the PDF service in the asyncio serving mode (asgi.py),
+# i.e. renders one process can have in flight
+PDF_SERVICE_ASYNC_POOL_SIZE = int(os.getenv("PDF_SERVICE_ASYNC_POOL_SIZE", "200"))
+
+def build_r2_client():
+    # boto3 costs ~0.3 s to import and build, pay it on first R2 call
+    import boto3
+
+    return instrument_boto3(boto3.client(
+        "s3",
+        endpoint_url=R2_ENDPOINT_URL,
+        aws_access_key_id=R2_ACCESS_KEY_ID,
+        aws_secret_access_key=R2_SECRET_ACCESS_KEY,
+        region_name="auto",
+    ))
+
+
+r2_client = LazyProxy(build_r2_client, "r2_client")
 
 
 class PDFServiceError(Exception):
     pass
 
+
+_browser_pool = None
+_browser_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    global _browser_pool
+
+    if _browser_pool is not None:
+        return _browser_pool
+
+    # Two first renders racing must not each launch a set of browsers
+    with _browser_pool_lock:
+        if _browser_pool is None:
+            from services.browser_pool import BrowserPool
+
+            pool = BrowserPool(
+                size=PDF_POOL_SIZE,
+                max_renders=PDF_POOL_MAX_RENDERS,
+            )
+            pool.start()
+            atexit.register(pool.shutdown)
+            _browser_pool = pool
+
+    return _browser_pool
+
+
+def generate_pdf_local(html: str) -> bytes:
+    from services.browser_pool import BrowserPoolError
+
+    try:
+        pdf_bytes = get_browser_pool().render(html, timeout=PDF_RENDER_TIMEOUT)
+    except BrowserPoolError as e:
+        raise PDFServiceError(str(e))
+    except Exception as e:
+        raise PDFServiceError(f"Local PDF render failed: {str(e)}")
+
+    if not pdf_bytes:
+        raise PDFServiceError("Empty PDF response")
+
+    return pdf_bytes
+
+
+def render_pdf(html: str) -> bytes:
+    """
+    Render HTML to PDF bytes with the configured engine (PDF_ENGINE).
+    """
+    if PDF_ENGINE == "local":
+        return generate_pdf_local(html)
+
+    return generate_pdf_remote(html)
+
+
+_pdf_client = None
+_async_pdf_client = None
+_pdf_breaker = None
+_pdf_client_lock = threading.Lock()
+
+
+def _get_breaker():
+    # One breaker per process: the sync and async clients see the same service
+    global _pdf_breaker
+
+    if _pdf_breaker is None:
+        from services.pdf_client import CircuitBreaker
+
+        _pdf_breaker = CircuitBreaker(
+            failure_threshold=PDF_BREAKER_THRESHOLD,
+            reset_timeout=PDF_BREAKER_RESET,
+        )
+    return _pdf_breaker
+
+
+def get_pdf_client():
+    global _pdf_client
+
+    with _pdf_client_lock:
+        if _pdf_client is None:
+            # requests (~0.1 s) is only imported once a remote render happens
+            from services.pdf_client import PDFServiceClient
+
+            _pdf_client = PDFServiceClient(
+                PDF_SERVICE_URL,
+                PDF_SERVICE_TOKEN,
+                pool_size=PDF_SERVICE_POOL_SIZE,
+                read_timeout=PDF_RENDER_TIMEOUT,
+                retries=PDF_SERVICE_RETRIES,
+                compress=PDF_SERVICE_GZIP,
+                breaker=_get_breaker(),
+            )
+
+    return _pdf_client
+
+
+def get_async_pdf_client():
+    global _async_pdf_client
+
+    with _pdf_client_lock:
+        if _async_pdf_client is None:
+            from services.pdf_client import AsyncPDFServiceClient
+
+            _async_pdf_client = AsyncPDFServiceClient(
+                PDF_SERVICE_URL,
+                PDF_SERVICE_TOKEN,
+                pool_size=PDF_SERVICE_ASYNC_POOL_SIZE,
+                read_timeout=PDF_RENDER_TIMEOUT,
+                retries=PDF_SERVICE_RETRIES,
+                compress=PDF_SERVICE_GZIP,
+                breaker=_get_breaker(),
+            )
+
+    return _async_pdf_client
+
+
+async def close_async_pdf_client():
+    global _async_pdf_client
+
+    client, _async_pdf_client = _async_pdf_client, None
+    if client is not None:
+        await client.close()
+
+
 def generate_pdf_remote(html: str) -> bytes:
     if not PDF_SERVICE_URL or not PDF_SERVICE_TOKEN:
         raise PDFServiceError("PDF service not configured")
 
+    from services.pdf_client import PDFClientError
+
     try:
-        resp = requests.post(
-            PDF_SERVICE_URL,
-            json={"html": html},
-            headers={
-                "X-INTERNAL-TOKEN": PDF_SERVICE_TOKEN,
-                "Content-Type": "application/json",
-            },
-            timeout=60,
-        )
+        resp = get_pdf_client().post(html)
+    except PDFClientError as e:
+        raise PDFServiceError(str(e))
 
-        if resp.status_code != 200:
-            raise PDFServiceError(
-                f"PDF service error {resp.status_code}: {resp.text[:300]}"
-            )
+    if not resp.content:
+        raise PDFServiceError("Empty PDF response")
+
+    return resp.content
+
+
+async def render_pdf_async(html: str) -> bytes:
+    """
+    render_pdf() for the asyncio serving mode. The local browser pool is
+    thread based, so local renders wait on a thread instead.
+    """
+    if PDF_ENGINE == "local":
+        return await asyncio.to_thread(generate_pdf_local, html)
+
+    return await generate_pdf_remote_async(html)
+
+
+async def generate_pdf_remote_async(html: str) -> bytes:
+    if not PDF_SERVICE_URL or not PDF_SERVICE_TOKEN:
+        raise PDFServiceError("PDF service not configured")
+
+    from services.pdf_client import PDFClientError
 
-        if not resp.content:
-            raise PDFServiceError("Empty PDF response")
+    try:
+        resp = await get_async_pdf_client().post(html)
+    except PDFClientError as e:
+        raise PDFServiceError(str(e))
+
+    if not resp.content:
+        raise PDFServiceError("Empty PDF response")
+
+    return resp.content
+
+
+def open_pdf_stream(html: str, chunk_size: int = 64 * 1024):
+    """
+    Start a remote render and return (chunk iterator, content length or None)
+    without reading the body. Errors while iterating raise PDFServiceError.
+    """
+    if not PDF_SERVICE_URL or not PDF_SERVICE_TOKEN:
+        raise PDFServiceError("PDF service not configured")
+
+    import requests
+    from services.pdf_client import PDFClientError
+
+    try:
+        resp = get_pdf_client().post(html, stream=True)
+    except PDFClientError as e:
+        raise PDFServiceError(str(e))
 
-        return resp.content
+    # requests decodes Content-Encoding, the upstream length would be wrong
+    content_length = None
+    if not resp.headers.get("Content-Encoding"):
+        content_length = resp.headers.get("Content-Length")
 
-    except requests.exceptions.Timeout:
-        raise PDFServiceError("PDF service timeout")
+    def chunks():
+        try:
+            for chunk in resp.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    yield chunk
+        except requests.exceptions.RequestException as e:
+            raise PDFServiceError(f"PDF service stream failed: {str(e)}")
+        finally:
+            resp.close()
 
-    except requests.exceptions.RequestException as e:
-        raise PDFServiceError(f"PDF service request failed: {str(e)}")
+    return chunks(), content_length
 
 
 
@@ -66,13 +260,21 @@ def safe_filename(name: str) -> str:
     return "".join(c for c in name if c.isalnum() or c in ("_", "-"))
 
 
-def save_pdf_to_r2(user_id, pdf_bytes, user_name):
-    # 1️⃣ Create filename
+def pdf_filename(user_name):
     timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    filename = f"NDA_{user_name}_{timestamp}.pdf"
+    return f"NDA_{user_name}_{timestamp}.pdf"
+
+
+def r2_object_key(user_id, filename):
+    return f"documents/{user_id}/{uuid.uuid4()}/{filename}"
+
+
+def save_pdf_to_r2(user_id, pdf_bytes, user_name, filename=None):
+    # 1️⃣ Create filename
+    filename = filename or pdf_filename(user_name)
 
     # 2️⃣ CREATE OBJECT KEY (this is the magic)
-    object_key = f"documents/{user_id}/{uuid.uuid4()}/{filename}"
+    object_key = r2_object_key(user_id, filename)
 
     # 3️⃣ Upload to R2 (PRIVATE)
     r2_client.put_object(
@@ -85,3 +287,10 @@ def save_pdf_to_r2(user_id, pdf_bytes, user_name):
     # ❌ No public URL
     return filename, object_key
 
+
+
+async def save_pdf_to_r2_async(user_id, pdf_bytes, user_name, filename=None):
+    # boto3 is blocking: upload from the bounded R2 thread pool
+    from services.aio import run_blocking
+
+    return await run_blocking(save_pdf_to_r2, user_id, pdf_bytes, user_name, filename)
@@ -0,0 +1,204 @@
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# S3 multipart parts must be at least 5 MiB (except the last one)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class R2UploadError(Exception):
+    pass
+
+
+class R2StreamUploader:
+    """
+    Upload a byte stream to R2 on a background thread while it is produced.
+
+    Chunks are handed over through a bounded queue, so a slow upload applies
+    back-pressure instead of buffering. Outputs up to `part_size` bytes go up
+    with one `put_object`; larger ones switch to a multipart upload, holding
+    at most one part in memory.
+    """
+
+    _DONE = object()
+
+    def __init__(self, r2_client, bucket, key, part_size=8 * 1024 * 1024,
+                 max_pending_chunks=16, content_type="application/pdf"):
+        self.r2_client = r2_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.content_type = content_type
+
+        self.size = 0
+        self.error = None
+        # Set once the object is in R2
+        self.stored = False
+
+        self._chunks = queue.Queue(maxsize=max_pending_chunks)
+        self._aborted = threading.Event()
+        self._on_done = None
+        self._done_lock = threading.Lock()
+        self._finished = False
+        self._thread = threading.Thread(
+            target=self._run, name="r2-stream-upload", daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item, deadline=None):
+        # Never block on a worker that has already given up
+        while self._thread.is_alive():
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            try:
+                self._chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def feed(self, chunk: bytes):
+        if self.error is None:
+            self._put(chunk)
+
+    def abort(self, on_done=None):
+        """
+        Stop the upload; an open multipart upload is aborted. `on_done(stored)`
+        runs once the upload thread has stopped, `stored` telling whether the
+        object reached R2 anyway (its last request was already in flight).
+        """
+        self._aborted.set()
+        try:
+            # Wakes a worker waiting for chunks; a busy one checks the flag
+            self._chunks.put_nowait(self._DONE)
+        except queue.Full:
+            pass
+
+        with self._done_lock:
+            if not self._finished:
+                self._on_done = on_done
+                return
+        if on_done:
+            on_done(self.stored)
+
+    def _done(self):
+        with self._done_lock:
+            self._finished = True
+            on_done = self._on_done
+        if on_done:
+            try:
+                on_done(self.stored)
+            except Exception as e:
+                logger.error(f"R2 upload cleanup of {self.key} failed: {e}")
+
+    def finish(self, timeout=None) -> int:
+        """
+        Wait for the upload to complete. Returns the uploaded size,
+        raises R2UploadError if it failed or was aborted.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        self._put(self._DONE, deadline)
+        self._thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+        if self._thread.is_alive():
+            raise R2UploadError(f"R2 upload of {self.key} timed out")
+        if self.error is not None:
+            raise R2UploadError(f"R2 upload of {self.key} failed: {self.error}")
+        if self._aborted.is_set():
+            raise R2UploadError(f"R2 upload of {self.key} aborted")
+
+        return self.size
+
+    def _run(self):
+        try:
+            self._upload()
+        finally:
+            self._done()
+
+    def _abort_multipart(self, upload_id):
+        if upload_id is not None:
+            self.r2_client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=upload_id
+            )
+
+    def _upload(self):
+        buffer = bytearray()
+        upload_id = None
+        parts = []
+
+        try:
+            while True:
+                chunk = self._chunks.get()
+                if chunk is self._DONE or self._aborted.is_set():
+                    break
+
+                buffer += chunk
+                self.size += len(chunk)
+
+                if len(buffer) >= self.part_size:
+                    if upload_id is None:
+                        upload_id = self.r2_client.create_multipart_upload(
+                            Bucket=self.bucket,
+                            Key=self.key,
+                            ContentType=self.content_type,
+                        )["UploadId"]
+
+                    part_number = len(parts) + 1
+                    resp = self.r2_client.upload_part(
+                        Bucket=self.bucket,
+                        Key=self.key,
+                        UploadId=upload_id,
+                        PartNumber=part_number,
+                        Body=bytes(buffer[:self.part_size]),
+                    )
+                    parts.append({"PartNumber": part_number, "ETag": resp["ETag"]})
+                    del buffer[:self.part_size]
+
+            if self._aborted.is_set():
+                self._abort_multipart(upload_id)
+                return
+
+            if upload_id is None:
+                # Small output: a single request
+                self.r2_client.put_object(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    Body=bytes(buffer),
+                    ContentType=self.content_type,
+                )
+                self.stored = True
+                return
+
+            if buffer:
+                part_number = len(parts) + 1
+                resp = self.r2_client.upload_part(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=bytes(buffer),
+                )
+                parts.append({"PartNumber": part_number, "ETag": resp["ETag"]})
+
+            # finish() may have timed out and aborted while the last part went up
+            if self._aborted.is_set():
+                self._abort_multipart(upload_id)
+                return
+
+            self.r2_client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+            self.stored = True
+
+        except Exception as e:
+            self.error = e
+            logger.error(f"R2 stream upload of {self.key} failed: {e}")
+            try:
+                self._abort_multipart(upload_id)
+            except Exception:
+                pass
@@ -0,0 +1,185 @@
+import os
+from datetime import datetime, timedelta
+
+from flask.sessions import SecureCookieSessionInterface
+from flask_session.base import ServerSideSessionInterface
+from flask_session.defaults import Defaults
+from flask_session.mongodb import MongoDBSessionInterface
+
+from services.cache import TTLCache
+
+# "mongo": server-side sessions in `sessions`; "cookie": signed cookie, no storage
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "mongo")
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "4096"))
+# Seconds another instance's change (or a Mongo-side delete) can go unseen here
+SESSION_CACHE_TTL = int(os.getenv("SESSION_CACHE_TTL", "30"))
+# Unmodified sessions push their storage expiry forward at most this often
+SESSION_STORE_REFRESH = int(os.getenv("SESSION_STORE_REFRESH", "3600"))
+
+
+class MongoSessionInterface(MongoDBSessionInterface):
+    """
+    flask-session's MongoDB backend with a local read-through cache.
+
+    - No `create_index` round trip when constructed (that ran at import, on
+      every cold start); `ensure_indexes()` creates the TTL index instead.
+    - Session payloads are cached per store id for SESSION_CACHE_TTL
+      seconds. The id comes from the cookie only after its signature checks
+      out, so a forged cookie never reaches the cache or Mongo.
+    - An unmodified session is written back only when its stored expiry is
+      more than SESSION_STORE_REFRESH seconds behind, instead of on every
+      request. The cookie is still refreshed on every response that skips
+      the write, so the sliding lifetime is unchanged give or take that
+      interval.
+    """
+
+    def __init__(self, app, client, db, collection,
+                 cache_size=SESSION_CACHE_SIZE, cache_ttl=SESSION_CACHE_TTL,
+                 store_refresh=SESSION_STORE_REFRESH, **kwargs):
+        self.client = client
+        self.store = client[db][collection]
+        self.use_deprecated_method = False  # pymongo >= 4
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl) if cache_ttl > 0 else None
+        self.store_refresh = timedelta(seconds=store_refresh)
+        ServerSideSessionInterface.__init__(self, app, **kwargs)
+
+    def _cache_set(self, store_id, data, expiration):
+        if self.cache is not None:
+            self.cache.set(store_id, (data, expiration))
+
+    def _cached_session_data(self, store_id):
+        """
+        (True, data or None) when the cache can answer, else (False, None).
+        """
+        if self.cache is None:
+            return False, None
+
+        entry = self.cache.get(store_id)
+        if entry is None:
+            return False, None
+
+        data, expiration = entry
+        if expiration > datetime.utcnow():
+            return True, dict(data)
+        self.cache.pop(store_id)
+        return True, None
+
+    def _load_document(self, store_id, document):
+        if not document:
+            return None
+
+        data = self.serializer.decode(bytes(document["val"]))
+        self._cache_set(store_id, dict(data), document["expiration"])
+        return data
+
+    def _session_document(self, session_lifetime, session, store_id):
+        """
+        The stored form of `session`: (filter, update, expiration).
+        """
+        expiration = datetime.utcnow() + session_lifetime
+        update = {"$set": {
+            "id": store_id,
+            "val": self.serializer.encode(session),
+            "expiration": expiration,
+        }}
+        return {"id": store_id}, update, expiration
+
+    def _retrieve_session_data(self, store_id):
+        hit, data = self._cached_session_data(store_id)
+        if hit:
+            return data
+
+        return self._load_document(store_id, self.store.find_one({"id": store_id}))
+
+    def _delete_session(self, store_id):
+        if self.cache is not None:
+            self.cache.pop(store_id)
+        self.store.delete_one({"id": store_id})
+
+    def _upsert_session(self, session_lifetime, session, store_id):
+        query, update, expiration = self._session_document(session_lifetime, session, store_id)
+        self.store.update_one(query, update, upsert=True)
+        self._cache_set(store_id, dict(session), expiration)
+
+    def _set_cookie(self, app, session, response):
+        response.set_cookie(
+            key=self.get_cookie_name(app),
+            value=self._sign(app, session.sid) if self.use_signer else session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=self.get_cookie_domain(app),
+            path=self.get_cookie_path(app),
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app) if self.has_same_site_capability else None,
+        )
+        response.vary.add("Cookie")
+
+    def save_session(self, app, session, response):
+        if session and not self.should_set_storage(app, session):
+            # Storage write skipped, the cookie's expiry still slides
+            if session.accessed:
+                response.vary.add("Cookie")
+            if self.should_set_cookie(app, session):
+                self._set_cookie(app, session, response)
+            return
+
+        super().save_session(app, session, response)
+
+    def should_set_storage(self, app, session):
+        if session.modified:
+            return True
+        if not app.config["SESSION_REFRESH_EACH_REQUEST"] or self.cache is None:
+            return super().should_set_storage(app, session)
+
+        # The expiry we loaded (or wrote) this session with is in the cache
+        entry = self.cache.get(self._get_store_id(session.sid))
+        if entry is None:
+            return True
+        stored_at = entry[1] - app.permanent_session_lifetime
+        return datetime.utcnow() - stored_at >= self.store_refresh
+
+
+def rotate_session(session_interface, session):
+    """
+    Give a session a fresh id and drop the old one from storage, e.g. on
+    login, so no instance keeps serving a cached copy of what was there.
+    No-op for signed-cookie sessions, which have no id.
+    """
+    regenerate = getattr(session_interface, "regenerate", None)
+    if regenerate is not None:
+        regenerate(session)
+
+
+def init_session(app, client):
+    """
+    Install the session interface for SESSION_BACKEND from the usual
+    SESSION_* config.
+
+    "cookie" keeps the whole session in Flask's signed cookie: no storage
+    round trip at all, same cookie settings and permanent lifetime. Session
+    data is readable by the client (not secret) and capped at ~4 KB, which
+    is fine for the user id the app keeps there.
+    """
+    config = app.config
+
+    if SESSION_BACKEND == "cookie":
+        app.session_interface = SecureCookieSessionInterface()
+        return app.session_interface
+
+    if SESSION_BACKEND != "mongo":
+        raise RuntimeError(f"Unknown SESSION_BACKEND: {SESSION_BACKEND!r}")
+
+    app.session_interface = MongoSessionInterface(
+        app,
+        client=client,
+        db=config.get("SESSION_MONGODB_DB", Defaults.SESSION_MONGODB_DB),
+        collection=config.get("SESSION_MONGODB_COLLECT", Defaults.SESSION_MONGODB_COLLECT),
+        key_prefix=config.get("SESSION_KEY_PREFIX", Defaults.SESSION_KEY_PREFIX),
+        use_signer=config.get("SESSION_USE_SIGNER", Defaults.SESSION_USE_SIGNER),
+        permanent=config.get("SESSION_PERMANENT", Defaults.SESSION_PERMANENT),
+        sid_length=config.get("SESSION_ID_LENGTH", Defaults.SESSION_ID_LENGTH),
+        serialization_format=config.get(
+            "SESSION_SERIALIZATION_FORMAT", Defaults.SESSION_SERIALIZATION_FORMAT
+        ),
+    )
+    return app.session_interface
@@ -0,0 +1,111 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+from services.aio import async_collection
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Accept signed tokens on /sso (codes keep working either way)
+SSO_TOKEN_LOGIN = os.getenv("SSO_TOKEN_LOGIN", "0") == "1"
+# "mongo": also claim in `sso_used_tokens`, needed as soon as more than one
+# process serves /sso; "memory": this process only
+SSO_REPLAY_STORE = os.getenv("SSO_REPLAY_STORE", "mongo")
+SSO_REPLAY_CACHE_SIZE = int(os.getenv("SSO_REPLAY_CACHE_SIZE", "100000"))
+# Tokens expiring further out than this are refused, which bounds how
+# long a used token has to be remembered
+SSO_TOKEN_MAX_AGE = int(os.getenv("SSO_TOKEN_MAX_AGE", "300"))
+
+
+class TokenReplayGuard:
+    """
+    Remembers used SSO tokens until they expire, so each logs in once.
+
+    The in-process cache rejects replays without a round trip. With a
+    collection (unique _id, TTL on expires_at) a token is also claimed
+    there with a single insert, which covers replays that land on another
+    process. Memory-only is only safe when one process serves /sso.
+
+    The cache never evicts a token before it expires, which would let it
+    be replayed. When it is full of live tokens, new ones are refused in
+    memory-only mode, or claimed in the collection alone. Keep
+    SSO_REPLAY_CACHE_SIZE above the logins expected within SSO_TOKEN_MAX_AGE.
+    """
+
+    def __init__(self, collection=None, maxsize=SSO_REPLAY_CACHE_SIZE):
+        self.collection = collection
+        self.maxsize = maxsize
+        self.seen = TTLCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def claim(self, token_id, expires_at) -> bool:
+        """
+        True the first time `token_id` is seen before `expires_at` (epoch
+        seconds), False on a replay or once expired.
+        """
+        if not self._claim_locally(token_id, expires_at):
+            return False
+
+        if self.collection is not None:
+            try:
+                self.collection.insert_one(self._record(token_id, expires_at))
+            except DuplicateKeyError:
+                return False
+
+        return True
+
+    async def claim_async(self, token_id, expires_at) -> bool:
+        """
+        claim() for the asyncio serving mode.
+        """
+        if not self._claim_locally(token_id, expires_at):
+            return False
+
+        if self.collection is not None:
+            try:
+                await async_collection(self.collection).insert_one(
+                    self._record(token_id, expires_at)
+                )
+            except DuplicateKeyError:
+                return False
+
+        return True
+
+    def _claim_locally(self, token_id, expires_at) -> bool:
+        ttl = expires_at - time.time()
+        if ttl <= 0:
+            return False
+
+        with self._lock:
+            if token_id in self.seen:
+                return False
+
+            if len(self.seen) >= self.maxsize:
+                self.seen.purge_expired()
+            if len(self.seen) >= self.maxsize:
+                logger.warning("SSO replay cache full of unexpired tokens")
+                # Remembering this one would evict a live token
+                return self.collection is not None
+
+            self.seen.set(token_id, True, ttl=ttl)
+        return True
+
+    @staticmethod
+    def _record(token_id, expires_at):
+        return {
+            "_id": token_id,
+            "expires_at": datetime.fromtimestamp(expires_at, timezone.utc),
+        }
+
+
+def build_replay_guard(db):
+    if SSO_REPLAY_STORE == "mongo":
+        return TokenReplayGuard(db["sso_used_tokens"])
+    if SSO_REPLAY_STORE != "memory":
+        raise RuntimeError(f"Unknown SSO_REPLAY_STORE: {SSO_REPLAY_STORE!r}")
+    return TokenReplayGuard()
@@ -0,0 +1,66 @@
+import os
+
+from bson import ObjectId
+
+from services.aio import async_collection
+from services.cache import TTLCache
+from services.db import db
+from services.page_cache import invalidate_user_pages
+
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "30"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "2048"))
+
+# Only what the views and templates read from g.user
+USER_FIELDS = {
+    "name": 1,
+    "email": 1,
+    "account_type": 1,
+    "credit_contract": 1,
+}
+
+users_collection = db["users"]
+
+_users = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+def get_user(user_id):
+    """
+    Read-through lookup of the logged-in user's document.
+    Returns a fresh dict (safe to mutate) or None.
+    """
+    key = str(user_id)
+
+    user = _users.get(key)
+    if user is None:
+        user = users_collection.find_one({"_id": ObjectId(key)}, USER_FIELDS)
+        if user is None:
+            return None
+        _users.set(key, user)
+
+    return dict(user)
+
+
+async def get_user_async(user_id):
+    """
+    get_user() for the asyncio serving mode, sharing the same cache.
+    """
+    key = str(user_id)
+
+    user = _users.get(key)
+    if user is None:
+        user = await async_collection(users_collection).find_one(
+            {"_id": ObjectId(key)}, USER_FIELDS
+        )
+        if user is None:
+            return None
+        _users.set(key, user)
+
+    return dict(user)
+
+
+def invalidate_user(user_id):
+    """
+    Drop a cached user, e.g. after its credits changed or on a fresh login.
+    """
+    _users.pop(str(user_id))
+    invalidate_user_pages(user_id)
@@ -0,0 +1,45 @@
+import time
+import zipfile
+
+
+class _ChunkBuffer:
+    """
+    Write-only, non-seekable file object. zipfile falls back to streaming
+    mode (data descriptors, no seeking back) when it is handed one.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ZipStream:
+    """
+    Build a ZIP archive incrementally; each `add()` returns the bytes that
+    can be sent to the client straight away.
+    """
+
+    def __init__(self, compression=zipfile.ZIP_STORED):
+        self._buffer = _ChunkBuffer()
+        self._zip = zipfile.ZipFile(self._buffer, mode="w", compression=compression)
+
+    def add(self, name: str, data: bytes) -> bytes:
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = self._zip.compression
+        self._zip.writestr(info, data)
+        return self._buffer.drain()
+
+    def close(self) -> bytes:
+        self._zip.close()
+        return self._buffer.drain()